@@ -1,23 +1,98 @@
 from fastapi import FastAPI
 from dotenv import load_dotenv, find_dotenv
+from contextlib import asynccontextmanager
+import asyncio
+import gc
+import os
+import traceback
 
 # Load .env from project root
 load_dotenv(find_dotenv(".env", raise_error_if_not_found=False))
 print("Loaded .env from project root")
 
-from .routes import auth_routes, upload_routes, analysis_routes
+from .routes import auth_routes, upload_routes, analysis_routes, health_routes
+from . import sentiment_analysis
+from .services.inference_executor import run_inference, shutdown_inference_executor
+from .services.job_service import job_manager
+from .services.password_service import shutdown_password_executor
+from .services import index_service
+from .config import resources
 
 print(">>> LOADING FASTAPI APP V3 <<<")  # DEBUG LINE
 
+
+# MODEL PRELOAD
+# "import":   load weights while the app module is imported. Under
+#             `gunicorn --preload` that happens once in the master, and
+#             forked workers share the weights copy-on-write.
+# "lifespan": each worker loads the model at startup (default).
+# "off":      load lazily on the first analysis request.
+SENTIMENT_PRELOAD = os.getenv("SENTIMENT_PRELOAD", "lifespan")
+
+if SENTIMENT_PRELOAD == "import":
+    sentiment_analysis.get_model()
+    # keep the GC from touching (and so copying) the preloaded objects
+    gc.freeze()
+
+
+async def _warm_up():
+    try:
+        await run_inference(sentiment_analysis.warm_up_model)
+        health_routes.warmup_state["state"] = "ready"
+        print(f"Model ready ({sentiment_analysis.SENTIMENT_ENGINE})")
+    except Exception as exc:
+        health_routes.warmup_state.update({"state": "failed", "error": str(exc)})
+        print(" Model warm-up failed:")
+        print(traceback.format_exc())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # one Mongo and one Blob client per worker, released on shutdown
+    await resources.open()
+
+    if index_service.MONGO_ENSURE_INDEXES:
+        try:
+            await index_service.ensure_indexes()
+        except Exception as exc:
+            print(f" Index setup failed: {exc}")
+    if index_service.MONGO_INDEX_SELF_CHECK:
+        await index_service.check_query_plans()
+
+    # every worker process pulls background jobs, including ones left
+    # queued (or orphaned) by a previous run
+    job_manager.start()
+
+    # warm up in the background so /health/live answers straight away
+    warmup_task = None
+    if SENTIMENT_PRELOAD == "off":
+        health_routes.warmup_state["state"] = "skipped"
+    else:
+        warmup_task = asyncio.ensure_future(_warm_up())
+
+    yield
+
+    if warmup_task is not None:
+        warmup_task.cancel()
+    await job_manager.stop()
+    sentiment_analysis.batcher.stop()
+    shutdown_inference_executor()
+    shutdown_password_executor()
+    await resources.close()
+
+
 app = FastAPI(
     title="Sentiment Analysis POC API ",
     swagger_ui_parameters={"persistAuthorization": True},
+    lifespan=lifespan,
 )
 
 # ROUTERS
 app.include_router(auth_routes.router, prefix="/auth", tags=["Authentication"])
 app.include_router(upload_routes.router, tags=["File Uploads"])
 app.include_router(analysis_routes.router)   # prefix is set INSIDE analysis_routes
+app.include_router(health_routes.router)     # /health/live, /health/ready
+app.include_router(health_routes.metrics_router)  # /metrics (METRICS_ENABLED=true)
 
 
 @app.get("/")
@@ -1,9 +1,8 @@
 import os
 import ssl
-import certifi
 from dotenv import load_dotenv
-from motor.motor_asyncio import AsyncIOMotorClient
-from azure.storage.blob import BlobServiceClient
+
+from .resources import ResourceRegistry
 
 
 # LOAD ENV VARIABLES
@@ -13,28 +12,27 @@ load_dotenv()
 ssl._create_default_https_context = ssl._create_unverified_context
 
 
+# STORAGE MODE
+# "atlas" (default): MongoDB Atlas + Azure Blob Storage.
+# "memory": in-process stand-ins for both, for local load tests only.
+APP_STORAGE_MODE = os.getenv("APP_STORAGE_MODE", "atlas")
+MEMORY_MODE = APP_STORAGE_MODE == "memory"
+
+
 # MONGO DB ATLAS (Users, Files, Results)
+# Users, files and the token blacklist have always lived in the
+# "sentiment_poc" database; only analysis results were written to
+# MONGO_DB_NAME. Both stay where existing deployments keep their data.
 MONGO_URI = os.getenv("MONGO_URI")
+MONGO_APP_DB_NAME = os.getenv("MONGO_APP_DB_NAME", "sentiment_poc")
+MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "sentiment_poc")
 
-if not MONGO_URI:
+if not MEMORY_MODE and not MONGO_URI:
     raise Exception(" MONGO_URI is missing in .env")
 
-atlas_client = AsyncIOMotorClient(
-    MONGO_URI,
-    tls=True,
-    tlsCAFile=certifi.where(),
-    serverSelectionTimeoutMS=20000
-)
-
-atlas_db = atlas_client["sentiment_poc"]
-
-users_collection = atlas_db["users"]
-blacklist_collection = atlas_db["blacklist"]
-files_collection = atlas_db["files"]
-results_collection = atlas_db["results"]  
 
 # JWT CONFIG
-JWT_SECRET = os.getenv("JWT_SECRET")
+JWT_SECRET = os.getenv("JWT_SECRET") or ("local-memory-mode-jwt-secret-not-for-prod" if MEMORY_MODE else None)
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 
 if not JWT_SECRET:
@@ -45,11 +43,41 @@ if not JWT_SECRET:
 AZURE_STORAGE_CONNECTION_STRING = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
 AZURE_CONTAINER_NAME = os.getenv("AZURE_CONTAINER_NAME")
 
-if not AZURE_STORAGE_CONNECTION_STRING:
-    raise Exception(" AZURE_STORAGE_CONNECTION_STRING missing in .env")
+if MEMORY_MODE:
+    AZURE_CONTAINER_NAME = AZURE_CONTAINER_NAME or "sentiment-files"
 
-if not AZURE_CONTAINER_NAME:
-    raise Exception(" AZURE_CONTAINER_NAME missing in .env")
+else:
+    if not AZURE_STORAGE_CONNECTION_STRING:
+        raise Exception(" AZURE_STORAGE_CONNECTION_STRING missing in .env")
+
+    if not AZURE_CONTAINER_NAME:
+        raise Exception(" AZURE_CONTAINER_NAME missing in .env")
+
+
+# AZURE ML (optional, only read when a job is submitted)
+AZURE_SUBSCRIPTION_ID = os.getenv("AZURE_SUBSCRIPTION_ID")
+AZURE_RESOURCE_GROUP = os.getenv("AZURE_RESOURCE_GROUP")
+AZURE_ML_WORKSPACE = os.getenv("AZURE_ML_WORKSPACE")
+
+
+# SHARED CLIENTS (opened and closed by the app lifespan)
+resources = ResourceRegistry(
+    mongo_uri=MONGO_URI,
+    db_name=MONGO_APP_DB_NAME,
+    blob_conn_str=AZURE_STORAGE_CONNECTION_STRING,
+    container_name=AZURE_CONTAINER_NAME,
+    memory=MEMORY_MODE,
+    ml_settings={
+        "subscription_id": AZURE_SUBSCRIPTION_ID,
+        "resource_group": AZURE_RESOURCE_GROUP,
+        "workspace": AZURE_ML_WORKSPACE,
+    },
+)
 
-blob_service = BlobServiceClient.from_connection_string(AZURE_STORAGE_CONNECTION_STRING)
-blob_container = blob_service.get_container_client(AZURE_CONTAINER_NAME)
+users_collection = resources.collection("users")
+blacklist_collection = resources.collection("blacklist")
+files_collection = resources.collection("files")
+results_collection = resources.collection("results", MONGO_DB_NAME)
+result_rows_collection = resources.collection("result_rows", MONGO_DB_NAME)
+jobs_collection = resources.collection("jobs")
+auth_invalidations_collection = resources.collection("auth_invalidations")
@@ -0,0 +1,176 @@
+# backend/inference_engine.py
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class MicroBatcher:
+    """
+    Dynamic micro-batching engine shared by every request in the process.
+
+    Callers submit texts from any thread; a single worker thread groups
+    queued texts into batches and runs one forward pass per batch. A batch
+    is flushed when it reaches `max_batch_size` texts or when the oldest
+    text in it has waited `max_wait_ms`, whichever comes first. The queue
+    holds at most `max_queue_depth` texts; submitters block when it is full.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[List[str]], List[Dict[str, Any]]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 10.0,
+        max_queue_depth: int = 4096,
+        on_flush: Optional[Callable[[int, List[float]], None]] = None,
+    ):
+        self._run_batch = run_batch
+        self._on_flush = on_flush
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_ms = max(0.0, max_wait_ms)
+        self.max_queue_depth = max(1, max_queue_depth)
+
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._batches = 0
+        self._texts = 0
+        self._failed_batches = 0
+        self._max_seen_batch = 0
+        self._total_wait = 0.0
+        self._max_wait_seen = 0.0
+
+    def _ensure_started(self):
+        # Threads do not survive fork(), so a worker process inherits a dead
+        # thread and a queue nobody drains; start fresh ones per PID.
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.max_queue_depth)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._worker,
+                args=(self._queue,),
+                name="sentiment-micro-batcher",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def submit(self, texts: List[str]) -> List[Future]:
+        """
+        Queue texts for inference and return one Future per text.
+        Blocks while the queue is full.
+        """
+        self._ensure_started()
+        futures = []
+        for text in texts:
+            fut = Future()
+            self._queue.put((text, fut, time.monotonic()))
+            futures.append(fut)
+        return futures
+
+    def run(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        Submit texts and wait for their results, in input order.
+        """
+        if not texts:
+            return []
+        return [f.result() for f in self.submit(texts)]
+
+    def stop(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                return
+            self._queue.put(None)
+            thread = self._thread
+        thread.join()
+
+    def _collect(self, q: queue.Queue, first) -> Tuple[List, bool]:
+        batch = [first]
+        deadline = first[2] + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            try:
+                item = q.get_nowait()
+            except queue.Empty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = q.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _worker(self, q: queue.Queue):
+        while True:
+            first = q.get()
+            if first is None:
+                return
+            batch, stop = self._collect(q, first)
+            try:
+                self._flush(batch)
+            except Exception as exc:
+                # one bad batch must not stop the worker: fail its callers
+                # (those not answered yet) and keep serving the queue
+                self._failed_batches += 1
+                for _, fut, _ in batch:
+                    if not fut.done():
+                        fut.set_exception(exc)
+                print(f" Micro-batch of {len(batch)} failed: {exc}")
+            if stop:
+                return
+
+    def _flush(self, batch: List):
+        started = time.monotonic()
+        waits = [started - enqueued for _, _, enqueued in batch]
+        texts = [text for text, _, _ in batch]
+
+        try:
+            outputs = self._run_batch(texts)
+            if len(outputs) != len(texts):
+                raise RuntimeError(f"Batch of {len(texts)} texts returned {len(outputs)} results")
+        except Exception as exc:
+            self._failed_batches += 1
+            for _, fut, _ in batch:
+                fut.set_exception(exc)
+            return
+
+        for (_, fut, _), out in zip(batch, outputs):
+            fut.set_result(out)
+
+        self._batches += 1
+        self._texts += len(batch)
+        self._max_seen_batch = max(self._max_seen_batch, len(batch))
+        self._total_wait += sum(waits)
+        self._max_wait_seen = max(self._max_wait_seen, max(waits))
+        if self._on_flush is not None:
+            try:
+                self._on_flush(len(batch), waits)
+            except Exception as exc:
+                print(f" Micro-batch flush callback failed: {exc}")
+
+    def stats(self) -> Dict[str, Any]:
+        q = self._queue
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "max_queue_depth": self.max_queue_depth,
+            "queue_depth": q.qsize() if q is not None else 0,
+            "batches": self._batches,
+            "failed_batches": self._failed_batches,
+            "texts": self._texts,
+            "avg_batch_size": (self._texts / self._batches) if self._batches else 0.0,
+            "max_batch_seen": self._max_seen_batch,
+            "avg_queue_wait_ms": (self._total_wait / self._texts * 1000.0) if self._texts else 0.0,
+            "max_queue_wait_ms": self._max_wait_seen * 1000.0,
+        }
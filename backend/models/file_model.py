@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
+from typing import Optional
 
 class FileMeta(BaseModel):
     id: str
@@ -8,3 +9,7 @@ class FileMeta(BaseModel):
     blob_name: str
     blob_url: str
     uploaded_at: datetime
+    content_sha256: Optional[str] = None
+    size_bytes: Optional[int] = None
+    line_count: Optional[int] = None
+    row_count: Optional[int] = None
@@ -0,0 +1,200 @@
+import os
+from typing import Any, Dict, Optional
+
+
+# MONGO POOL / TIMEOUTS (per worker process)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "20"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_MS = int(os.getenv("MONGO_MAX_IDLE_MS", "300000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "20000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "10000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "60000"))
+
+# BLOB HTTP POOL / TIMEOUTS
+BLOB_MAX_CONNECTIONS = int(os.getenv("BLOB_MAX_CONNECTIONS", "16"))
+BLOB_CONNECTION_TIMEOUT = int(os.getenv("BLOB_CONNECTION_TIMEOUT", "20"))
+BLOB_READ_TIMEOUT = int(os.getenv("BLOB_READ_TIMEOUT", "120"))
+
+# Ping Mongo while the app starts so a bad URI fails startup, not the
+# first request.
+RESOURCE_STARTUP_PING = os.getenv("RESOURCE_STARTUP_PING", "true").lower() == "true"
+
+
+class ResourceRegistry:
+    """
+    The process-wide external clients: one Mongo client, one async Blob
+    client and, only if something asks for it, the Azure ML client.
+
+    Clients are created on first use (or by open() in the app lifespan)
+    and recreated after a fork, so a gunicorn master never hands its
+    sockets to workers. close() releases them at shutdown.
+    """
+
+    def __init__(self, mongo_uri: Optional[str], db_name: str, blob_conn_str: Optional[str],
+                 container_name: str, memory: bool = False, ml_settings: Optional[dict] = None):
+        self.mongo_uri = mongo_uri
+        self.db_name = db_name
+        self.blob_conn_str = blob_conn_str
+        self.container_name = container_name
+        self.memory = memory
+        self.ml_settings = ml_settings or {}
+        self._pid = None
+        self._mongo = None
+        self._dbs: Dict[str, Any] = {}
+        self._blob = None
+        self._container = None
+        self._blob_session = None
+        self._ml = None
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            # inherited across fork: never reuse the parent's connections
+            self._mongo = None
+            self._dbs = {}
+            self._blob = None
+            self._container = None
+            self._blob_session = None
+            self._ml = None
+            self._pid = os.getpid()
+
+    # MONGO
+    @property
+    def mongo(self):
+        self._check_pid()
+        if self._mongo is None:
+            self._mongo = self._make_mongo()
+        return self._mongo
+
+    def _make_mongo(self):
+        if self.memory:
+            from .testing.memory_mongo import make_memory_mongo_client
+            return make_memory_mongo_client()
+
+        import certifi
+        from motor.motor_asyncio import AsyncIOMotorClient
+        return AsyncIOMotorClient(
+            self.mongo_uri,
+            tls=True,
+            tlsCAFile=certifi.where(),
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            maxIdleTimeMS=MONGO_MAX_IDLE_MS,
+            serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+            socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+        )
+
+    @property
+    def db(self):
+        return self.database(self.db_name)
+
+    def database(self, name: str):
+        mongo = self.mongo
+        if name not in self._dbs:
+            self._dbs[name] = mongo[name]
+        return self._dbs[name]
+
+    def collection(self, name: str, db_name: Optional[str] = None) -> "LazyCollection":
+        """Collection `name` of `db_name` (default: the registry's database)."""
+        return LazyCollection(self, name, db_name)
+
+    # BLOB STORAGE
+    @property
+    def blob_service(self):
+        self._check_pid()
+        if self._blob is None:
+            self._blob = self._make_blob_service()
+        return self._blob
+
+    def _make_blob_service(self):
+        if self.memory:
+            from .testing.memory_blob import InMemoryBlobServiceClient
+            return InMemoryBlobServiceClient()
+
+        from azure.storage.blob.aio import BlobServiceClient
+        from azure.core.pipeline.transport import AioHttpTransport
+        import aiohttp
+
+        self._blob_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=BLOB_MAX_CONNECTIONS)
+        )
+        return BlobServiceClient.from_connection_string(
+            self.blob_conn_str,
+            transport=AioHttpTransport(session=self._blob_session, session_owner=False),
+            connection_timeout=BLOB_CONNECTION_TIMEOUT,
+            read_timeout=BLOB_READ_TIMEOUT,
+        )
+
+    @property
+    def container(self):
+        blob = self.blob_service
+        if self._container is None:
+            self._container = blob.get_container_client(self.container_name)
+        return self._container
+
+    # AZURE ML (optional; only built when a job is submitted)
+    @property
+    def ml_client(self):
+        self._check_pid()
+        if self._ml is None:
+            from azure.ai.ml import MLClient
+            from azure.identity import DefaultAzureCredential
+            self._ml = MLClient(
+                DefaultAzureCredential(),
+                self.ml_settings.get("subscription_id"),
+                self.ml_settings.get("resource_group"),
+                self.ml_settings.get("workspace"),
+            )
+        return self._ml
+
+    # LIFESPAN
+    async def open(self):
+        """Create the required clients and check that Mongo answers."""
+        mongo = self.mongo
+        self.blob_service
+        if RESOURCE_STARTUP_PING and not self.memory:
+            await mongo.admin.command("ping")
+
+    async def close(self):
+        if self.memory:
+            # the in-memory stores are the data; keep them for the next open()
+            return
+        if self._blob is not None:
+            await self._blob.close()
+        if self._blob_session is not None:
+            await self._blob_session.close()
+        if self._mongo is not None:
+            self._mongo.close()
+        self._mongo = None
+        self._dbs = {}
+        self._blob = None
+        self._container = None
+        self._blob_session = None
+        self._ml = None
+
+
+class LazyCollection:
+    """
+    Stands in for a motor collection at import time and resolves it from
+    the registry on each use, so modules can keep importing collections
+    from config without opening a client.
+    """
+
+    def __init__(self, registry: ResourceRegistry, name: str, db_name: Optional[str] = None):
+        self._registry = registry
+        self._name = name
+        self._db_name = db_name
+        self._db = None
+        self._collection = None
+
+    @property
+    def full_name(self) -> str:
+        return f"{self._db_name or self._registry.db_name}.{self._name}"
+
+    def __getattr__(self, attr: str) -> Any:
+        db = self._registry.database(self._db_name or self._registry.db_name)
+        if db is not self._db:
+            # first use, or the client was reopened (new worker, new lifespan)
+            self._db = db
+            self._collection = db[self._name]
+        return getattr(self._collection, attr)
@@ -0,0 +1,308 @@
+# backend/result_format.py
+"""
+Compact line-by-line result blobs ("sres").
+
+    MAGIC | block* | trailer JSON | uint32 trailer length | MAGIC
+
+Each block is a uint32 length followed by a zlib-compressed payload of
+up to RESULT_BLOCK_ROWS rows stored as columns: row count, delta-coded
+source row index (uint32), label code (uint8) and score (float32), all
+little-endian. Row text and CSV fields are not stored: the row index
+points into the uploaded file, which is re-parsed on export.
+
+The trailer holds the summary, the label vocabulary and the source file
+reference. It is written last so results can be produced in a single
+streaming pass.
+
+Older results are plain JSON documents; JsonResultParser reads them
+incrementally.
+"""
+
+import json
+import os
+import re
+import struct
+import sys
+import zlib
+from array import array
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from .services import azure_blob_service
+
+MAGIC = b"SRES1"
+FORMAT = "sres1"
+RESULT_BLOCK_ROWS = int(os.getenv("RESULT_BLOCK_ROWS", "65536"))
+RESULT_COMPRESS_LEVEL = int(os.getenv("RESULT_COMPRESS_LEVEL", "6"))
+
+_U32 = struct.Struct("<I")
+_TAIL = len(MAGIC) + _U32.size
+_LITTLE = sys.byteorder == "little"
+
+
+def _le(column: array) -> bytes:
+    if not _LITTLE:
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def _from_le(typecode: str, data: bytes) -> array:
+    column = array(typecode)
+    column.frombytes(data)
+    if not _LITTLE:
+        column.byteswap()
+    return column
+
+
+def encode_block(indexes: List[int], codes: List[int], scores: List[float], base_index: int) -> bytes:
+    """One compressed block; indexes are stored as deltas from `base_index`."""
+    deltas = array("I", [b - a for a, b in zip([base_index] + indexes[:-1], indexes)])
+    payload = b"".join([
+        _U32.pack(len(indexes)),
+        _le(deltas),
+        bytes(codes),
+        _le(array("f", scores)),
+    ])
+    compressed = zlib.compress(payload, RESULT_COMPRESS_LEVEL)
+    return _U32.pack(len(compressed)) + compressed
+
+
+def decode_block(compressed: bytes, base_index: int) -> Tuple[List[int], bytes, array]:
+    """Columns of one block; `base_index` is the last index of the previous block."""
+    payload = zlib.decompress(compressed)
+    (n,) = _U32.unpack_from(payload)
+    pos = _U32.size
+    deltas = _from_le("I", payload[pos:pos + 4 * n])
+    pos += 4 * n
+    codes = payload[pos:pos + n]
+    pos += n
+    scores = _from_le("f", payload[pos:pos + 4 * n])
+
+    indexes = []
+    current = base_index
+    for delta in deltas:
+        current += delta
+        indexes.append(current)
+    return indexes, codes, scores
+
+
+class ResultWriter:
+    """Streams rows into a compact result blob (see module docstring)."""
+
+    def __init__(self, blob_name: str, header: Dict[str, Any]):
+        self.blob_name = blob_name
+        self.header = header
+        self.rows = 0
+        self._writer = azure_blob_service.BlockBlobWriter(blob_name)
+        self._labels: Dict[str, int] = {}
+        self._last_index = 0
+        self._indexes: List[int] = []
+        self._codes: List[int] = []
+        self._scores: List[float] = []
+        self._started = False
+
+    def _code(self, label: str) -> int:
+        code = self._labels.get(label)
+        if code is None:
+            if len(self._labels) >= 256:
+                raise ValueError("Result format supports at most 256 labels.")
+            code = self._labels[label] = len(self._labels)
+        return code
+
+    async def add(self, items: List[Dict[str, Any]], results: List[Dict[str, Any]]):
+        """Append parsed source items (in index order) and their sentiments."""
+        for item, res in zip(items, results):
+            self._indexes.append(item["index"])
+            self._codes.append(self._code(res["label"]))
+            self._scores.append(res["score"])
+        self.rows += len(items)
+        while len(self._indexes) >= RESULT_BLOCK_ROWS:
+            await self._flush(RESULT_BLOCK_ROWS)
+
+    async def _flush(self, n: int):
+        if not self._started:
+            await self._writer.write(MAGIC)
+            self._started = True
+        if not n:
+            return
+        indexes = self._indexes[:n]
+        block = encode_block(indexes, self._codes[:n], self._scores[:n], self._last_index)
+        self._last_index = indexes[-1]
+        del self._indexes[:n], self._codes[:n], self._scores[:n]
+        await self._writer.write(block)
+
+    async def close(self, summary: Dict[str, Any]) -> str:
+        await self._flush(len(self._indexes))
+        trailer = json.dumps({
+            **self.header,
+            "format": FORMAT,
+            "summary": summary,
+            "labels": sorted(self._labels, key=self._labels.get),
+            "rows": self.rows,
+        }).encode("utf-8")
+        await self._writer.write(trailer + _U32.pack(len(trailer)) + MAGIC)
+        return await self._writer.close()
+
+    async def abort(self):
+        await self._writer.abort()
+
+
+# READING
+async def read_trailer(blob_name: str, size: Optional[int] = None) -> Dict[str, Any]:
+    """The trailer of a compact result, plus its body byte range."""
+    if size is None:
+        size = await azure_blob_service.get_blob_size(blob_name)
+    tail = await azure_blob_service.download_blob_range(blob_name, max(0, size - 64 * 1024), size)
+    if not tail.endswith(MAGIC) or len(tail) < _TAIL:
+        raise ValueError("Not a compact result blob.")
+    (length,) = _U32.unpack_from(tail, len(tail) - _TAIL)
+    start = len(tail) - _TAIL - length
+    if start < 0:
+        tail = await azure_blob_service.download_blob_range(blob_name, size - _TAIL - length, size)
+        start = 0
+    trailer = json.loads(tail[start:start + length])
+    trailer["_body_end"] = size - _TAIL - length
+    trailer["_size"] = size
+    return trailer
+
+
+async def iter_result_rows(blob_name: str, trailer: Dict[str, Any]) -> AsyncIterator[Tuple[int, str, float]]:
+    """(source index, label, score) for every stored row, in order."""
+    labels = trailer["labels"]
+    body_end = trailer["_body_end"]
+    buf = bytearray()
+    consumed = 0
+    last_index = 0
+    checked = False
+
+    async for chunk in azure_blob_service.iter_blob_chunks(blob_name, size=trailer["_size"]):
+        # only the body (between MAGIC and the trailer) holds blocks
+        buf += chunk[:max(0, body_end - consumed)]
+        consumed += len(chunk)
+        if not checked:
+            if len(buf) < len(MAGIC):
+                continue
+            if bytes(buf[:len(MAGIC)]) != MAGIC:
+                raise ValueError("Not a compact result blob.")
+            del buf[:len(MAGIC)]
+            checked = True
+
+        pos = 0
+        while len(buf) - pos >= _U32.size:
+            (length,) = _U32.unpack_from(buf, pos)
+            if len(buf) - pos - _U32.size < length:
+                break
+            block = bytes(buf[pos + _U32.size:pos + _U32.size + length])
+            pos += _U32.size + length
+            indexes, codes, scores = decode_block(block, last_index)
+            if indexes:
+                last_index = indexes[-1]
+            for index, code, score in zip(indexes, codes, scores):
+                yield index, labels[code], score
+        del buf[:pos]
+
+        if consumed >= body_end:
+            break
+
+
+# LEGACY JSON RESULTS
+_WS = re.compile(r"[ \t\n\r]*")
+
+
+class JsonResultParser:
+    """
+    Incremental parser for JSON result documents.
+
+    Feed decoded text in arbitrary chunks; each call returns the events
+    completed so far: ("field", (key, value)) for top-level fields and,
+    for the "rows" array, ("rows_start", None), one ("row", row) per
+    element and ("rows_end", None). Only the current row is buffered.
+    """
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._state = "start"
+        self._key = None
+
+    def _decode(self, buf: str, pos: int, final: bool):
+        try:
+            value, end = self._decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            return None, None
+        # a number at the end of the buffer may continue in the next chunk
+        if end >= len(buf) and not final:
+            return None, None
+        return value, end
+
+    def feed(self, text: str, final: bool = False) -> List[Tuple[str, Any]]:
+        buf = self._buf + text
+        pos = 0
+        events = []
+        while True:
+            pos = _WS.match(buf, pos).end()
+            if pos >= len(buf):
+                break
+            ch = buf[pos]
+            state = self._state
+
+            if state == "start":
+                if ch != "{":
+                    raise ValueError("Result document is not a JSON object.")
+                pos += 1
+                self._state = "key"
+            elif state == "key":
+                if ch == ",":
+                    pos += 1
+                    continue
+                if ch == "}":
+                    pos += 1
+                    self._state = "end"
+                    continue
+                key, end = self._decode(buf, pos, final)
+                if end is None:
+                    break
+                self._key, pos, self._state = key, end, "colon"
+            elif state == "colon":
+                if ch != ":":
+                    raise ValueError("Malformed result document.")
+                pos += 1
+                self._state = "value"
+            elif state == "value":
+                if self._key == "rows" and ch == "[":
+                    pos += 1
+                    self._state = "rows"
+                    events.append(("rows_start", None))
+                    continue
+                value, end = self._decode(buf, pos, final)
+                if end is None:
+                    break
+                events.append(("field", (self._key, value)))
+                pos, self._state = end, "key"
+            elif state == "rows":
+                if ch == ",":
+                    pos += 1
+                    continue
+                if ch == "]":
+                    pos += 1
+                    self._state = "key"
+                    events.append(("rows_end", None))
+                    continue
+                row, end = self._decode(buf, pos, final)
+                if end is None:
+                    break
+                events.append(("row", row))
+                pos = end
+            else:
+                raise ValueError("Trailing data after result document.")
+
+        self._buf = buf[pos:]
+        return events
+
+    def close(self) -> List[Tuple[str, Any]]:
+        events = self.feed("", final=True)
+        if self._state != "end":
+            raise ValueError("Result document is truncated.")
+        return events
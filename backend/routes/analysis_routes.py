@@ -1,13 +1,19 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header, Query
+from contextlib import aclosing
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import codecs
 import csv
 import io
 import json
+import os
+import zlib
 from uuid import uuid4
 from fastapi.responses import StreamingResponse
+from bson.objectid import ObjectId
 import json
 from datetime import datetime
+from urllib.parse import urlparse
 
 def datetime_converter(o):
     if isinstance(o, datetime):
@@ -16,180 +22,613 @@ def datetime_converter(o):
 
 
 from ..services import db_service, azure_blob_service
-from ..sentiment_analysis import analyze_many, analyze_text, build_summary
+from .. import result_format
+from ..sentiment_analysis import (
+    LongTextAccumulator,
+    MODEL_VERSION,
+    SummaryAccumulator,
+    analyze_many,
+    build_summary,
+    get_inference_stats,
+)
+from ..sentiment_cache import text_key
+from ..text_parsing import detect_file_type, make_parser
 from .auth_routes import get_current_user
-from ..services.results_db_service import save_result_metadata
+from ..services.results_db_service import (
+    save_result_metadata,
+    find_reusable_result,
+    find_latest_result_for_file,
+    get_result_rows_by_hash,
+    save_result_rows,
+    delete_result_rows,
+    mark_result_rows_indexed,
+    query_result_rows,
+    top_result_rows,
+    result_score_histogram,
+)
 from ..services.azure_blob_service import CONTAINER_NAME
+from ..services.inference_executor import run_inference, InferenceBusyError
+from ..services.job_service import job_manager
+from ..services.metrics_service import stage_seconds
+from ..services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor
 
 
 print(">>> LOADING analysis_routes (Azure Blob Result Storage Enabled) <<<")
 
 router = APIRouter(prefix="/analysis", tags=["Analysis"])
 
+# Rows inferred (and streamed back) per step of the streaming endpoint
+STREAM_BATCH_ROWS = int(os.getenv("STREAM_BATCH_ROWS", "128"))
+
+# Write result rows to the queryable row index while analyzing; when off,
+# rows are indexed from the result blob on first query
+RESULT_ROWS_INDEXED = os.getenv("RESULT_ROWS_INDEXED", "true").lower() == "true"
+
 
 # INTERNAL HELPERS
-async def _get_file_and_blob_bytes(file_id: str, current_user):
+async def _get_owned_file(file_id: str, current_user):
     file_doc = await db_service.get_file_by_id(file_id)
     if not file_doc or file_doc.get("user_email") != current_user["email"]:
         raise HTTPException(status_code=404, detail="File not found or unauthorized.")
+    return file_doc
 
-    blob_name = file_doc["blob_name"]
 
+async def _read_file_items(file_doc, file_type: str) -> List[Dict[str, Any]]:
+    """All parsed items of an upload, decoded and parsed while it downloads."""
+    blob_name = file_doc["blob_name"]
+    items = []
     try:
-        content_bytes = await azure_blob_service.download_blob_bytes(blob_name)
+        async for batch, _ in _iter_item_batches(
+            blob_name, file_type, STREAM_BATCH_ROWS, file_doc.get("size_bytes")
+        ):
+            items.extend(batch)
     except Exception as exc:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to download blob '{blob_name}': {exc}",
         )
+    return items
 
-    return file_doc, content_bytes
 
+async def _find_previous_result(file_doc, analysis_type: str, current_user):
+    """
+    Earlier result for byte-identical content, same analysis and model.
+    Files uploaded before digests were recorded never match.
+    """
+    digest = file_doc.get("content_sha256")
+    if not digest:
+        return None
+    return await find_reusable_result(
+        user_email=current_user["email"],
+        content_sha256=digest,
+        analysis_type=analysis_type,
+        model_version=MODEL_VERSION,
+    )
 
-def _detect_file_type(file_name: str) -> str:
-    if "." in file_name:
-        ext = file_name.rsplit(".", 1)[1].lower()
-        if ext == "csv":
-            return "csv"
-    return "txt"
 
+def _blob_name_from_url(blob_url: str) -> str:
+    # /sentiment-files/results/user_at_example_com/filename.json
+    parsed = urlparse(blob_url).path
+    # results/user_at_example_com/filename.json
+    return parsed.split(CONTAINER_NAME + "/")[1]
 
 
-# 1) LINE-BY-LINE SENTIMENT ANALYSIS
-@router.post("/linebyline/{file_id}")
-async def start_linebyline_analysis(file_id: str, current_user=Depends(get_current_user)):
+async def _infer(fn, *args):
+    """Run a model call off the event loop, mapping backpressure to 503."""
+    try:
+        with stage_seconds.time(stage="inference"):
+            return await run_inference(fn, *args)
+    except InferenceBusyError as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+
+
+def _result_row(item: Dict[str, Any], res: Dict[str, Any]) -> Dict[str, Any]:
+    """Row of a line-by-line result from a parsed item and its sentiment."""
+    if "row" in item:
+        return {
+            "index": item["index"],
+            "row": item["row"],
+            "text_column": item["text_column"],
+            "label": res["label"],
+            "score": res["score"],
+        }
+    return {
+        "index": item["index"],
+        "text": item["text"],
+        "label": res["label"],
+        "score": res["score"],
+    }
 
-    file_doc, content_bytes = await _get_file_and_blob_bytes(file_id, current_user)
 
-    file_name = file_doc.get("file_name") or file_doc.get("blob_name")
-    file_type = _detect_file_type(file_name)
+def _text_hash(text: str, model_version: str = MODEL_VERSION) -> str:
+    """Per-line hash used to match rows across versions of a file."""
+    return text_key(text, model_version).hex()
 
-    rows = []
-    results = []
 
-    # ---------- TEXT FILE ----------
-    if file_type == "txt":
-        text = content_bytes.decode("utf-8", errors="ignore")
-        lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
-        results = analyze_many(lines)
-
-        for idx, (line, res) in enumerate(zip(lines, results), start=1):
-            rows.append({
-                "index": idx,
-                "text": line,
-                "label": res["label"],
-                "score": res["score"],
-            })
-
-    # ---------- CSV FILE ----------
-    else:
-        csv_text = content_bytes.decode("utf-8", errors="ignore")
-        reader = csv.DictReader(io.StringIO(csv_text))
-
-        texts = []
-        original_rows = []
-
-        for idx, row in enumerate(reader, start=1):
-            # auto-detect column
-            text_col = "text" if "text" in row else None
-            if not text_col:
-                for k, v in row.items():
-                    if v and v.strip():
-                        text_col = k
-                        break
-
-            if not text_col:
-                continue
+def _row_doc(item: Dict[str, Any], res: Dict[str, Any]) -> Dict[str, Any]:
+    """Entry of the result row index."""
+    return {
+        "index": item["index"],
+        "label": res["label"],
+        "score": res["score"],
+        "text": item["text"],
+        "text_hash": _text_hash(item["text"]),
+    }
 
-            text_val = (row[text_col] or "").strip()
-            if not text_val:
-                continue
 
-            texts.append(text_val)
-            original_rows.append({"index": idx, "row": row, "text_column": text_col})
+async def _find_incremental_base(file_name: str, email: str):
+    """
+    Latest line-by-line result over an earlier version of the same logical
+    file (same user and file name), with its rows indexed.
+    """
+    base = await find_latest_result_for_file(email, file_name, "linebyline", MODEL_VERSION)
+    if base and not base.get("rows_indexed"):
+        await _index_result_rows(base)
+    return base
 
-        results = analyze_many(texts)
 
-        for base, res in zip(original_rows, results):
-            rows.append({
-                "index": base["index"],
-                "row": base["row"],
-                "text_column": base["text_column"],
-                "label": res["label"],
-                "score": res["score"],
-            })
+async def _analyze_items(items: List[Dict[str, Any]], base_id: Optional[str] = None):
+    """
+    Sentiments of `items`, plus how many were reused. Rows whose text hash
+    appears in result `base_id` take its label and score; only new or
+    changed rows reach the model.
+    """
+    texts = [item["text"] for item in items]
+    if not base_id:
+        with stage_seconds.time(stage="inference"):
+            return await run_inference(analyze_many, texts), 0
 
-    summary = build_summary(results)
+    hashes = [_text_hash(text) for text in texts]
+    known = await get_result_rows_by_hash(base_id, list(set(hashes)))
+    missing = [i for i, h in enumerate(hashes) if h not in known]
 
+    results = [dict(known[h]) if h in known else None for h in hashes]
+    if missing:
+        with stage_seconds.time(stage="inference"):
+            fresh = await run_inference(analyze_many, [texts[i] for i in missing])
+        for i, res in zip(missing, fresh):
+            results[i] = res
+    return results, len(items) - len(missing)
 
-    # SAVE RESULT FILE → AZURE BLOB STORAGE
-    result_content = json.dumps({
+
+def _incremental_stats(base, reused: int, total: int) -> Dict[str, Any]:
+    return {
+        "base_result_id": base["_id"] if base else None,
+        "rows_reused": reused,
+        "rows_inferred": total - reused,
+    }
+
+
+async def _discard_result(writer: result_format.ResultWriter, result_id: str, committed: bool):
+    """
+    Undo a line-by-line result that failed before its metadata was saved:
+    drop its indexed rows and the result blob, which is deleted if it was
+    already committed and otherwise left to expire uncommitted.
+    """
+    try:
+        if committed:
+            await azure_blob_service.delete_blob(writer.blob_name)
+        else:
+            await writer.abort()
+    except Exception as exc:
+        print(f" Could not remove result blob {writer.blob_name}: {exc}")
+    if RESULT_ROWS_INDEXED:
+        try:
+            await delete_result_rows(result_id)
+        except Exception as exc:
+            print(f" Could not remove rows of result {result_id}: {exc}")
+
+
+def _result_columns(file_type: Optional[str]) -> Optional[List[str]]:
+    """Columns of a line-by-line result's rows (see _result_row)."""
+    if file_type == "csv":
+        return ["index", "row", "text_column", "label", "score"]
+    if file_type == "txt":
+        return ["index", "text", "label", "score"]
+    return None
+
+
+def _source_of(file_doc, file_name: str) -> Dict[str, Any]:
+    """Where the rows of a compact result over `file_doc` are re-read from."""
+    return {
+        "blob_name": file_doc["blob_name"],
+        "file_type": detect_file_type(file_name),
+        "size_bytes": file_doc.get("size_bytes"),
+    }
+
+
+def _result_writer(file_id: str, file_doc, file_name: str, email: str) -> result_format.ResultWriter:
+    """Compact result blob for a line-by-line run over `file_doc`."""
+    blob_name = azure_blob_service.make_blob_name(
+        f"{uuid4()}_{email}_linebyline.sres", email, is_result=True
+    )
+    return result_format.ResultWriter(blob_name, {
         "file_id": file_id,
         "file_name": file_name,
         "analysis_type": "linebyline",
-        "summary": summary,
-        "rows": rows,
-        "created_at": str(datetime.utcnow())
-    }, indent=4)
+        "created_at": str(datetime.utcnow()),
+        "model_version": MODEL_VERSION,
+        "source": _source_of(file_doc, file_name),
+    })
 
-    save_filename = f"{uuid4()}_{current_user['email']}_linebyline.json"
 
-    upload_resp = await azure_blob_service.upload_file_to_blob(
-        result_content.encode("utf-8"),
-        save_filename,
-        current_user["email"],
-        is_result=True
-    )
+async def _iter_source_items(source):
+    async for batch, _ in _iter_item_batches(
+        source["blob_name"], source["file_type"], STREAM_BATCH_ROWS, source.get("size_bytes")
+    ):
+        for item in batch:
+            yield item
 
-    blob_url = upload_resp["url"]
 
-  
-    # SAVE METADATA → MONGODB
-    await save_result_metadata(
-        user_email=current_user["email"],
-        analysis_type="linebyline",
-        file_name=file_name,
-        result_url=blob_url
-    )
+async def _iter_compact_rows(blob_name: str, trailer):
+    """
+    Rows of a compact result in the legacy row shape. Text and CSV fields
+    are re-read from the source upload; if it has been deleted, rows only
+    carry index, label and score.
+    """
+    source = trailer.get("source") or {}
+    items = None
+    try:
+        await azure_blob_service.get_blob_size(source["blob_name"])
+        items = _iter_source_items(source)
+    except Exception as exc:
+        print(f" Source upload of result unavailable, exporting without text: {exc}")
 
-    return {
+    item = None
+    try:
+        async with aclosing(result_format.iter_result_rows(blob_name, trailer)) as stored:
+            async for index, label, score in stored:
+                res = {"label": label, "score": round(score, 6)}
+                while items is not None and (item is None or item["index"] < index):
+                    item = await anext(items, None)
+                    if item is None:
+                        items = None
+                if item is not None and item["index"] == index:
+                    yield _result_row(item, res)
+                else:
+                    yield {"index": index, **res}
+    finally:
+        if items is not None:
+            await items.aclose()
+
+
+async def _read_compact_rows(blob_name: str, trailer) -> List[Dict[str, Any]]:
+    return [row async for row in _iter_compact_rows(blob_name, trailer)]
+
+
+# 1) LINE-BY-LINE SENTIMENT ANALYSIS
+@router.post("/linebyline/{file_id}")
+async def start_linebyline_analysis(
+    file_id: str,
+    force: bool = False,
+    incremental: bool = False,
+    run_async: bool = Query(False, alias="async"),
+    current_user=Depends(get_current_user)
+):
+    """
+    ?incremental=true reuses labels of unchanged lines from the latest
+    result for the same file name and only runs the model on new or
+    changed lines. Rows and summary are the same as a full run.
+    """
+
+    file_doc = await _get_owned_file(file_id, current_user)
+
+    # Identical content already analyzed with this model → reuse it
+    previous = None if force else await _find_previous_result(file_doc, "linebyline", current_user)
+    if previous:
+        blob_name = _blob_name_from_url(previous["result_url"])
+        if previous.get("result_format") == result_format.FORMAT:
+            trailer = await result_format.read_trailer(blob_name)
+            # same digest → same content, and this upload is known to exist
+            # while the one the earlier run read may have been deleted
+            if file_doc.get("blob_name"):
+                file_name = file_doc.get("file_name") or file_doc["blob_name"]
+                trailer["source"] = _source_of(file_doc, file_name)
+            stored = {"summary": trailer["summary"], "rows": await _read_compact_rows(blob_name, trailer)}
+        else:
+            stored = json.loads(await azure_blob_service.download_blob_bytes(blob_name))
+        return {
+            "message": "Line-by-line sentiment analysis reused from a previous run.",
+            "result_id": previous["_id"],
+            "result_url": previous["result_url"],
+            "summary": stored["summary"],
+            "rows": stored["rows"],
+            "reused": True,
+        }
+
+    # ?async=true → hand the file to a background job and return at once
+    if run_async:
+        job = await job_manager.submit(
+            "linebyline", current_user["email"], {"file_id": file_id, "incremental": incremental}
+        )
+        return {
+            "message": "Line-by-line sentiment analysis queued.",
+            "job_id": job["id"],
+            "status_url": f"/analysis/jobs/{job['id']}",
+        }
+
+    file_name = file_doc.get("file_name") or file_doc.get("blob_name")
+    items = await _read_file_items(file_doc, detect_file_type(file_name))
+    base = await _find_incremental_base(file_name, current_user["email"]) if incremental else None
+    try:
+        results, reused = await _analyze_items(items, base["_id"] if base else None)
+    except InferenceBusyError as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+    rows = [_result_row(item, res) for item, res in zip(items, results)]
+
+    summary = build_summary(results)
+
+
+    # SAVE RESULT FILE → AZURE BLOB STORAGE (compact format)
+    writer = _result_writer(file_id, file_doc, file_name, current_user["email"])
+    result_id = str(ObjectId())
+    blob_url = None
+    try:
+        with stage_seconds.time(stage="serialize"):
+            await writer.add(items, results)
+        blob_url = await writer.close(summary)
+
+        if RESULT_ROWS_INDEXED:
+            await save_result_rows(result_id, [_row_doc(item, res) for item, res in zip(items, results)])
+
+        # SAVE METADATA → MONGODB
+        await save_result_metadata(
+            user_email=current_user["email"],
+            analysis_type="linebyline",
+            file_name=file_name,
+            result_url=blob_url,
+            file_id=file_id,
+            content_sha256=file_doc.get("content_sha256"),
+            model_version=MODEL_VERSION,
+            summary=summary,
+            result_format=result_format.FORMAT,
+            result_id=result_id,
+            rows_indexed=RESULT_ROWS_INDEXED,
+        )
+    except BaseException:
+        await _discard_result(writer, result_id, committed=blob_url is not None)
+        raise
+
+    response = {
         "message": "Line-by-line sentiment analysis completed.",
+        "result_id": result_id,
         "result_url": blob_url,
         "summary": summary,
         "rows": rows,
     }
+    if incremental:
+        response["incremental"] = _incremental_stats(base, reused, len(items))
+    return response
 
 
 
-# 2) WHOLE-FILE SUMMARY ANALYSIS
-@router.post("/summary/{file_id}")
-async def start_summary_analysis(file_id: str, current_user=Depends(get_current_user)):
+# 1b) STREAMING LINE-BY-LINE ANALYSIS (NDJSON)
+async def _iter_item_batches(blob_name: str, file_type: str, batch_rows: int, size: int = None):
+    """
+    Download, decode and parse a blob incrementally, yielding
+    (parsed items, bytes read so far) in batches of `batch_rows` as soon
+    as they are complete. Ranged reads run ahead of the parser, and the
+    incremental decoder carries characters split across chunk edges.
+    """
+    parser = make_parser(file_type)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    pending = []
+    bytes_read = 0
+
+    async for chunk in azure_blob_service.iter_blob_chunks(blob_name, size=size):
+        bytes_read += len(chunk)
+        with stage_seconds.time(stage="parse"):
+            pending.extend(parser.feed(decoder.decode(chunk)))
+        full = len(pending) - len(pending) % batch_rows
+        for start in range(0, full, batch_rows):
+            yield pending[start:start + batch_rows], bytes_read
+        pending = pending[full:]
+
+    pending.extend(parser.feed(decoder.decode(b"", final=True)))
+    pending.extend(parser.close())
+    for start in range(0, len(pending), batch_rows):
+        yield pending[start:start + batch_rows], bytes_read
+
+
+def _ndjson(obj) -> bytes:
+    return (json.dumps(obj, default=datetime_converter) + "\n").encode("utf-8")
 
-    file_doc, content_bytes = await _get_file_and_blob_bytes(file_id, current_user)
+
+async def _linebyline_pipeline(file_id: str, file_doc, email: str, incremental: bool = False):
+    """
+    Incremental line-by-line analysis shared by the streaming endpoint
+    and background jobs.
+
+    Yields ("rows", rows, bytes_read) after every batch and finally
+    ("done", {"summary", "result_id", "result_url", "rows"}, bytes_read),
+    plus "incremental" stats when `incremental` is set.
+    The compact result blob is written alongside, block by block.
+    """
     file_name = file_doc.get("file_name") or file_doc.get("blob_name")
-    file_type = _detect_file_type(file_name)
+    acc = SummaryAccumulator()
+    base = await _find_incremental_base(file_name, email) if incremental else None
+    reused = 0
+    writer = _result_writer(file_id, file_doc, file_name, email)
+    result_id = str(ObjectId())
+    result_url = None
 
-    # construct full text
-    if file_type == "txt":
-        full_text = content_bytes.decode("utf-8", errors="ignore")
+    try:
+        bytes_read = 0
+
+        async for items, bytes_read in _iter_item_batches(
+            file_doc["blob_name"], detect_file_type(file_name), STREAM_BATCH_ROWS, file_doc.get("size_bytes")
+        ):
+            results, batch_reused = await _analyze_items(items, base["_id"] if base else None)
+            reused += batch_reused
+            rows = [_result_row(item, res) for item, res in zip(items, results)]
+
+            with stage_seconds.time(stage="serialize"):
+                await writer.add(items, results)
+            if RESULT_ROWS_INDEXED:
+                await save_result_rows(result_id, [_row_doc(item, res) for item, res in zip(items, results)])
+            acc.add(results)
+
+            yield "rows", rows, bytes_read
+
+        summary = acc.build()
+        result_url = await writer.close(summary)
+
+        await save_result_metadata(
+            user_email=email,
+            analysis_type="linebyline",
+            file_name=file_name,
+            result_url=result_url,
+            file_id=file_id,
+            content_sha256=file_doc.get("content_sha256"),
+            model_version=MODEL_VERSION,
+            summary=summary,
+            result_format=result_format.FORMAT,
+            result_id=result_id,
+            rows_indexed=RESULT_ROWS_INDEXED,
+        )
+    except BaseException:
+        await _discard_result(writer, result_id, committed=result_url is not None)
+        raise
 
-    else:
-        csv_text = content_bytes.decode("utf-8", errors="ignore")
-        reader = csv.DictReader(io.StringIO(csv_text))
+    done = {
+        "summary": summary,
+        "result_id": result_id,
+        "result_url": result_url,
+        "rows": acc.total,
+    }
+    if incremental:
+        done["incremental"] = _incremental_stats(base, reused, acc.total)
+    yield "done", done, bytes_read
 
-        texts = []
-        for row in reader:
-            col = "text" if "text" in row else next(iter(row))
-            val = (row[col] or "").strip()
-            if val:
-                texts.append(val)
 
-        full_text = "\n".join(texts)
+async def _stream_linebyline(file_id: str, file_doc, current_user, incremental: bool = False):
+    try:
+        pipeline = _linebyline_pipeline(file_id, file_doc, current_user["email"], incremental)
+        async with aclosing(pipeline) as pipeline:
+            async for kind, payload, _ in pipeline:
+                if kind == "rows":
+                    yield b"".join(_ndjson(row) for row in payload)
+                else:
+                    payload.pop("rows")
+                    yield _ndjson(payload)
+    except Exception as exc:
+        # headers are already sent, so report the failure in-band
+        yield _ndjson({"error": str(exc)})
 
-    if not full_text.strip():
-        raise HTTPException(status_code=400, detail="File contains no text to analyze.")
 
-    overall = analyze_text(full_text)
+@router.post("/linebyline/{file_id}/stream")
+async def stream_linebyline_analysis(
+    file_id: str,
+    incremental: bool = False,
+    current_user=Depends(get_current_user),
+):
+    """
+    Line-by-line analysis streamed as NDJSON: one line per analyzed row as
+    soon as its batch finishes, then a final {"summary", "result_id",
+    "result_url"} line. Memory use does not grow with file size.
+    """
+    file_doc = await _get_owned_file(file_id, current_user)
+    return StreamingResponse(
+        _stream_linebyline(file_id, file_doc, current_user, incremental),
+        media_type="application/x-ndjson",
+    )
+
+
+
+# 1c) BACKGROUND LINE-BY-LINE JOBS
+async def _run_linebyline_job(job, ctx):
+    file_id = job["payload"]["file_id"]
+    file_doc = await db_service.get_file_by_id(file_id)
+    if not file_doc or file_doc.get("user_email") != job["user_email"]:
+        raise RuntimeError("File not found or unauthorized.")
+
+    bytes_total = file_doc.get("size_bytes")
+    if bytes_total is None:
+        bytes_total = await azure_blob_service.get_blob_size(file_doc["blob_name"])
+    rows_done = 0
+
+    incremental = job["payload"].get("incremental", False)
+    async with aclosing(_linebyline_pipeline(file_id, file_doc, job["user_email"], incremental)) as pipeline:
+        async for kind, payload, bytes_read in pipeline:
+            if kind == "rows":
+                rows_done += len(payload)
+                await ctx.report(rows_done, bytes_read, bytes_total)
+                ctx.check_cancelled()
+            else:
+                await ctx.report(rows_done, bytes_read, bytes_total, force=True)
+                return payload
+
+
+job_manager.register("linebyline", _run_linebyline_job)
+
+
+async def _get_owned_job(job_id: str, current_user):
+    job = await job_manager.get(job_id)
+    if not job or job.get("user_email") != current_user["email"]:
+        raise HTTPException(status_code=404, detail="Job not found or unauthorized.")
+    return job
+
+
+@router.get("/jobs/{job_id}")
+async def get_analysis_job(job_id: str, current_user=Depends(get_current_user)):
+    """
+    State, rows done, throughput and ETA of a background analysis job.
+    """
+    return await _get_owned_job(job_id, current_user)
+
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_analysis_job(job_id: str, current_user=Depends(get_current_user)):
+    await _get_owned_job(job_id, current_user)
+    await job_manager.cancel(job_id)
+    return {"message": "Cancellation requested.", "job": await job_manager.get(job_id)}
+
+
+
+# 2) WHOLE-FILE SUMMARY ANALYSIS
+@router.post("/summary/{file_id}")
+async def start_summary_analysis(
+    file_id: str,
+    force: bool = False,
+    current_user=Depends(get_current_user)
+):
+
+    file_doc = await _get_owned_file(file_id, current_user)
+
+    # Identical content already analyzed with this model → reuse it
+    previous = None if force else await _find_previous_result(file_doc, "summary", current_user)
+    if previous:
+        return {
+            "message": "Summary analysis reused from a previous run.",
+            "result_id": previous["_id"],
+            "result_url": previous["result_url"],
+            "overall_result": previous["summary"],
+            "reused": True,
+        }
+
+    file_name = file_doc.get("file_name") or file_doc.get("blob_name")
+    file_type = detect_file_type(file_name)
+
+    # windowed over the whole document, not just the first 512 tokens; the
+    # text is the rows line-by-line analysis sees, fed a batch at a time
+    acc = LongTextAccumulator()
+    try:
+        async for items, _ in _iter_item_batches(
+            file_doc["blob_name"], file_type, STREAM_BATCH_ROWS, file_doc.get("size_bytes")
+        ):
+            await _infer(acc.feed, "\n".join(item["text"] for item in items))
+    except HTTPException:
+        raise
+    except Exception as exc:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to download blob '{file_doc['blob_name']}': {exc}",
+        )
+    await _infer(acc.close)
+
+    if not acc.count:
+        raise HTTPException(status_code=400, detail="File contains no text to analyze.")
+    overall = acc.build()
 
     # SAVE RESULT FILE → AZURE BLOB
     result_content = json.dumps({
@@ -212,15 +651,20 @@ async def start_summary_analysis(file_id: str, current_user=Depends(get_current_
     blob_url = upload_resp["url"]
 
     # SAVE METADATA → MONGODB
-    await save_result_metadata(
+    result_id = await save_result_metadata(
         user_email=current_user["email"],
         analysis_type="summary",
         file_name=file_name,
-        result_url=blob_url
+        result_url=blob_url,
+        file_id=file_id,
+        content_sha256=file_doc.get("content_sha256"),
+        model_version=MODEL_VERSION,
+        summary=overall,
     )
 
     return {
         "message": "Summary analysis completed.",
+        "result_id": result_id,
         "result_url": blob_url,
         "overall_result": overall,
     }
@@ -229,19 +673,151 @@ async def start_summary_analysis(file_id: str, current_user=Depends(get_current_
 
 # 3) LIST RESULTS
 @router.get("/results")
-async def list_analysis_results(current_user=Depends(get_current_user)):
-    results = await db_service.get_results_by_user(current_user["email"])
-    return {"results": results}
-from urllib.parse import urlparse
+async def list_analysis_results(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    current_user=Depends(get_current_user),
+):
+    """Newest-first page of the user's results; follow `next_cursor` for more."""
+    try:
+        page = await db_service.get_results_by_user(
+            current_user["email"], limit=limit, cursor=cursor, include_total=include_total
+        )
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    body = {"results": page["items"], "next_cursor": page["next_cursor"]}
+    if include_total:
+        body["total"] = page["total"]
+    return body
 
+
+# 3b) QUERY RESULT ROWS
+async def _get_indexed_result(result_id: str, current_user):
+    """
+    Owned line-by-line result whose rows are in the row index. Results
+    saved before the index existed are indexed from their blob on first use.
+    """
+    result_meta = await db_service.get_result_by_id(result_id)
+    if not result_meta or result_meta["user_email"] != current_user["email"]:
+        raise HTTPException(status_code=404, detail="Result not found or unauthorized")
+    if result_meta.get("analysis_type") != "linebyline":
+        raise HTTPException(status_code=400, detail="This result contains no rows to query.")
+    if not result_meta.get("rows_indexed"):
+        await _index_result_rows(result_meta)
+    return result_meta
+
+
+async def _index_result_rows(result_meta):
+    """Fill the row index of a result from its blob."""
+    result_id = result_meta["_id"]
+    model_version = result_meta.get("model_version") or MODEL_VERSION
+    blob_name = _blob_name_from_url(result_meta["result_url"])
+    try:
+        if result_meta.get("result_format") == result_format.FORMAT:
+            events = _compact_events(blob_name, await result_format.read_trailer(blob_name), None)
+        else:
+            events = _json_events(blob_name)
+
+        batch = []
+        async with aclosing(events) as stored:
+            async for kind, row in stored:
+                if kind != "row":
+                    continue
+                text = row.get("text")
+                if text is None and "row" in row:
+                    text = (row["row"].get(row["text_column"]) or "").strip()
+                batch.append({
+                    "index": row["index"],
+                    "label": row["label"],
+                    "score": row["score"],
+                    "text": text,
+                    "text_hash": _text_hash(text, model_version) if text else None,
+                })
+                if len(batch) >= STREAM_BATCH_ROWS * 8:
+                    await save_result_rows(result_id, batch, upsert=True)
+                    batch = []
+        await save_result_rows(result_id, batch, upsert=True)
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Failed to index result rows: {exc}")
+
+    await mark_result_rows_indexed(result_id)
+
+
+@router.get("/results/{result_id}/rows")
+async def query_result_rows_endpoint(
+    result_id: str,
+    label: Optional[str] = None,
+    min_score: Optional[float] = Query(None, ge=0, le=1),
+    max_score: Optional[float] = Query(None, ge=0, le=1),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user=Depends(get_current_user),
+):
+    """
+    Rows of a result filtered by label and score range, in source order.
+    Follow `next_cursor` for more.
+    """
+    await _get_indexed_result(result_id, current_user)
+    try:
+        page = await query_result_rows(
+            result_id, label=label, min_score=min_score, max_score=max_score, limit=limit, cursor=cursor
+        )
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return {"rows": page["items"], "next_cursor": page["next_cursor"]}
+
+
+@router.get("/results/{result_id}/rows/top")
+async def top_result_rows_endpoint(
+    result_id: str,
+    k: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+    label: Optional[str] = None,
+    current_user=Depends(get_current_user),
+):
+    """The k most confident rows of a result, optionally of one label."""
+    await _get_indexed_result(result_id, current_user)
+    return {"rows": await top_result_rows(result_id, k, label=label)}
+
+
+@router.get("/results/{result_id}/histogram")
+async def result_histogram_endpoint(
+    result_id: str,
+    bins: int = Query(10, ge=1, le=100),
+    label: Optional[str] = None,
+    min_score: Optional[float] = Query(None, ge=0, le=1),
+    max_score: Optional[float] = Query(None, ge=0, le=1),
+    current_user=Depends(get_current_user),
+):
+    """Score histogram of a result's rows, per label."""
+    await _get_indexed_result(result_id, current_user)
+    return await result_score_histogram(
+        result_id, bins, label=label, min_score=min_score, max_score=max_score
+    )
+
+
+# 4) INFERENCE ENGINE STATS
+@router.get("/engine/stats")
+async def inference_engine_stats(current_user=Depends(get_current_user)):
+    return {"batcher": get_inference_stats()}
+
+# 5) DOWNLOAD RESULTS
 @router.get("/download/{result_id}")
 async def download_result(
     result_id: str,
     format: str = "json",
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    accept_encoding: Optional[str] = Header(None),
     current_user=Depends(get_current_user)
 ):
     """
     Download a saved analysis result as CSV or JSON.
+
+    The result blob is parsed while it downloads and converted as it goes,
+    so memory use does not grow with the result size. ?offset=&limit=
+    select a window of rows; the body is gzip-encoded when accepted.
     """
 
     # 1️⃣ Fetch metadata
@@ -250,62 +826,202 @@ async def download_result(
     if not result_meta or result_meta["user_email"] != current_user["email"]:
         raise HTTPException(status_code=404, detail="Result not found or unauthorized")
 
-    # 2️⃣ Extract blob name WITH FOLDERS
-    blob_url = result_meta["result_url"]
+    fmt = format.lower()
+    if fmt not in ("json", "csv"):
+        raise HTTPException(status_code=400, detail="Invalid format. Use ?format=json or ?format=csv.")
+    if fmt == "csv" and result_meta.get("analysis_type") != "linebyline":
+        raise HTTPException(status_code=400, detail="This result contains no rows to export.")
 
-    parsed = urlparse(blob_url).path
-    # /sentiment-files/results/user_at_example_com/filename.json
-
-    blob_name = parsed.split(CONTAINER_NAME + "/")[1]
-    # results/user_at_example_com/filename.json
-
-    # 3️⃣ Download file bytes from Azure
-    file_bytes = await azure_blob_service.download_blob_bytes(blob_name)
+    # 2️⃣ Extract blob name WITH FOLDERS
+    blob_name = _blob_name_from_url(result_meta["result_url"])
 
-    # 4️⃣ Decode JSON content
+    # 3️⃣ Parse the stored result as a stream of fields and rows
+    stop = None if limit is None else offset + limit
+    columns = None
     try:
-        result_json = json.loads(file_bytes.decode("utf-8"))
-    except:
+        if result_meta.get("result_format") == result_format.FORMAT:
+            trailer = await result_format.read_trailer(blob_name)
+            events = _compact_events(blob_name, trailer, stop)
+            columns = _result_columns((trailer.get("source") or {}).get("file_type"))
+        else:
+            events = _json_events(blob_name)
+        # fail before the headers go out if the blob is unreadable
+        first = await anext(events, None)
+    except ValueError:
         raise HTTPException(status_code=500, detail="Stored result file is corrupted.")
-
-    # Remove any Mongo leftover IDs
-    result_json.pop("_id", None)
-
-    # ---------------- JSON DOWNLOAD ----------------
-    if format.lower() == "json":
-        return StreamingResponse(
-            io.BytesIO(
-                json.dumps(result_json, indent=4, default=str).encode("utf-8")
-            ),
-            media_type="application/json",
-            headers={
-                "Content-Disposition": f"attachment; filename=analysis_{result_id}.json"
-            }
-        )
-
-    # ---------------- CSV DOWNLOAD ----------------
-    if format.lower() == "csv":
-
-        if "rows" not in result_json:
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Failed to read result: {exc}")
+
+    events = _window(_prepend(first, events), offset, stop)
+    if fmt == "csv":
+        # a CSV without rows has no header either; refuse before responding
+        first_row = None
+        async for event in events:
+            if event[0] == "row":
+                first_row = event
+                break
+        if first_row is None:
             raise HTTPException(status_code=400, detail="This result contains no rows to export.")
+        events = _prepend(first_row, events)
+    body = _export_json(events) if fmt == "json" else _export_csv(events, columns)
 
-        output = io.StringIO()
-        writer = None
-
-        for row in result_json["rows"]:
-            if writer is None:
-                writer = csv.DictWriter(output, fieldnames=row.keys())
-                writer.writeheader()
-            writer.writerow(row)
-
-        csv_bytes = output.getvalue().encode("utf-8")
+    headers = {
+        "Content-Disposition": f"attachment; filename=analysis_{result_id}.{fmt}",
+        "Vary": "Accept-Encoding",
+    }
+    if _accepts_gzip(accept_encoding):
+        body = _gzip(body)
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(
+        body,
+        media_type="application/json" if fmt == "json" else "text/csv",
+        headers=headers,
+    )
 
-        return StreamingResponse(
-            io.BytesIO(csv_bytes),
-            media_type="text/csv",
-            headers={
-                "Content-Disposition": f"attachment; filename=analysis_{result_id}.csv"
-            }
-        )
 
-    raise HTTPException(status_code=400, detail="Invalid format. Use ?format=json or ?format=csv.")
+# STREAMING EXPORT
+# Results are read as ("field", (key, value)), ("rows_start", None),
+# ("row", row) and ("rows_end", None) events, in document order.
+EXPORT_GZIP_LEVEL = int(os.getenv("EXPORT_GZIP_LEVEL", "6"))
+
+
+async def _json_events(blob_name: str):
+    parser = result_format.JsonResultParser()
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    async for chunk in azure_blob_service.iter_blob_chunks(blob_name):
+        for event in parser.feed(decoder.decode(chunk)):
+            yield event
+    for event in parser.feed(decoder.decode(b"", final=True)) + parser.close():
+        yield event
+
+
+async def _compact_events(blob_name: str, trailer, stop: Optional[int]):
+    for key in ("file_id", "file_name", "analysis_type", "created_at"):
+        if key in trailer:
+            yield "field", (key, trailer[key])
+    yield "rows_start", None
+    if stop != 0:
+        async with aclosing(_iter_compact_rows(blob_name, trailer)) as rows:
+            count = 0
+            async for row in rows:
+                yield "row", row
+                count += 1
+                if stop is not None and count >= stop:
+                    break
+    yield "rows_end", None
+    yield "field", ("summary", trailer["summary"])
+
+
+async def _prepend(first, events):
+    if first is None:
+        return
+    yield first
+    async for event in events:
+        yield event
+
+
+async def _window(events, offset: int, stop: Optional[int]):
+    """Drop rows outside [offset, stop) and the "_id" field."""
+    count = 0
+    async for kind, payload in events:
+        if kind == "row":
+            count += 1
+            if count <= offset or (stop is not None and count > stop):
+                continue
+        elif kind == "field" and payload[0] == "_id":
+            continue
+        yield kind, payload
+
+
+async def _export_json(events):
+    opened = False
+    first_row = True
+    parts = []
+    async for kind, payload in events:
+        if kind == "row":
+            parts.append(("" if first_row else ", ") + json.dumps(payload, default=str))
+            first_row = False
+            if len(parts) >= STREAM_BATCH_ROWS:
+                yield "".join(parts).encode("utf-8")
+                parts = []
+            continue
+
+        if kind == "rows_end":
+            parts.append("]")
+        else:
+            key = "rows" if kind == "rows_start" else payload[0]
+            parts.append(("{" if not opened else ", ") + json.dumps(key) + ": ")
+            if kind == "rows_start":
+                parts.append("[")
+                first_row = True
+            else:
+                parts.append(json.dumps(payload[1], default=str))
+            opened = True
+        yield "".join(parts).encode("utf-8")
+        parts = []
+
+    yield ("".join(parts) + ("}" if opened else "{}")).encode("utf-8")
+
+
+async def _export_csv(events, fieldnames: Optional[List[str]] = None):
+    """
+    Rows as CSV under `fieldnames`, or the first row's keys when the
+    columns are not known up front. Missing cells are left empty.
+    """
+    header = True
+    batch = []
+    async for kind, row in events:
+        if kind != "row":
+            continue
+        if header:
+            fieldnames = fieldnames or list(row.keys())
+            yield _csv_lines([], fieldnames, header=True)
+            header = False
+        batch.append(row)
+        if len(batch) >= STREAM_BATCH_ROWS:
+            yield _csv_lines(batch, fieldnames, header=False)
+            batch = []
+    if batch:
+        yield _csv_lines(batch, fieldnames, header=False)
+
+
+def _csv_lines(rows: List[Dict[str, Any]], fieldnames, header: bool) -> bytes:
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=fieldnames, restval="", extrasaction="ignore")
+    if header:
+        writer.writeheader()
+    writer.writerows(rows)
+    return output.getvalue().encode("utf-8")
+
+
+def _accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Whether Accept-Encoding allows gzip; "gzip;q=0" refuses it."""
+    qualities = {}
+    for part in (accept_encoding or "").lower().split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    for coding in ("gzip", "x-gzip", "*"):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+
+async def _gzip(chunks):
+    compressor = zlib.compressobj(EXPORT_GZIP_LEVEL, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -1,8 +1,10 @@
 from fastapi import APIRouter, HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from ..models.user_model import UserRegister, UserLogin, UserUpdate
-from ..services import db_service, jwt_service
-import bcrypt
+from ..services import db_service, jwt_service, password_service
+from ..services.auth_cache import auth_cache
+from ..services.revocation_store import revocation_store
+from datetime import datetime
 
 router = APIRouter()
 
@@ -14,31 +16,60 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(b
         raise HTTPException(status_code=401, detail="Not authenticated")
     token = credentials.credentials
 
-    if await db_service.is_blacklisted(token):
-        raise HTTPException(status_code=401, detail="Token has been invalidated.")
-
     decoded = jwt_service.decode_access_token(token)
     if not decoded:
         raise HTTPException(status_code=401, detail="Invalid or expired token.")
 
+    if await revocation_store.is_revoked(jwt_service.token_id(decoded, token)):
+        raise HTTPException(status_code=401, detail="Token has been invalidated.")
+
+    # repeat requests of a session are served from the local cache
+    await auth_cache.sync()
+    cached = auth_cache.get(token)
+    if cached is not None:
+        return cached
+    generation = auth_cache.generation
+
     user = await db_service.get_user_by_email(decoded["email"])
     if not user:
         raise HTTPException(status_code=404, detail="User not found.")
+    auth_cache.put(token, user, decoded.get("exp"), generation)
     return user
 
+async def _hash_or_503(password: str) -> bytes:
+    try:
+        return await password_service.hash_password(password)
+    except password_service.PasswordServiceBusy as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+
 @router.post("/register")
 async def register(user: UserRegister):
     existing = await db_service.get_user_by_email(user.email)
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered.")
-    await db_service.create_user(user.name, user.email, user.password)
+    password_hash = await _hash_or_503(user.password)
+    await db_service.create_user(user.name, user.email, password_hash)
     return {"message": "User registered successfully!"}
 
 @router.post("/login")
 async def login(user: UserLogin):
     db_user = await db_service.get_user_by_email(user.email)
-    if not db_user or not bcrypt.checkpw(user.password.encode("utf-8"), db_user["password"]):
+    try:
+        valid = await password_service.verify_password(
+            user.password, db_user["password"] if db_user else None
+        )
+    except password_service.PasswordServiceBusy as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials.")
+
+    # cost factor changed since this hash was made → store a fresh one
+    if password_service.needs_rehash(db_user["password"]):
+        try:
+            new_hash = await password_service.hash_password(user.password)
+            await db_service.update_user(user.email, {"password": new_hash})
+        except Exception as exc:
+            print(f" Password rehash for {user.email} skipped: {exc}")
     token = jwt_service.create_access_token({"email": user.email})
     return {"access_token": token, "token_type": "bearer"}
 
@@ -52,8 +83,9 @@ async def update_profile(update: UserUpdate, current_user=Depends(get_current_us
     if update.name: data["name"] = update.name
     if update.email: data["email"] = update.email
     if update.password:
-        data["password"] = bcrypt.hashpw(update.password.encode("utf-8"), bcrypt.gensalt())
+        data["password"] = await _hash_or_503(update.password)
     await db_service.update_user(current_user["email"], data)
+    await auth_cache.invalidate_email(current_user["email"])
     return {"message": "Profile updated successfully."}
 
 @router.post("/logout")
@@ -61,5 +93,11 @@ async def logout(credentials: HTTPAuthorizationCredentials = Depends(bearer_sche
     if not credentials:
         raise HTTPException(status_code=401, detail="Not authenticated")
     token = credentials.credentials
-    await db_service.add_to_blacklist(token)
+    decoded = jwt_service.decode_access_token(token)
+    if not decoded:
+        raise HTTPException(status_code=401, detail="Invalid or expired token.")
+    await revocation_store.revoke(
+        jwt_service.token_id(decoded, token),
+        datetime.utcfromtimestamp(decoded["exp"]),
+    )
     return {"message": "Successfully logged out."}
@@ -0,0 +1,59 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from .. import sentiment_analysis
+from ..services import metrics_service
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+
+# Set by the app lifespan: "pending" → "ready" | "failed", or "skipped"
+# when preloading is disabled (the model then loads on first use).
+warmup_state = {"state": "pending", "error": None}
+
+
+@router.get("/live")
+async def liveness():
+    """The process is up and serving requests."""
+    return {"status": "alive"}
+
+
+@router.get("/ready")
+async def readiness():
+    """Only 200 once the model is loaded and warmed up in this worker."""
+    body = {
+        "status": warmup_state["state"],
+        "engine": sentiment_analysis.SENTIMENT_ENGINE,
+        "model_load_seconds": sentiment_analysis.model_load_seconds,
+    }
+    if warmup_state["state"] not in ("ready", "skipped"):
+        body["error"] = warmup_state["error"]
+        return JSONResponse(status_code=503, content=body)
+    return body
+
+
+# METRICS (Prometheus text format, outside the /health prefix)
+metrics_router = APIRouter(tags=["Health"])
+
+queue_depth = metrics_service.gauge(
+    "sentiment_inference_queue_depth",
+    "Texts waiting in the micro-batcher queue.",
+)
+cache_hit_ratio = metrics_service.gauge(
+    "sentiment_cache_hit_ratio",
+    "Sentiment cache hits over lookups since start.",
+)
+
+
+@metrics_router.get("/metrics")
+async def metrics():
+    """Per-stage latency histograms, batcher and cache metrics of this worker."""
+    if not metrics_service.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled.")
+
+    queue_depth.set(sentiment_analysis.batcher.stats()["queue_depth"])
+    cache_hit_ratio.set(sentiment_analysis.cache.stats()["hit_ratio"])
+    return PlainTextResponse(
+        metrics_service.render_prometheus(),
+        media_type="text/plain; version=0.0.4",
+    )
@@ -1,12 +1,107 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query
+from typing import Optional
 from ..services import azure_blob_service, db_service
+from ..services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor
 from ..models.file_model import FileMeta
+from ..text_parsing import detect_file_type, make_parser
 from .auth_routes import get_current_user
 from datetime import datetime
 from uuid import uuid4
+import asyncio
+import codecs
+import csv
+import hashlib
+import os
 
 router = APIRouter()
 
+# Largest accepted upload; bigger files are rejected with 413
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(512 * 1024 * 1024)))
+
+
+class _UploadScanner:
+    """
+    Hash, line count and row count of an upload, fed block by block.
+    A CSV the row parser rejects gets row count None.
+    """
+
+    def __init__(self, file_type: str):
+        self.digest = hashlib.sha256()
+        self.lines = 0
+        self.rows = 0
+        self.last_byte = b""
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        self._parser = make_parser(file_type)
+
+    def _count_rows(self, text: str, final: bool = False):
+        if self._parser is None:
+            return
+        try:
+            self.rows += len(self._parser.feed(text))
+            if final:
+                self.rows += len(self._parser.close())
+        except csv.Error:
+            self._parser, self.rows = None, None
+
+    def scan(self, chunk: bytes):
+        self.digest.update(chunk)
+        self.lines += chunk.count(b"\n")
+        self.last_byte = chunk[-1:]
+        self._count_rows(self._decoder.decode(chunk))
+
+    def finish(self):
+        self._count_rows(self._decoder.decode(b"", final=True), final=True)
+        if self.last_byte and self.last_byte != b"\n":
+            self.lines += 1
+
+
+async def _stream_to_blob(file: UploadFile, blob_name: str, file_type: str):
+    """
+    Copy an upload to a block blob one block at a time, hashing and
+    counting lines/rows as the bytes pass. Memory stays at a few blocks
+    per upload whatever the file size. Each block is scanned in a worker
+    thread while it is staged, so large uploads do not block the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    writer = azure_blob_service.BlockBlobWriter(blob_name)
+    scanner = _UploadScanner(file_type)
+    scanning = None
+    size = 0
+
+    try:
+        while True:
+            chunk = await file.read(writer.block_size)
+            # blocks are scanned in order: wait for the previous one
+            if scanning is not None:
+                await scanning
+                scanning = None
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > UPLOAD_MAX_BYTES:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"File exceeds the {UPLOAD_MAX_BYTES} byte upload limit.",
+                )
+            scanning = loop.run_in_executor(None, scanner.scan, chunk)
+            await writer.write(chunk)
+
+        await loop.run_in_executor(None, scanner.finish)
+        url = await writer.close()
+    except BaseException:
+        if scanning is not None:
+            await asyncio.gather(scanning, return_exceptions=True)
+        await writer.abort()
+        raise
+
+    return {
+        "url": url,
+        "size_bytes": size,
+        "content_sha256": scanner.digest.hexdigest(),
+        "line_count": scanner.lines,
+        "row_count": scanner.rows,
+    }
+
 
 # === Upload a file ===
 @router.post("/uploads")
@@ -14,24 +109,26 @@ async def upload_user_file(file: UploadFile = File(...), current_user=Depends(ge
     """Upload .txt or .csv file to Azure Blob Storage and save metadata in MongoDB."""
     if not (file.filename.endswith(".txt") or file.filename.endswith(".csv")):
         raise HTTPException(status_code=400, detail="Only .txt or .csv files allowed")
+    if file.size is not None and file.size > UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"File exceeds the {UPLOAD_MAX_BYTES} byte upload limit.")
 
     try:
-        # Upload to Azure Blob
-        upload_result = await azure_blob_service.upload_file_to_blob(
-            await file.read(),
-            file.filename,
-            current_user["email"],
-            is_result=False
-        )
+        # Stream to Azure Blob
+        blob_name = azure_blob_service.make_blob_name(file.filename, current_user["email"], is_result=False)
+        stored = await _stream_to_blob(file, blob_name, detect_file_type(file.filename))
 
         # Prepare metadata model
         file_data = FileMeta(
             id=str(uuid4()),
             user_email=current_user["email"],
             file_name=file.filename,
-            blob_name=upload_result["blob_name"],
-            blob_url=upload_result["url"],
-            uploaded_at=datetime.utcnow()
+            blob_name=blob_name,
+            blob_url=stored["url"],
+            uploaded_at=datetime.utcnow(),
+            content_sha256=stored["content_sha256"],
+            size_bytes=stored["size_bytes"],
+            line_count=stored["line_count"],
+            row_count=stored["row_count"],
         )
 
         # Save metadata in MongoDB
@@ -39,20 +136,38 @@ async def upload_user_file(file: UploadFile = File(...), current_user=Depends(ge
 
         return {"message": "File uploaded successfully", "file_info": file_data.dict()}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 # === List all uploaded files for current user ===
 @router.get("/uploads")
-async def list_user_uploads(current_user=Depends(get_current_user)):
-    """List all files uploaded by the current user."""
+async def list_user_uploads(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    current_user=Depends(get_current_user),
+):
+    """
+    List the current user's uploads, newest first. Pass `next_cursor` of
+    a page as `cursor` to fetch the next one.
+    """
     try:
-        files = await db_service.get_user_files(current_user["email"])
-        return {"uploads": files}
+        page = await db_service.get_user_files(
+            current_user["email"], limit=limit, cursor=cursor, include_total=include_total
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    body = {"uploads": page["items"], "next_cursor": page["next_cursor"]}
+    if include_total:
+        body["total"] = page["total"]
+    return body
+
 
 # === Get details for a specific file ===
 @router.get("/uploads/{file_id}")
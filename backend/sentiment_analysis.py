@@ -1,84 +1,624 @@
 # backend/sentiment_analysis.py
 
-from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
-from typing import List, Dict, Any
+import os
+import threading
+import time
+from typing import List, Dict, Any, Optional
+
+from .inference_engine import MicroBatcher
+from .sentiment_cache import SentimentCache, text_key
+from .services import metrics_service
+
+# Hub id or local directory (e.g. a small model for offline benchmarks)
+MODEL_NAME = os.getenv("SENTIMENT_MODEL_NAME", "cardiffnlp/twitter-xlm-roberta-base-sentiment")
+
+# Inference engine: "torch" (fp32 eager), "torch-int8" (dynamic int8
+# quantization of Linear layers), "onnx" (ONNX Runtime via optimum) or
+# "stub" (lexicon stand-in for benchmarks and local runs, no model).
+SENTIMENT_ENGINE = os.getenv("SENTIMENT_ENGINE", "torch")
+
+# Directory of an exported ONNX graph; exported there on first use if empty
+SENTIMENT_ONNX_PATH = os.getenv("SENTIMENT_ONNX_PATH", "")
 
 # Lazy load model to prevent startup timeout (especially in Azure)
 sentiment_model = None
+tokenizer = None
+model_load_seconds = None
+model_ready = False
+_model_lock = threading.Lock()
+
+# Micro-batching settings (shared across concurrent requests)
+INFERENCE_MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "32"))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "10"))
+INFERENCE_MAX_QUEUE_DEPTH = int(os.getenv("INFERENCE_MAX_QUEUE_DEPTH", "4096"))
+
+# Length-bucketed batching: rows longer than INFERENCE_MAX_TOKENS are
+# truncated, and each forward pass is capped at INFERENCE_TOKEN_BUDGET
+# padded tokens (batch size x longest row in the batch).
+INFERENCE_MAX_TOKENS = int(os.getenv("INFERENCE_MAX_TOKENS", "512"))
+INFERENCE_TOKEN_BUDGET = int(os.getenv("INFERENCE_TOKEN_BUDGET", "8192"))
+INFERENCE_LENGTH_BUCKETING = os.getenv("INFERENCE_LENGTH_BUCKETING", "true").lower() == "true"
+
+# Bucketing estimates row lengths from characters, so rows are tokenized
+# only once, inside the forward pass.
+INFERENCE_CHARS_PER_TOKEN = float(os.getenv("INFERENCE_CHARS_PER_TOKEN", "4"))
+
+# Identifies everything that changes results; stored with each analysis so
+# a re-run of identical content can reuse the earlier result.
+MODEL_VERSION = os.getenv(
+    "SENTIMENT_MODEL_VERSION",
+    f"{MODEL_NAME}/{SENTIMENT_ENGINE}/max{INFERENCE_MAX_TOKENS}",
+)
+
+# Long-document mode: windows of INFERENCE_MAX_TOKENS overlapping by
+# LONG_TEXT_OVERLAP_TOKENS tokens.
+LONG_TEXT_OVERLAP_TOKENS = int(os.getenv("LONG_TEXT_OVERLAP_TOKENS", "64"))
+
+_padding_stats = {"real_tokens": 0, "padded_tokens": 0, "forward_passes": 0}
+
+# Per-text result cache: in-process LRU plus an optional SQLite file
+SENTIMENT_CACHE_ENABLED = os.getenv("SENTIMENT_CACHE_ENABLED", "true").lower() == "true"
+SENTIMENT_CACHE_MAX_ENTRIES = int(os.getenv("SENTIMENT_CACHE_MAX_ENTRIES", "100000"))
+SENTIMENT_CACHE_SQLITE_PATH = os.getenv("SENTIMENT_CACHE_SQLITE_PATH", "")
+
+cache = SentimentCache(
+    max_entries=SENTIMENT_CACHE_MAX_ENTRIES if SENTIMENT_CACHE_ENABLED else 0,
+    sqlite_path=SENTIMENT_CACHE_SQLITE_PATH if SENTIMENT_CACHE_ENABLED else None,
+)
+
+
+# INFERENCE ENGINES
+# Each loader returns (pipeline, tokenizer). transformers is imported
+# inside the loaders so the stub engine runs without torch installed.
+def _hf_pipeline(model, tok):
+    from transformers import pipeline
+    return pipeline("sentiment-analysis", model=model, tokenizer=tok), tok
+
+
+def _load_torch():
+    from transformers import AutoTokenizer
+    return _hf_pipeline(MODEL_NAME, AutoTokenizer.from_pretrained(MODEL_NAME))
+
+
+def _load_torch_int8():
+    import torch
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+    fp32 = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME)
+    fp32.eval()
+    model = torch.quantization.quantize_dynamic(fp32, {torch.nn.Linear}, dtype=torch.qint8)
+    return _hf_pipeline(model, AutoTokenizer.from_pretrained(MODEL_NAME))
+
+
+def _load_onnx():
+    from transformers import AutoTokenizer
+    try:
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+    except ImportError:
+        raise RuntimeError(
+            "The 'onnx' engine needs optimum with ONNX Runtime: pip install optimum[onnxruntime]"
+        )
+
+    tok = AutoTokenizer.from_pretrained(MODEL_NAME)
+    path = SENTIMENT_ONNX_PATH
+    if path and os.path.exists(os.path.join(path, "model.onnx")):
+        return _hf_pipeline(ORTModelForSequenceClassification.from_pretrained(path), tok)
+
+    model = ORTModelForSequenceClassification.from_pretrained(MODEL_NAME, export=True)
+    if path:
+        model.save_pretrained(path)
+        tok.save_pretrained(path)
+    return _hf_pipeline(model, tok)
+
+
+def _load_stub():
+    from .stub_model import StubSentimentPipeline, StubTokenizer
+
+    tok = StubTokenizer()
+    return StubSentimentPipeline(tok), tok
+
+
+ENGINES = {
+    "torch": _load_torch,
+    "torch-int8": _load_torch_int8,
+    "onnx": _load_onnx,
+    "stub": _load_stub,
+}
+
+
+def build_pipeline(engine: str):
+    """
+    Build a sentiment pipeline (and its tokenizer) for the given engine.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown SENTIMENT_ENGINE '{engine}'. Use one of: {', '.join(ENGINES)}")
+    return ENGINES[engine]()
 
 
 def get_model():
-    global sentiment_model, tokenizer
+    global sentiment_model, tokenizer, model_load_seconds
     if sentiment_model is None:
-        model_name = "cardiffnlp/twitter-xlm-roberta-base-sentiment"
-        tokenizer = AutoTokenizer.from_pretrained(model_name)
-        sentiment_model = pipeline(
-            "sentiment-analysis",
-            model=model_name,
-            tokenizer=tokenizer
-        )
+        with _model_lock:
+            if sentiment_model is None:
+                started = time.perf_counter()
+                sentiment_model, tokenizer = build_pipeline(SENTIMENT_ENGINE)
+                model_load_seconds = time.perf_counter() - started
+                metrics_service.model_load_seconds.set(model_load_seconds, engine=SENTIMENT_ENGINE)
     return sentiment_model
 
 
+_WARMUP_TEXTS = [
+    "ok",
+    "This is fine.",
+    "I really did not expect the service to be this slow today.",
+    " ".join(["The update went out on time and everyone was happy."] * 40),
+]
+
+
+def warm_up_model(rounds: int = 3):
+    """
+    Load the model and push a few dummy batches of mixed lengths through
+    it, so the first real request does not pay for lazy initialisation.
+    Bypasses the result cache on purpose.
+    """
+    global model_ready
+    get_model()
+    for _ in range(rounds):
+        _run_model(_WARMUP_TEXTS)
+    model_ready = True
+
+
+def _estimated_lengths(texts: List[str]) -> List[int]:
+    """
+    Approximate token count of each text after truncation, special tokens
+    included, from its length in characters. Close enough to group rows
+    of similar length without a second tokenizer pass.
+    """
+    per_token = max(INFERENCE_CHARS_PER_TOKEN, 0.1)
+    return [min(INFERENCE_MAX_TOKENS, int(len(t) / per_token) + 2) for t in texts]
+
+
+def _length_buckets(lengths: List[int]) -> List[List[int]]:
+    """
+    Group indices (shortest first) into batches whose padded size,
+    len(batch) * longest row, stays within INFERENCE_TOKEN_BUDGET.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    buckets = []
+    current = []
+    for i in order:
+        # sorted ascending, so lengths[i] is the longest row so far
+        if current and (len(current) + 1) * lengths[i] > INFERENCE_TOKEN_BUDGET:
+            buckets.append(current)
+            current = []
+        current.append(i)
+    if current:
+        buckets.append(current)
+    return buckets
+
+
+def _forward(texts: List[str], model=None) -> List[Dict[str, Any]]:
+    model = model or get_model()
+    with metrics_service.stage_seconds.time(stage="model_forward"):
+        outputs = model(
+            texts,
+            batch_size=len(texts),
+            truncation=True,
+            max_length=INFERENCE_MAX_TOKENS,
+        )
+    return [
+        {"label": o["label"], "score": float(o["score"])}
+        for o in outputs
+    ]
+
+
+def _run_model(texts: List[str]) -> List[Dict[str, Any]]:
+    """
+    Run a batch collected by the micro-batcher.
+    With length bucketing on, the batch is split into similar-length
+    sub-batches under the token budget; results keep the input order.
+    """
+    if not INFERENCE_LENGTH_BUCKETING or len(texts) == 1:
+        return _forward(texts)
+
+    lengths = _estimated_lengths(texts)
+    results = [None] * len(texts)
+    for bucket in _length_buckets(lengths):
+        outputs = _forward([texts[i] for i in bucket])
+        for i, out in zip(bucket, outputs):
+            results[i] = out
+
+        _padding_stats["forward_passes"] += 1
+        _padding_stats["real_tokens"] += sum(lengths[i] for i in bucket)
+        _padding_stats["padded_tokens"] += len(bucket) * max(lengths[i] for i in bucket)
+    return results
+
+
+def _record_batch(size: int, waits: List[float]):
+    if not metrics_service.METRICS_ENABLED:
+        return
+    metrics_service.inference_batch_size.observe(size)
+    for wait in waits:
+        metrics_service.inference_queue_wait_seconds.observe(wait)
+
+
+batcher = MicroBatcher(
+    _run_model,
+    max_batch_size=INFERENCE_MAX_BATCH_SIZE,
+    max_wait_ms=INFERENCE_MAX_WAIT_MS,
+    max_queue_depth=INFERENCE_MAX_QUEUE_DEPTH,
+    on_flush=_record_batch,
+)
+
+
+def get_inference_stats() -> Dict[str, Any]:
+    """
+    Settings and counters of the shared micro-batcher, length bucketing
+    and result cache.
+    """
+    padded = _padding_stats["padded_tokens"]
+    return {
+        "engine": SENTIMENT_ENGINE,
+        "model_version": MODEL_VERSION,
+        "model_load_seconds": model_load_seconds,
+        "model_ready": model_ready,
+        "cache": {"enabled": SENTIMENT_CACHE_ENABLED, **cache.stats()},
+        **batcher.stats(),
+        "length_bucketing": INFERENCE_LENGTH_BUCKETING,
+        "max_tokens": INFERENCE_MAX_TOKENS,
+        "token_budget": INFERENCE_TOKEN_BUDGET,
+        "bucketed_forward_passes": _padding_stats["forward_passes"],
+        # from estimated row lengths
+        "padding_efficiency": (_padding_stats["real_tokens"] / padded) if padded else 1.0,
+    }
+
 
 def analyze_text(text: str) -> Dict[str, Any]:
     """
     Analyze the sentiment of a single text string.
     Returns a dict with label and score.
     """
-    model = get_model()
-    result = model(text)[0]
-    return {
-        "label": result["label"],
-        "score": float(result["score"]),
-    }
+    return analyze_many([text])[0]
 
 
 def analyze_many(texts: List[str]) -> List[Dict[str, Any]]:
     """
     Analyze a list of texts in one go.
+    Duplicates and cached texts are answered without inference; the rest
+    are batched together with those of concurrent callers.
     Returns a list of {label, score}.
     """
     if not texts:
         return []
 
-    model = get_model()
-    outputs = model(texts)
-    return [
-        {"label": o["label"], "score": float(o["score"])}
-        for o in outputs
-    ]
+    if not SENTIMENT_CACHE_ENABLED:
+        return _infer_in_buckets(texts)
 
+    keys = [text_key(t, MODEL_VERSION) for t in texts]
 
-def build_summary(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    # collapse duplicates within the call before touching cache or model
+    unique: Dict[bytes, str] = {}
+    for key, text in zip(keys, texts):
+        unique.setdefault(key, text)
+    cache.record_duplicates(len(texts) - len(unique))
+
+    known = cache.get_many(list(unique))
+    missing = [k for k in unique if k not in known]
+    metrics_service.cache_lookups.inc(len(unique) - len(missing), outcome="hit")
+    metrics_service.cache_lookups.inc(len(missing), outcome="miss")
+    metrics_service.cache_lookups.inc(len(texts) - len(unique), outcome="duplicate")
+    if missing:
+        outputs = _infer_in_buckets([unique[k] for k in missing])
+        fresh = dict(zip(missing, outputs))
+        cache.put_many(fresh)
+        known.update(fresh)
+
+    return [dict(known[k]) for k in keys]
+
+
+def _infer_in_buckets(texts: List[str]) -> List[Dict[str, Any]]:
+    if not INFERENCE_LENGTH_BUCKETING:
+        return batcher.run(texts)
+
+    # Submit shortest-first so consecutive micro-batches hold rows of
+    # similar length, then put results back in the caller's order.
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    outputs = batcher.run([texts[i] for i in order])
+    results = [None] * len(texts)
+    for i, out in zip(order, outputs):
+        results[i] = out
+    return results
+
+
+class LongTextAccumulator:
     """
-    Build file-level summary stats from row-level results.
+    Overlapping-window analysis of a document fed in pieces.
+
+    Pieces are joined with newlines. Whenever the pending text holds a
+    full window it is tokenized, the complete windows are analyzed and
+    folded into running label statistics, and only the text from the next
+    window start on is kept, so memory does not grow with the document.
+    Each window carries the number of tokens it adds beyond the previous
+    window (its weight), so weights sum to the document's token count.
+    """
+
+    def __init__(self):
+        self._pending = ""
+        self._started = False
+        # tokens at the start of the pending text already weighed by the
+        # previous window (the overlap)
+        self._covered = 0
+        self.count = 0
+        self.tokens = 0
+        self._mass: Dict[str, float] = {}
+        self._weights: Dict[str, float] = {}
+        self._counts: Dict[str, int] = {}
+        self._min_score = 1.0
+        self._max_score = 0.0
+        self._score_sum = 0.0
+
+    def feed(self, text: str):
+        self._pending += ("\n" if self._started else "") + text
+        self._started = True
+        self._analyze(self._cut(final=False))
+
+    def close(self):
+        self._analyze(self._cut(final=True))
+        self._pending = ""
+
+    def _cut(self, final: bool) -> List[Dict[str, Any]]:
+        get_model()
+        text = self._pending
+        encoded = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+        offsets = encoded["offset_mapping"]
+        total = len(offsets)
+
+        window = max(1, INFERENCE_MAX_TOKENS - 2)   # room for <s> and </s>
+        overlap = min(max(0, LONG_TEXT_OVERLAP_TOKENS), window - 1)
+        step = window - overlap
+
+        windows = []
+        start = 0
+        covered = self._covered
+        while start < total:
+            end = min(start + window, total)
+            # the last window may still grow with the next piece
+            if end == total and not final:
+                break
+            windows.append({
+                "text": text[offsets[start][0]:offsets[end - 1][1]],
+                "weight": end - covered,
+            })
+            covered = end
+            if end == total:
+                break
+            start += step
+
+        if not final:
+            self._pending = text[offsets[start][0]:] if start < total else ""
+            self._covered = max(0, covered - start) if start < total else 0
+        return windows
+
+    def _analyze(self, windows: List[Dict[str, Any]]):
+        windows = [w for w in windows if w["text"].strip()]
+        if not windows:
+            return
+        outputs = analyze_many([w["text"] for w in windows])
+        for w, out in zip(windows, outputs):
+            self._mass[out["label"]] = self._mass.get(out["label"], 0.0) + w["weight"] * out["score"]
+            self._weights[out["label"]] = self._weights.get(out["label"], 0.0) + w["weight"]
+            self._counts[out["label"]] = self._counts.get(out["label"], 0) + 1
+            self._min_score = min(self._min_score, out["score"])
+            self._max_score = max(self._max_score, out["score"])
+            self._score_sum += out["score"]
+            self.tokens += w["weight"]
+        self.count += len(windows)
+
+    def build(self) -> Dict[str, Any]:
+        if not self.count:
+            return {"label": None, "score": 0.0, "chunks": {"count": 0, "tokens": 0}}
+
+        label = max(self._mass, key=self._mass.get)
+        return {
+            "label": label,
+            # confidence of the winning label, comparable to row scores; its
+            # share of the document is in chunks.label_weights
+            "score": self._mass[label] / self._weights[label],
+            "chunks": {
+                "count": self.count,
+                "tokens": self.tokens,
+                "window_tokens": INFERENCE_MAX_TOKENS,
+                "overlap_tokens": LONG_TEXT_OVERLAP_TOKENS,
+                "label_counts": dict(self._counts),
+                "label_weights": {k: v / self.tokens for k, v in self._weights.items()},
+                "min_score": self._min_score,
+                "max_score": self._max_score,
+                "mean_score": self._score_sum / self.count,
+            },
+        }
+
+
+def analyze_long_text(text: str) -> Dict[str, Any]:
+    """
+    Analyze a document of any length with overlapping windows.
+    Returns the length-weighted overall label and score plus per-chunk stats.
+    """
+    acc = LongTextAccumulator()
+    acc.feed(text)
+    acc.close()
+    return acc.build()
+
+
+class SummaryAccumulator:
     """
-    total = len(results)
-    if total == 0:
+    Running label counts, so summaries can be built without keeping
+    every row-level result in memory.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.positive = 0
+        self.negative = 0
+
+    def add(self, results: List[Dict[str, Any]]):
+        for r in results:
+            label = r["label"].upper()
+            self.total += 1
+            if label.startswith("POS"):
+                self.positive += 1
+            elif label.startswith("NEG"):
+                self.negative += 1
+
+    def build(self) -> Dict[str, Any]:
+        if self.total == 0:
+            return {
+                "total": 0,
+                "positive": 0,
+                "negative": 0,
+                "neutral": 0,
+                "overall": None,
+            }
+
+        pos, neg = self.positive, self.negative
+        if pos > neg:
+            overall = "POSITIVE"
+        elif neg > pos:
+            overall = "NEGATIVE"
+        else:
+            overall = "MIXED"
+
         return {
-            "total": 0,
-            "positive": 0,
-            "negative": 0,
-            "neutral": 0,
-            "overall": None,
+            "total": self.total,
+            "positive": pos,
+            "negative": neg,
+            "neutral": self.total - pos - neg,
+            "overall": overall,
         }
 
-    pos = sum(1 for r in results if r["label"].upper().startswith("POS"))
-    neg = sum(1 for r in results if r["label"].upper().startswith("NEG"))
-    neu = total - pos - neg
 
-    if pos > neg:
-        overall = "POSITIVE"
-    elif neg > pos:
-        overall = "NEGATIVE"
-    else:
-        overall = "MIXED"
+def build_summary(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Build file-level summary stats from row-level results.
+    """
+    acc = SummaryAccumulator()
+    acc.add(results)
+    return acc.build()
+
+
+
+# ENGINE AGREEMENT AND BENCHMARK
+def _rss_bytes() -> int:
+    """Current resident set size of this process (Linux), else peak RSS."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def check_engine_agreement(
+    texts: List[str],
+    engine: str,
+    max_label_mismatch: float = 0.01,
+    score_tolerance: float = 0.05,
+    reference=None,
+    candidate=None,
+) -> Dict[str, Any]:
+    """
+    Compare an engine's predictions with fp32 PyTorch on `texts`.
+    Passes when at most `max_label_mismatch` of the labels differ and no
+    score moves by more than `score_tolerance` where the labels agree.
+    """
+    reference = reference or build_pipeline("torch")[0]
+    candidate = candidate or build_pipeline(engine)[0]
+
+    expected = _forward(texts, reference)
+    actual = _forward(texts, candidate)
+
+    mismatches = [i for i, (e, a) in enumerate(zip(expected, actual)) if e["label"] != a["label"]]
+    score_diffs = [
+        abs(e["score"] - a["score"])
+        for e, a in zip(expected, actual)
+        if e["label"] == a["label"]
+    ]
+    mismatch_rate = len(mismatches) / len(texts) if texts else 0.0
+    max_score_diff = max(score_diffs) if score_diffs else 0.0
 
     return {
-        "total": total,
-        "positive": pos,
-        "negative": neg,
-        "neutral": neu,
-        "overall": overall,
+        "engine": engine,
+        "rows": len(texts),
+        "label_agreement": 1.0 - mismatch_rate,
+        "max_score_diff": max_score_diff,
+        "mismatched_rows": mismatches[:20],
+        "passed": mismatch_rate <= max_label_mismatch and max_score_diff <= score_tolerance,
     }
+
+
+def benchmark_engines(
+    texts: List[str],
+    engines: Optional[List[str]] = None,
+    batch_size: int = 32,
+    check_agreement: bool = True,
+) -> List[Dict[str, Any]]:
+    """
+    Load each engine, run `texts` through it in batches and report load
+    time, rows/sec and memory, plus agreement with fp32 PyTorch.
+    """
+    engines = engines or [e for e in ENGINES if e != "stub"]
+    reference = build_pipeline("torch")[0] if check_agreement else None
+    report = []
+
+    for engine in engines:
+        rss_before = _rss_bytes()
+        started = time.perf_counter()
+        try:
+            pipe = build_pipeline(engine)[0]
+        except Exception as exc:
+            report.append({"engine": engine, "error": str(exc)})
+            continue
+        load_seconds = time.perf_counter() - started
+        rss_loaded = _rss_bytes()
+
+        _forward(texts[:batch_size], pipe)   # warm-up
+
+        started = time.perf_counter()
+        peak = rss_loaded
+        for start in range(0, len(texts), batch_size):
+            _forward(texts[start:start + batch_size], pipe)
+            peak = max(peak, _rss_bytes())
+        elapsed = time.perf_counter() - started
+
+        entry = {
+            "engine": engine,
+            "rows": len(texts),
+            "load_seconds": load_seconds,
+            "rows_per_second": len(texts) / elapsed if elapsed else 0.0,
+            "model_memory_bytes": rss_loaded - rss_before,
+            "peak_rss_bytes": peak,
+        }
+        if check_agreement:
+            entry["agreement"] = check_engine_agreement(
+                texts, engine, reference=reference, candidate=pipe
+            )
+        report.append(entry)
+
+        del pipe
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Benchmark sentiment inference engines.")
+    parser.add_argument("corpus", help="text file, one row per line")
+    parser.add_argument("--engines", default="torch,torch-int8,onnx")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding="utf-8", errors="ignore") as f:
+        rows = [ln.strip() for ln in f if ln.strip()][:args.rows]
+
+    print(json.dumps(benchmark_engines(rows, args.engines.split(","), args.batch_size), indent=4))
@@ -0,0 +1,155 @@
+# backend/sentiment_cache.py
+
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+# Rough per-entry cost of the memory tier: 32-byte key, result dict,
+# OrderedDict node. Used only for the bytes-in-use estimate.
+_ENTRY_OVERHEAD_BYTES = 360
+
+
+def normalize_text(text: str) -> str:
+    """Collapse runs of whitespace so trivially different copies share a key."""
+    return " ".join(text.split())
+
+
+def text_key(text: str, model_id: str) -> bytes:
+    """Content address of a text for a given model."""
+    h = hashlib.sha256()
+    h.update(model_id.encode("utf-8"))
+    h.update(b"\0")
+    h.update(normalize_text(text).encode("utf-8"))
+    return h.digest()
+
+
+class SentimentCache:
+    """
+    Two-tier cache of per-text sentiment results.
+
+    The memory tier is a bounded LRU; the optional persistent tier is a
+    local SQLite file shared by every worker on the host. Lookups fall
+    through memory -> SQLite, and SQLite hits are promoted into memory.
+    """
+
+    def __init__(self, max_entries: int = 100000, sqlite_path: Optional[str] = None):
+        self.max_entries = max(0, max_entries)
+        self.sqlite_path = sqlite_path or None
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[bytes, Dict[str, Any]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._db = None
+        self._db_pid = None
+
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.deduplicated = 0
+
+    def _connection(self):
+        # SQLite handles must not cross fork(), so each process opens its own
+        if not self.sqlite_path:
+            return None
+        if self._db is None or self._db_pid != os.getpid():
+            self._db = sqlite3.connect(self.sqlite_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sentiment_cache ("
+                "key BLOB PRIMARY KEY, label TEXT NOT NULL, score REAL NOT NULL)"
+            )
+            self._db.commit()
+            self._db_pid = os.getpid()
+        return self._db
+
+    @staticmethod
+    def _entry_size(result: Dict[str, Any]) -> int:
+        return _ENTRY_OVERHEAD_BYTES + len(result["label"])
+
+    def _remember(self, key: bytes, result: Dict[str, Any]):
+        if self.max_entries == 0:
+            return
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return
+        self._entries[key] = result
+        self._memory_bytes += self._entry_size(result)
+        while len(self._entries) > self.max_entries:
+            _, old = self._entries.popitem(last=False)
+            self._memory_bytes -= self._entry_size(old)
+
+    def get_many(self, keys: List[bytes]) -> Dict[bytes, Dict[str, Any]]:
+        """
+        Return cached results for the given keys; missing keys are absent.
+        """
+        found = {}
+        with self._lock:
+            for key in keys:
+                result = self._entries.get(key)
+                if result is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = result
+            self.memory_hits += len(found)
+
+            missing = [k for k in keys if k not in found]
+            db = self._connection()
+            if missing and db is not None:
+                # SQLite caps bound parameters per statement
+                for start in range(0, len(missing), 500):
+                    part = missing[start:start + 500]
+                    marks = ",".join("?" * len(part))
+                    rows = db.execute(
+                        f"SELECT key, label, score FROM sentiment_cache WHERE key IN ({marks})",
+                        part,
+                    ).fetchall()
+                    for key, label, score in rows:
+                        result = {"label": label, "score": float(score)}
+                        found[key] = result
+                        self._remember(key, result)
+                        self.persistent_hits += 1
+
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items: Dict[bytes, Dict[str, Any]]):
+        with self._lock:
+            for key, result in items.items():
+                self._remember(key, result)
+            db = self._connection()
+            if db is not None and items:
+                db.executemany(
+                    "INSERT OR REPLACE INTO sentiment_cache (key, label, score) VALUES (?, ?, ?)",
+                    [(k, r["label"], r["score"]) for k, r in items.items()],
+                )
+                db.commit()
+
+    def record_duplicates(self, count: int):
+        with self._lock:
+            self.deduplicated += count
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._memory_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.memory_hits + self.persistent_hits
+        lookups = hits + self.misses
+        persistent_bytes = 0
+        if self.sqlite_path and os.path.exists(self.sqlite_path):
+            persistent_bytes = os.path.getsize(self.sqlite_path)
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "memory_bytes": self._memory_bytes,
+            "persistent_path": self.sqlite_path,
+            "persistent_bytes": persistent_bytes,
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_ratio": (hits / lookups) if lookups else 0.0,
+            "deduplicated": self.deduplicated,
+        }
@@ -0,0 +1,147 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from . import db_service
+
+
+# Seconds a resolved user stays cached; also the upper bound on how long
+# another worker can serve a stale profile if syncing fails.
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "30"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+
+# How often a worker pulls invalidations published by the other workers.
+AUTH_CACHE_SYNC_SECONDS = float(os.getenv("AUTH_CACHE_SYNC_SECONDS", "2"))
+
+# Re-read this much of the log on every sync to tolerate clock skew
+# between the workers that write it.
+_SYNC_OVERLAP = timedelta(seconds=5)
+
+
+def token_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class AuthCache:
+    """
+    Bounded LRU of token → user document for get_current_user.
+
+    An entry lives until the earlier of AUTH_CACHE_TTL and the token's own
+    expiry. Revoked tokens are rejected by the revocation store before the
+    cache is consulted. Profile updates invalidate locally at once and
+    publish to the `auth_invalidations` collection; every worker replays
+    that log at most once per AUTH_CACHE_SYNC_SECONDS, so repeat requests
+    from a session cost no per-request DB round-trip.
+    """
+
+    def __init__(self, ttl: float = AUTH_CACHE_TTL, max_entries: int = AUTH_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._by_email: Dict[str, set] = {}
+        # bumped on every invalidation, so a lookup that raced with one
+        # does not put a stale user back
+        self.generation = 0
+        self._synced_until: Optional[datetime] = None
+        self._next_sync = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        key = token_key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        user, expires_at = entry
+        if expires_at <= time.time():
+            self._drop(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return dict(user)
+
+    def put(self, token: str, user: Dict[str, Any], token_exp: Optional[float], generation: int):
+        if not self.enabled or generation != self.generation:
+            return
+        expires_at = time.time() + self.ttl
+        if token_exp:
+            expires_at = min(expires_at, token_exp)
+
+        key = token_key(token)
+        self._drop(key)
+        self._entries[key] = (dict(user), expires_at)
+        self._by_email.setdefault(user["email"], set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._by_email.get(entry[0]["email"])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_email[entry[0]["email"]]
+
+    def drop_email(self, email: str):
+        self.generation += 1
+        for key in list(self._by_email.get(email, ())):
+            self._drop(key)
+
+    def clear(self):
+        self.generation += 1
+        self._entries.clear()
+        self._by_email.clear()
+
+    # CROSS-WORKER INVALIDATION
+    async def invalidate_email(self, email: str):
+        self.drop_email(email)
+        await db_service.publish_auth_invalidation(email)
+
+    async def sync(self):
+        """Apply invalidations other workers published since the last sync."""
+        if not self.enabled or time.monotonic() < self._next_sync:
+            return
+        self._next_sync = time.monotonic() + AUTH_CACHE_SYNC_SECONDS
+
+        started = datetime.utcnow()
+        if self._synced_until is None:
+            # nothing is cached yet, so earlier events are irrelevant
+            self._synced_until = started
+            return
+
+        try:
+            events = await db_service.get_auth_invalidations_since(self._synced_until - _SYNC_OVERLAP)
+        except Exception as exc:
+            # entries still expire after AUTH_CACHE_TTL; drop them all to be safe
+            print(f" Auth cache sync failed: {exc}")
+            self.clear()
+            return
+
+        for event in events:
+            self.drop_email(event["email"])
+        self._synced_until = started
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+        }
+
+
+auth_cache = AuthCache()
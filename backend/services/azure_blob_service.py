@@ -1,19 +1,42 @@
-from azure.storage.blob.aio import BlobServiceClient
-from typing import List
+from azure.storage.blob import BlobBlock
+from collections import deque
+from typing import AsyncIterator, List, Optional
 from uuid import uuid4
 from datetime import datetime
+import asyncio
+import base64
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
+from ..config import AZURE_CONTAINER_NAME, resources
+from .metrics_service import timed, stage_seconds
 
-AZURE_CONN_STR = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
-CONTAINER_NAME = os.getenv("AZURE_CONTAINER_NAME")
+CONTAINER_NAME = AZURE_CONTAINER_NAME
 
-blob_service_client = BlobServiceClient.from_connection_string(AZURE_CONN_STR)
-container_client = blob_service_client.get_container_client(CONTAINER_NAME)
+# Staged block size and parallel block uploads for streamed writes
+BLOB_BLOCK_SIZE = int(os.getenv("BLOB_BLOCK_SIZE", str(4 * 1024 * 1024)))
+BLOB_MAX_CONCURRENCY = int(os.getenv("BLOB_MAX_CONCURRENCY", "4"))
 
+# Ranged reads for downloads: range size, ranges in flight, and a smaller
+# first range so parsing can start before a full range has arrived
+BLOB_DOWNLOAD_RANGE_SIZE = int(os.getenv("BLOB_DOWNLOAD_RANGE_SIZE", str(4 * 1024 * 1024)))
+BLOB_DOWNLOAD_CONCURRENCY = int(os.getenv("BLOB_DOWNLOAD_CONCURRENCY", "4"))
+BLOB_FIRST_RANGE_SIZE = int(os.getenv("BLOB_FIRST_RANGE_SIZE", str(256 * 1024)))
 
+
+def make_blob_name(filename: str, user_email: str, is_result=False) -> str:
+    prefix = "results" if is_result else "uploads"
+    safe_email = user_email.replace("@", "_at_").replace(".", "_")
+    return f"{prefix}/{safe_email}/{uuid4()}_{filename}"
+
+
+def make_blob_url(blob_name: str) -> str:
+    return (
+        f"https://{resources.blob_service.account_name}.blob.core.windows.net/"
+        f"{CONTAINER_NAME}/{blob_name}"
+    )
+
+
+@timed("blob_upload")
 async def upload_file_to_blob(content: bytes, filename: str, user_email: str, is_result=False):
     """
     Upload bytes to Azure Blob Storage inside user-specific folders.
@@ -22,39 +45,171 @@ async def upload_file_to_blob(content: bytes, filename: str, user_email: str, is
       results/<email>/<filename>
     """
 
-    prefix = "results" if is_result else "uploads"
+    blob_name = make_blob_name(filename, user_email, is_result)
 
-    safe_email = user_email.replace("@", "_at_").replace(".", "_")
-    blob_name = f"{prefix}/{safe_email}/{uuid4()}_{filename}"
-
-    blob_client = container_client.get_blob_client(blob_name)
+    blob_client = resources.container.get_blob_client(blob_name)
     await blob_client.upload_blob(content, overwrite=True)
 
-    blob_url = (
-        f"https://{blob_service_client.account_name}.blob.core.windows.net/"
-        f"{CONTAINER_NAME}/{blob_name}"
-    )
-
     return {
         "blob_name": blob_name,
-        "url": blob_url,
+        "url": make_blob_url(blob_name),
         "uploaded_at": datetime.utcnow(),
     }
 
 
+class BlockBlobWriter:
+    """
+    Write a block blob incrementally.
+
+    Data is buffered up to BLOB_BLOCK_SIZE, each full block is staged in the
+    background (at most BLOB_MAX_CONCURRENCY at once) and close() commits
+    the block list. Nothing is visible until close() succeeds.
+    """
+
+    def __init__(self, blob_name: str, block_size: int = None, max_concurrency: int = None):
+        self.blob_name = blob_name
+        self.block_size = block_size or BLOB_BLOCK_SIZE
+        self.bytes_written = 0
+        self._blob_client = resources.container.get_blob_client(blob_name)
+        self._buffer = bytearray()
+        self._block_ids: List[str] = []
+        self._pending = set()
+        self._slots = asyncio.Semaphore(max_concurrency or BLOB_MAX_CONCURRENCY)
+        self._error = None
+
+    async def _stage(self, block_id: str, data: bytes):
+        try:
+            await self._blob_client.stage_block(block_id, data)
+        except Exception as exc:
+            self._error = exc
+        finally:
+            self._slots.release()
+
+    async def _flush_block(self, data: bytes):
+        await self._slots.acquire()
+        if self._error is not None:
+            self._slots.release()
+            raise self._error
+        block_id = base64.b64encode(f"{len(self._block_ids):08d}".encode()).decode()
+        self._block_ids.append(block_id)
+        task = asyncio.ensure_future(self._stage(block_id, data))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def write(self, data: bytes):
+        self._buffer += data
+        self.bytes_written += len(data)
+        while len(self._buffer) >= self.block_size:
+            block = bytes(self._buffer[:self.block_size])
+            del self._buffer[:self.block_size]
+            await self._flush_block(block)
+
+    async def close(self) -> str:
+        """Stage the remaining data, commit the block list, return the URL."""
+        if not self._block_ids and not self._buffer:
+            await self._blob_client.upload_blob(b"", overwrite=True)
+            return make_blob_url(self.blob_name)
+        if self._buffer:
+            await self._flush_block(bytes(self._buffer))
+            self._buffer.clear()
+        if self._pending:
+            await asyncio.gather(*list(self._pending))
+        if self._error is not None:
+            raise self._error
+        with stage_seconds.time(stage="blob_commit"):
+            await self._blob_client.commit_block_list(
+                [BlobBlock(block_id=block_id) for block_id in self._block_ids]
+            )
+        return make_blob_url(self.blob_name)
+
+    async def abort(self):
+        """Wait for in-flight stages; uncommitted blocks expire on their own."""
+        if self._pending:
+            await asyncio.gather(*list(self._pending), return_exceptions=True)
+
+
+@timed("blob_download")
 async def download_blob_bytes(blob_name: str) -> bytes:
-    blob_client = container_client.get_blob_client(blob_name)
-    stream = await blob_client.download_blob()
+    blob_client = resources.container.get_blob_client(blob_name)
+    # the SDK splits large blobs into parallel ranged GETs
+    stream = await blob_client.download_blob(max_concurrency=BLOB_DOWNLOAD_CONCURRENCY)
+    return await stream.readall()
+
+
+@timed("blob_properties")
+async def get_blob_size(blob_name: str) -> int:
+    blob_client = resources.container.get_blob_client(blob_name)
+    props = await blob_client.get_blob_properties()
+    return props.size
+
+
+@timed("blob_read_range")
+async def download_blob_range(blob_name: str, start: int, end: int) -> bytes:
+    """Bytes [start, end) of a blob."""
+    blob_client = resources.container.get_blob_client(blob_name)
+    stream = await blob_client.download_blob(offset=start, length=end - start)
     return await stream.readall()
 
 
+def _ranges(size: int, range_size: int, first_size: int):
+    offset = 0
+    length = min(first_size, range_size)
+    while offset < size:
+        yield offset, min(length, size - offset)
+        offset += length
+        length = range_size
+
+
+async def iter_blob_chunks(
+    blob_name: str,
+    size: Optional[int] = None,
+    range_size: int = None,
+    concurrency: int = None,
+) -> AsyncIterator[bytes]:
+    """
+    Yield a blob's content in order while up to `concurrency` ranged reads
+    run ahead of the consumer. Memory is bounded by the ranges in flight.
+    Pass `size` when it is already known to skip the properties request.
+    """
+    blob_client = resources.container.get_blob_client(blob_name)
+    if size is None:
+        size = await get_blob_size(blob_name)
+
+    async def fetch(offset: int, length: int) -> bytes:
+        with stage_seconds.time(stage="blob_range"):
+            stream = await blob_client.download_blob(offset=offset, length=length)
+            return await stream.readall()
+
+    ranges = _ranges(size, range_size or BLOB_DOWNLOAD_RANGE_SIZE, BLOB_FIRST_RANGE_SIZE)
+    in_flight = deque()
+    for _ in range(max(1, concurrency or BLOB_DOWNLOAD_CONCURRENCY)):
+        nxt = next(ranges, None)
+        if nxt is None:
+            break
+        in_flight.append(asyncio.ensure_future(fetch(*nxt)))
+
+    try:
+        while in_flight:
+            data = await in_flight.popleft()
+            nxt = next(ranges, None)
+            if nxt is not None:
+                in_flight.append(asyncio.ensure_future(fetch(*nxt)))
+            yield data
+    finally:
+        for task in in_flight:
+            task.cancel()
+        if in_flight:
+            await asyncio.gather(*in_flight, return_exceptions=True)
+
+
+@timed("blob_delete")
 async def delete_blob(blob_name: str):
-    blob_client = container_client.get_blob_client(blob_name)
+    blob_client = resources.container.get_blob_client(blob_name)
     await blob_client.delete_blob()
 
 
 async def list_blobs(prefix: str = None) -> List[str]:
     blob_names = []
-    async for blob in container_client.list_blobs(name_starts_with=prefix):
+    async for blob in resources.container.list_blobs(name_starts_with=prefix):
         blob_names.append(blob.name)
     return blob_names
@@ -1,24 +1,11 @@
 import os
 import uuid
 import traceback
-from azure.ai.ml import MLClient
-from azure.identity import DefaultAzureCredential
-from azure.ai.ml.entities import CommandJob, Environment
 
 from ..config import (
-    AZURE_SUBSCRIPTION_ID,
-    AZURE_RESOURCE_GROUP,
-    AZURE_ML_WORKSPACE,
     AZURE_STORAGE_CONNECTION_STRING,
     AZURE_CONTAINER_NAME,
-)
-
-# ML Client
-ml_client = MLClient(
-    DefaultAzureCredential(),
-    AZURE_SUBSCRIPTION_ID,
-    AZURE_RESOURCE_GROUP,
-    AZURE_ML_WORKSPACE
+    resources,
 )
 
 
@@ -28,6 +15,8 @@ async def trigger_aml_pipeline(analysis_type: str, blob_name: str, user_email: s
     """
 
     try:
+        from azure.ai.ml.entities import CommandJob, Environment
+
         # Define environment
         env = Environment(
             name="sentiment-aml-env",
@@ -55,7 +44,8 @@ async def trigger_aml_pipeline(analysis_type: str, blob_name: str, user_email: s
         )
 
         # Submit job to Azure ML
-        submitted = ml_client.jobs.create_or_update(job, name=job_id)
+        # ML client is created on first use (credential lookup is slow)
+        submitted = resources.ml_client.jobs.create_or_update(job, name=job_id)
         print("AML JOB SUBMITTED:", submitted.name)
 
         return submitted.name
@@ -1,7 +1,10 @@
+from datetime import datetime
 from typing import List, Optional, Dict, Any
 from bson.objectid import ObjectId
 from bson.errors import InvalidId
-import bcrypt
+
+from .metrics_service import timed
+from .pagination import DEFAULT_PAGE_SIZE, keyset_page
 
 
 # IMPORT CORRECT MOTOR COLLECTIONS FROM config.py (ATLAS)
@@ -9,21 +12,24 @@ from ..config import (
     users_collection,
     blacklist_collection,
     files_collection,
-    results_collection
+    results_collection,
+    auth_invalidations_collection
 )
 
 # USER MANAGEMENT
+@timed("db_get_user_by_email")
 async def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
     return await users_collection.find_one({"email": email})
 
 
-async def create_user(name: str, email: str, password: str) -> str:
-    hashed_pw = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt())
-    doc = {"name": name, "email": email, "password": hashed_pw}
+@timed("db_create_user")
+async def create_user(name: str, email: str, password_hash: bytes) -> str:
+    doc = {"name": name, "email": email, "password": password_hash}
     result = await users_collection.insert_one(doc)
     return str(result.inserted_id)
 
 
+@timed("db_get_user_by_id")
 async def get_user_by_id(user_id: str) -> Optional[Dict[str, Any]]:
     try:
         oid = ObjectId(user_id)
@@ -36,37 +42,115 @@ async def get_user_by_id(user_id: str) -> Optional[Dict[str, Any]]:
     return user
 
 
+@timed("db_update_user")
 async def update_user(email: str, updates: Dict[str, Any]) -> bool:
     result = await users_collection.update_one({"email": email}, {"$set": updates})
     return result.modified_count > 0
 
 
 
-# TOKEN BLACKLIST
-async def is_blacklisted(token: str) -> bool:
-    return await blacklist_collection.find_one({"token": token}) is not None
+# TOKEN BLACKLIST (revoked jtis, removed by Mongo once the token expires)
+@timed("db_is_blacklisted")
+async def is_blacklisted(jti: str) -> bool:
+    return await blacklist_collection.find_one({"jti": jti}, {"_id": 1}) is not None
+
+
+@timed("db_add_to_blacklist")
+async def add_to_blacklist(jti: str, exp: datetime) -> None:
+    await blacklist_collection.update_one(
+        {"jti": jti},
+        {"$setOnInsert": {"jti": jti, "exp": exp, "revoked_at": datetime.utcnow()}},
+        upsert=True,
+    )
+
+
+@timed("db_get_revocations_since")
+async def get_revocations_since(since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Unexpired revocations, optionally only those made after `since`."""
+    query = {"jti": {"$exists": True}, "exp": {"$gt": datetime.utcnow()}}
+    if since is not None:
+        query["revoked_at"] = {"$gte": since}
+    cursor = blacklist_collection.find(query, {"_id": 0, "jti": 1, "exp": 1})
+    return await cursor.to_list(length=None)
+
+
+@timed("db_migrate_legacy_blacklist")
+async def migrate_legacy_blacklist() -> int:
+    """
+    Convert entries written before token ids existed ({"token": ...}) to
+    {"jti": sha256(token), "exp"}, the id jwt_service.token_id gives tokens
+    without a jti. Entries for tokens that no longer decode are dropped.
+    Returns the number of entries converted.
+    """
+    from . import jwt_service
+
+    moved = 0
+    async for doc in blacklist_collection.find({"token": {"$exists": True}}):
+        decoded = jwt_service.decode_access_token(doc["token"])
+        if decoded and decoded.get("exp"):
+            await add_to_blacklist(
+                jwt_service.token_id(decoded, doc["token"]),
+                datetime.utcfromtimestamp(decoded["exp"]),
+            )
+            moved += 1
+        await blacklist_collection.delete_one({"_id": doc["_id"]})
+    return moved
 
 
-async def add_to_blacklist(token: str) -> None:
-    await blacklist_collection.insert_one({"token": token})
+
+# AUTH CACHE INVALIDATION LOG (read by every app worker, expired by a TTL index)
+@timed("db_publish_auth_invalidation")
+async def publish_auth_invalidation(email: str) -> None:
+    await auth_invalidations_collection.insert_one(
+        {"email": email, "at": datetime.utcnow()}
+    )
+
+
+@timed("db_get_auth_invalidations_since")
+async def get_auth_invalidations_since(since: datetime) -> List[Dict[str, Any]]:
+    cursor = auth_invalidations_collection.find({"at": {"$gte": since}}, {"_id": 0, "email": 1})
+    return await cursor.to_list(length=None)
 
 
 
 # FILE METADATA
+@timed("db_save_file_metadata")
 async def save_file_metadata(file_meta: Dict[str, Any]) -> str:
     result = await files_collection.insert_one(file_meta)
     return str(result.inserted_id)
 
 
-async def get_user_files(user_email: str) -> List[Dict[str, Any]]:
-    cursor = files_collection.find({"user_email": user_email})
-    files = await cursor.to_list(length=1000)
-
-    for f in files:
-        f["_id"] = str(f["_id"])
-    return files
-
-
+# Fields the listing endpoints return (full documents via the detail routes)
+FILE_LIST_FIELDS = {
+    "id": 1, "file_name": 1, "blob_url": 1, "uploaded_at": 1, "content_sha256": 1,
+    "size_bytes": 1, "row_count": 1,
+}
+RESULT_LIST_FIELDS = {
+    "analysis_type": 1, "file_name": 1, "file_id": 1, "result_url": 1,
+    "model_version": 1, "summary": 1, "created_at": 1,
+}
+
+
+@timed("db_get_user_files")
+async def get_user_files(
+    user_email: str,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+) -> Dict[str, Any]:
+    """Newest-first page of a user's uploads: {"items", "next_cursor", "total"?}."""
+    return await keyset_page(
+        files_collection,
+        {"user_email": user_email},
+        "uploaded_at",
+        FILE_LIST_FIELDS,
+        limit=limit,
+        cursor=cursor,
+        include_total=include_total,
+    )
+
+
+@timed("db_get_file_by_id")
 async def get_file_by_id(file_id: str) -> Optional[Dict[str, Any]]:
     query = {"$or": [{"id": file_id}]}
 
@@ -81,6 +165,7 @@ async def get_file_by_id(file_id: str) -> Optional[Dict[str, Any]]:
     return file_doc
 
 
+@timed("db_delete_file")
 async def delete_file(file_id: str) -> bool:
     query = {"$or": [{"id": file_id}]}
 
@@ -95,22 +180,35 @@ async def delete_file(file_id: str) -> bool:
 
 
 # ANALYSIS RESULTS (ALSO STORED IN ATLAS)
+@timed("db_save_analysis_result")
 async def save_analysis_result(result_doc: dict) -> str:
     insert_result = await results_collection.insert_one(result_doc)
     return str(insert_result.inserted_id)
 
 
-async def get_results_by_user(user_email: str):
-    cursor = results_collection.find({"user_email": user_email}).sort("created_at", -1)
-    docs = await cursor.to_list(length=1000)
-
-    for d in docs:
-        d["_id"] = str(d["_id"])
+@timed("db_get_results_by_user")
+async def get_results_by_user(
+    user_email: str,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+) -> Dict[str, Any]:
+    """Newest-first page of a user's results: {"items", "next_cursor", "total"?}."""
+    page = await keyset_page(
+        results_collection,
+        {"user_email": user_email},
+        "created_at",
+        RESULT_LIST_FIELDS,
+        limit=limit,
+        cursor=cursor,
+        include_total=include_total,
+    )
+    for d in page["items"]:
         if "created_at" in d:
             d["created_at"] = str(d["created_at"])
+    return page
 
-    return docs
-
+@timed("db_get_result_by_id")
 async def get_result_by_id(result_id: str):
     try:
         oid = ObjectId(result_id)
@@ -0,0 +1,241 @@
+"""
+Declarative index registry for the Mongo collections.
+
+    python -m backend.services.index_service            # create indexes
+    python -m backend.services.index_service --check    # explain self-check
+
+ensure_indexes() runs at app startup and is idempotent: existing indexes
+with the same name and options are left alone, conflicting ones are
+reported rather than dropped.
+"""
+import argparse
+import asyncio
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+from .. import config
+from .job_service import JOB_RETENTION_SECONDS
+
+
+# Create missing indexes at startup (turn off where the app user may not
+# run createIndex; then apply them with the CLI above).
+MONGO_ENSURE_INDEXES = os.getenv("MONGO_ENSURE_INDEXES", "true").lower() == "true"
+
+# Also explain the service-layer queries at startup and print a warning
+# for every one that scans a whole collection.
+MONGO_INDEX_SELF_CHECK = os.getenv("MONGO_INDEX_SELF_CHECK", "false").lower() == "true"
+
+AUTH_INVALIDATION_RETENTION_SECONDS = 3600
+
+IndexSpec = Tuple[List[Tuple[str, int]], Dict[str, Any]]
+
+
+# INDEX REGISTRY: collection → (keys, options)
+INDEXES: Dict[str, List[IndexSpec]] = {
+    "users": [
+        ([("email", ASCENDING)], {"name": "email_unique", "unique": True}),
+    ],
+    "files": [
+        ([("id", ASCENDING)], {"name": "id_unique", "unique": True, "sparse": True}),
+        ([("user_email", ASCENDING), ("uploaded_at", DESCENDING), ("_id", DESCENDING)],
+         {"name": "user_uploaded_at"}),
+    ],
+    "results": [
+        ([("user_email", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+         {"name": "user_created_at"}),
+        ([("user_email", ASCENDING), ("content_sha256", ASCENDING), ("analysis_type", ASCENDING),
+          ("model_version", ASCENDING), ("created_at", DESCENDING)],
+         {"name": "reuse_lookup"}),
+        ([("user_email", ASCENDING), ("file_name", ASCENDING), ("analysis_type", ASCENDING),
+          ("model_version", ASCENDING), ("created_at", DESCENDING)],
+         {"name": "logical_file_lookup"}),
+    ],
+    "result_rows": [
+        ([("result_id", ASCENDING), ("index", ASCENDING)], {"name": "result_index"}),
+        ([("result_id", ASCENDING), ("label", ASCENDING), ("index", ASCENDING), ("score", ASCENDING)],
+         {"name": "result_label_index"}),
+        ([("result_id", ASCENDING), ("label", ASCENDING), ("score", DESCENDING), ("index", ASCENDING)],
+         {"name": "result_label_score"}),
+        ([("result_id", ASCENDING), ("score", DESCENDING), ("index", ASCENDING)],
+         {"name": "result_score"}),
+        ([("result_id", ASCENDING), ("text_hash", ASCENDING)], {"name": "result_text_hash"}),
+    ],
+    "blacklist": [
+        ([("jti", ASCENDING)], {"name": "jti_unique", "unique": True, "sparse": True}),
+        ([("exp", ASCENDING)], {"name": "exp_ttl", "expireAfterSeconds": 0}),
+        ([("token", ASCENDING)], {"name": "legacy_token", "sparse": True}),
+        ([("revoked_at", ASCENDING)], {"name": "revoked_at"}),
+    ],
+    "auth_invalidations": [
+        ([("at", ASCENDING)], {"name": "at_ttl", "expireAfterSeconds": AUTH_INVALIDATION_RETENTION_SECONDS}),
+    ],
+    "jobs": [
+        ([("id", ASCENDING)], {"name": "id_unique", "unique": True}),
+        ([("state", ASCENDING), ("created_at", ASCENDING)], {"name": "state_created_at"}),
+        ([("finished_at", ASCENDING)], {"name": "finished_at_ttl", "expireAfterSeconds": JOB_RETENTION_SECONDS}),
+    ],
+}
+
+
+def _collections() -> Dict[str, Any]:
+    return {
+        "users": config.users_collection,
+        "files": config.files_collection,
+        "results": config.results_collection,
+        "result_rows": config.result_rows_collection,
+        "blacklist": config.blacklist_collection,
+        "auth_invalidations": config.auth_invalidations_collection,
+        "jobs": config.jobs_collection,
+    }
+
+
+async def ensure_indexes() -> List[str]:
+    """Create every registered index; returns a line per problem found."""
+    problems = []
+    for name, coll in _collections().items():
+        for keys, options in INDEXES[name]:
+            try:
+                await coll.create_index(keys, **options)
+            except OperationFailure as exc:
+                # e.g. an index with the same keys but other options, or
+                # duplicate emails blocking the unique index
+                problems.append(f"{coll.full_name}.{options['name']}: {exc}")
+    for line in problems:
+        print(f" Index not created: {line}")
+    return problems
+
+
+# EXPLAIN SELF-CHECK
+# One entry per query shape issued by the service layer, with
+# placeholder values: (collection, filter, sort).
+def _service_queries() -> Dict[str, Tuple[str, Dict[str, Any], List[Tuple[str, int]]]]:
+    email = "self-check@example.com"
+    now = datetime.utcnow()
+    oid = ObjectId()
+    return {
+        "db_service.get_user_by_email": ("users", {"email": email}, []),
+        "db_service.get_user_files": (
+            "files", {"user_email": email}, [("uploaded_at", DESCENDING), ("_id", DESCENDING)],
+        ),
+        "db_service.get_user_files (next page)": (
+            "files",
+            {"user_email": email, "$or": [
+                {"uploaded_at": {"$lt": now}}, {"uploaded_at": now, "_id": {"$lt": oid}}, {"uploaded_at": None},
+            ]},
+            [("uploaded_at", DESCENDING), ("_id", DESCENDING)],
+        ),
+        "db_service.get_file_by_id": ("files", {"$or": [{"id": "x"}, {"_id": "x"}]}, []),
+        "db_service.get_results_by_user": (
+            "results", {"user_email": email}, [("created_at", DESCENDING), ("_id", DESCENDING)],
+        ),
+        "db_service.get_results_by_user (next page)": (
+            "results",
+            {"user_email": email, "$or": [
+                {"created_at": {"$lt": now}}, {"created_at": now, "_id": {"$lt": oid}}, {"created_at": None},
+            ]},
+            [("created_at", DESCENDING), ("_id", DESCENDING)],
+        ),
+        "db_service.is_blacklisted": ("blacklist", {"jti": "x"}, []),
+        "db_service.migrate_legacy_blacklist": ("blacklist", {"token": {"$exists": True}}, []),
+        "db_service.get_revocations_since": (
+            "blacklist", {"jti": {"$exists": True}, "exp": {"$gt": now}, "revoked_at": {"$gte": now}}, [],
+        ),
+        "db_service.get_auth_invalidations_since": ("auth_invalidations", {"at": {"$gte": now}}, []),
+        "results_db_service.find_reusable_result": (
+            "results",
+            {"user_email": email, "content_sha256": "x", "analysis_type": "linebyline", "model_version": "x"},
+            [("created_at", DESCENDING)],
+        ),
+        "results_db_service.find_latest_result_for_file": (
+            "results",
+            {"user_email": email, "file_name": "x", "analysis_type": "linebyline", "model_version": "x"},
+            [("created_at", DESCENDING)],
+        ),
+        "results_db_service.get_result_rows_by_hash": (
+            "result_rows", {"result_id": "x", "text_hash": {"$in": ["x", "y"]}}, [],
+        ),
+        "results_db_service.query_result_rows": (
+            "result_rows",
+            {"result_id": "x", "label": "negative", "score": {"$gte": 0.9}, "index": {"$gt": 0}},
+            [("index", ASCENDING)],
+        ),
+        "results_db_service.top_result_rows": (
+            "result_rows", {"result_id": "x"}, [("score", DESCENDING), ("index", ASCENDING)],
+        ),
+        "results_db_service.result_score_histogram": ("result_rows", {"result_id": "x"}, []),
+        "job_service.MongoJobQueue.claim": (
+            "jobs",
+            {"$or": [
+                {"state": "queued"},
+                {"state": "running", "heartbeat_at": {"$lt": now}},
+                {"state": "running", "heartbeat_at": None, "started_at": {"$lt": now}},
+            ]},
+            [("created_at", ASCENDING)],
+        ),
+        "job_service.MongoJobQueue.get": ("jobs", {"id": "x"}, []),
+    }
+
+
+def _plan_stages(plan: Any) -> List[str]:
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            stages.extend(_plan_stages(value))
+    return stages
+
+
+async def check_query_plans() -> Dict[str, Dict[str, Any]]:
+    """
+    Explain every service-layer query shape and report its winning plan
+    stages; `uses_index` is False when the plan contains a COLLSCAN.
+    """
+    colls = _collections()
+    report = {}
+    for query_name, (coll_name, query, sort) in _service_queries().items():
+        cursor = colls[coll_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        try:
+            explained = await cursor.explain()
+        except Exception as exc:
+            report[query_name] = {"uses_index": None, "error": str(exc)}
+            continue
+        stages = _plan_stages(explained.get("queryPlanner", {}).get("winningPlan", {}))
+        report[query_name] = {
+            "uses_index": "COLLSCAN" not in stages,
+            "stages": stages,
+        }
+
+    for name, entry in report.items():
+        if entry["uses_index"] is False:
+            print(f" Query without index: {name} → {' > '.join(entry['stages'])}")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Create the Mongo indexes or check query plans.")
+    parser.add_argument("--check", action="store_true", help="explain the service queries instead")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        report = asyncio.run(check_query_plans())
+        for name, entry in report.items():
+            status = {True: "index", False: "COLLSCAN", None: "unknown"}[entry["uses_index"]]
+            print(f"{status:<9} {name}")
+    else:
+        problems = asyncio.run(ensure_indexes())
+        print("indexes in place" if not problems else f"{len(problems)} index problem(s)")
+
+
+if __name__ == "__main__":
+    main()
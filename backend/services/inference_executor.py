@@ -0,0 +1,71 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+
+
+# Threads that may run model calls at once (the micro-batcher still merges
+# their texts into shared forward passes).
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "4"))
+
+# Calls allowed to wait for a worker before new ones are rejected.
+INFERENCE_MAX_PENDING = int(os.getenv("INFERENCE_MAX_PENDING", "32"))
+
+# Seconds a call waits for a pending slot before giving up.
+INFERENCE_ADMIT_TIMEOUT = float(os.getenv("INFERENCE_ADMIT_TIMEOUT", "5"))
+
+
+class InferenceBusyError(RuntimeError):
+    """Raised when the inference executor has no room for another call."""
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_slots: Optional[asyncio.Semaphore] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=INFERENCE_WORKERS,
+            thread_name_prefix="inference",
+        )
+    return _executor
+
+
+def _get_slots() -> asyncio.Semaphore:
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(INFERENCE_WORKERS + INFERENCE_MAX_PENDING)
+    return _slots
+
+
+async def run_inference(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Run a blocking model call in the inference thread pool so the event
+    loop keeps serving other requests.
+
+    At most INFERENCE_WORKERS calls run at once and INFERENCE_MAX_PENDING
+    more may wait; beyond that InferenceBusyError is raised after
+    INFERENCE_ADMIT_TIMEOUT seconds.
+    """
+    slots = _get_slots()
+    try:
+        await asyncio.wait_for(slots.acquire(), timeout=INFERENCE_ADMIT_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise InferenceBusyError("Inference queue is full, try again later.")
+
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), partial(fn, *args, **kwargs))
+    finally:
+        slots.release()
+
+
+def shutdown_inference_executor():
+    global _executor, _slots
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+    _executor = None
+    _slots = None
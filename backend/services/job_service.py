@@ -0,0 +1,350 @@
+import asyncio
+import os
+import time
+import traceback
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+from uuid import uuid4
+
+from pymongo import ReturnDocument
+
+
+# "memory" keeps jobs in this process (tests, single worker);
+# "mongo" shares them across every app worker through a collection.
+JOB_QUEUE_BACKEND = os.getenv("JOB_QUEUE_BACKEND", "memory")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+JOB_PROGRESS_SECONDS = float(os.getenv("JOB_PROGRESS_SECONDS", "1"))
+
+# A running job whose worker has not sent a heartbeat for this long is
+# considered lost and handed to another worker, at most JOB_MAX_ATTEMPTS
+# times in total.
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+# Finished jobs are kept this long, then dropped
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", str(24 * 3600)))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job runner once cancellation was requested."""
+
+
+# JOB QUEUES
+def _requeued_fields(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Hand a running job back to the queue when its worker shuts down.
+    Progress is kept; the claim does not count as an attempt.
+    """
+    fields = {"state": QUEUED, "started_at": None, "heartbeat_at": None, "worker_pid": None}
+    if "attempts" in job:
+        fields["attempts"] = max(job["attempts"] - 1, 0)
+    return fields
+
+
+class InMemoryJobQueue:
+    """Jobs held in a dict, handed to workers through an asyncio.Queue."""
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._ready: Optional[asyncio.Queue] = None
+
+    def _queue(self) -> asyncio.Queue:
+        if self._ready is None:
+            self._ready = asyncio.Queue()
+        return self._ready
+
+    def _prune(self):
+        cutoff = datetime.utcnow() - timedelta(seconds=JOB_RETENTION_SECONDS)
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["state"] in FINISHED_STATES and job.get("finished_at") and job["finished_at"] < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    async def put(self, job: Dict[str, Any]):
+        self._prune()
+        self._jobs[job["id"]] = job
+        await self._queue().put(job["id"])
+
+    async def claim(self) -> Optional[Dict[str, Any]]:
+        try:
+            job_id = await asyncio.wait_for(self._queue().get(), timeout=JOB_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            return None
+        job = self._jobs.get(job_id)
+        if not job or job["state"] != QUEUED:
+            return None
+        now = datetime.utcnow()
+        job.update({
+            "state": RUNNING,
+            "started_at": now,
+            "heartbeat_at": now,
+            "worker_pid": os.getpid(),
+            "attempts": job.get("attempts", 0) + 1,
+        })
+        return dict(job)
+
+    async def heartbeat(self, job_id: str):
+        if job_id in self._jobs:
+            self._jobs[job_id]["heartbeat_at"] = datetime.utcnow()
+
+    async def requeue(self, job_id: str):
+        job = self._jobs.get(job_id)
+        if not job or job["state"] != RUNNING:
+            return
+        job.update(_requeued_fields(job))
+        self._queue().put_nowait(job_id)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        return dict(job) if job else None
+
+    async def update(self, job_id: str, fields: Dict[str, Any]):
+        if job_id in self._jobs:
+            self._jobs[job_id].update(fields)
+
+    async def request_cancel(self, job_id: str):
+        job = self._jobs.get(job_id)
+        if not job:
+            return
+        job["cancel_requested"] = True
+        if job["state"] == QUEUED:
+            job.update({"state": CANCELLED, "finished_at": datetime.utcnow()})
+
+
+class MongoJobQueue:
+    """Jobs stored in a collection; workers claim them atomically."""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    async def put(self, job: Dict[str, Any]):
+        await self._collection.insert_one(dict(job))
+
+    async def claim(self) -> Optional[Dict[str, Any]]:
+        """Oldest queued job, or a running one whose worker stopped heartbeating."""
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=JOB_LEASE_SECONDS)
+        job = await self._collection.find_one_and_update(
+            {"$or": [
+                {"state": QUEUED},
+                {"state": RUNNING, "heartbeat_at": {"$lt": stale}},
+                # claimed before heartbeats were recorded
+                {"state": RUNNING, "heartbeat_at": None, "started_at": {"$lt": stale}},
+            ]},
+            {
+                "$set": {"state": RUNNING, "started_at": now, "heartbeat_at": now, "worker_pid": os.getpid()},
+                "$inc": {"attempts": 1},
+            },
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+        if job is None:
+            await asyncio.sleep(JOB_POLL_SECONDS)
+            return None
+        job.pop("_id", None)
+        return job
+
+    async def heartbeat(self, job_id: str):
+        await self._collection.update_one(
+            {"id": job_id, "state": RUNNING}, {"$set": {"heartbeat_at": datetime.utcnow()}}
+        )
+
+    async def requeue(self, job_id: str):
+        await self._collection.update_one(
+            {"id": job_id, "state": RUNNING, "attempts": {"$gt": 0}},
+            {"$set": _requeued_fields({}), "$inc": {"attempts": -1}},
+        )
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self._collection.find_one({"id": job_id}, {"_id": 0})
+
+    async def update(self, job_id: str, fields: Dict[str, Any]):
+        await self._collection.update_one({"id": job_id}, {"$set": fields})
+
+    async def request_cancel(self, job_id: str):
+        await self._collection.update_one({"id": job_id}, {"$set": {"cancel_requested": True}})
+        await self._collection.update_one(
+            {"id": job_id, "state": QUEUED},
+            {"$set": {"state": CANCELLED, "finished_at": datetime.utcnow()}},
+        )
+
+
+# JOB CONTEXT (handed to runners)
+class JobContext:
+    """
+    Lets a runner report progress and notice cancellation.
+    Progress writes are throttled to one per JOB_PROGRESS_SECONDS.
+    """
+
+    def __init__(self, queue, job: Dict[str, Any]):
+        self.job = job
+        self._queue = queue
+        self._started = time.monotonic()
+        self._last_write = 0.0
+        self._cancelled = False
+
+    async def report(self, rows_done: int, bytes_done: int = 0, bytes_total: int = 0, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_write < JOB_PROGRESS_SECONDS:
+            return
+        self._last_write = now
+
+        elapsed = max(now - self._started, 1e-6)
+        eta = None
+        if bytes_total and bytes_done:
+            eta = (bytes_total - bytes_done) / (bytes_done / elapsed)
+
+        await self._queue.update(self.job["id"], {
+            "rows_done": rows_done,
+            "bytes_done": bytes_done,
+            "bytes_total": bytes_total,
+            "rows_per_second": rows_done / elapsed,
+            "eta_seconds": eta,
+            "updated_at": datetime.utcnow(),
+        })
+
+        current = await self._queue.get(self.job["id"])
+        self._cancelled = bool(current and current.get("cancel_requested"))
+
+    def check_cancelled(self):
+        if self._cancelled:
+            raise JobCancelled()
+
+
+Runner = Callable[[Dict[str, Any], JobContext], Awaitable[Dict[str, Any]]]
+
+
+# JOB MANAGER
+class JobManager:
+    """
+    Local worker pool: JOB_WORKERS asyncio workers per app process pull
+    jobs from the queue and run the runner registered for the job kind.
+    CPU-bound work inside runners goes through the inference executor.
+    Started from the app lifespan, so every process joins the pool.
+    """
+
+    def __init__(self, queue, workers: int = JOB_WORKERS):
+        self.queue = queue
+        self.workers = workers
+        self._runners: Dict[str, Runner] = {}
+        self._tasks = []
+
+    def register(self, kind: str, runner: Runner):
+        self._runners[kind] = runner
+
+    def start(self):
+        if self._tasks:
+            return
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, kind: str, user_email: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if kind not in self._runners:
+            raise ValueError(f"Unknown job kind '{kind}'")
+
+        job = {
+            "id": str(uuid4()),
+            "kind": kind,
+            "user_email": user_email,
+            "payload": payload,
+            "state": QUEUED,
+            "cancel_requested": False,
+            "rows_done": 0,
+            "bytes_done": 0,
+            "bytes_total": 0,
+            "rows_per_second": 0.0,
+            "eta_seconds": None,
+            "result": None,
+            "error": None,
+            "attempts": 0,
+            "heartbeat_at": None,
+            "created_at": datetime.utcnow(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        await self.queue.put(job)
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self.queue.get(job_id)
+
+    async def cancel(self, job_id: str):
+        await self.queue.request_cancel(job_id)
+
+    async def _worker(self):
+        while True:
+            try:
+                job = await self.queue.claim()
+            except Exception as exc:
+                print(f" Job queue claim failed: {exc}")
+                await asyncio.sleep(JOB_POLL_SECONDS)
+                continue
+            if job is None:
+                continue
+            await self._run(job)
+
+    async def _heartbeat(self, job_id: str):
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            try:
+                await self.queue.heartbeat(job_id)
+            except Exception as exc:
+                print(f" Job {job_id} heartbeat failed: {exc}")
+
+    async def _run(self, job: Dict[str, Any]):
+        if job.get("attempts", 1) > JOB_MAX_ATTEMPTS:
+            await self.queue.update(job["id"], {
+                "state": FAILED,
+                "error": f"Worker lost {JOB_MAX_ATTEMPTS} times, giving up",
+                "finished_at": datetime.utcnow(),
+            })
+            return
+
+        ctx = JobContext(self.queue, job)
+        heartbeat = asyncio.ensure_future(self._heartbeat(job["id"]))
+        try:
+            result = await self._runners[job["kind"]](job, ctx)
+            fields = {"state": SUCCEEDED, "result": result}
+        except JobCancelled:
+            fields = {"state": CANCELLED}
+        except asyncio.CancelledError:
+            # worker shutting down (reload, deploy): another worker resumes it
+            try:
+                await self.queue.requeue(job["id"])
+            except Exception as exc:
+                print(f" Job {job['id']} could not be requeued, left for lease reclaim: {exc}")
+            raise
+        except Exception as exc:
+            print(f" Job {job['id']} failed:")
+            print(traceback.format_exc())
+            fields = {"state": FAILED, "error": str(exc)}
+        finally:
+            heartbeat.cancel()
+
+        fields["finished_at"] = datetime.utcnow()
+        await self.queue.update(job["id"], fields)
+
+
+def _make_queue():
+    if JOB_QUEUE_BACKEND == "mongo":
+        from ..config import jobs_collection
+        return MongoJobQueue(jobs_collection)
+    return InMemoryJobQueue()
+
+
+job_manager = JobManager(_make_queue())
@@ -1,11 +1,13 @@
+import hashlib
 import jwt
 from datetime import datetime, timedelta
+from uuid import uuid4
 from ..config import JWT_SECRET, JWT_ALGORITHM
 
 def create_access_token(data: dict, expires_minutes: int = 60):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=expires_minutes)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid4().hex})
     return jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
 def decode_access_token(token: str):
@@ -15,3 +17,7 @@ def decode_access_token(token: str):
         return None
     except jwt.InvalidTokenError:
         return None
+
+def token_id(decoded: dict, token: str) -> str:
+    # tokens issued before jti was added are identified by their digest
+    return decoded.get("jti") or hashlib.sha256(token.encode("utf-8")).hexdigest()
@@ -0,0 +1,81 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+from pymongo import DESCENDING
+
+
+# Page size bounds for listing endpoints
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    """Raised for a cursor that was not produced by encode_cursor."""
+
+
+def encode_cursor(sort_value: Optional[datetime], oid: ObjectId) -> str:
+    # documents saved without the sort field have no value to encode
+    raw = json.dumps([sort_value.isoformat() if sort_value else None, str(oid)]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, oid = json.loads(raw)
+        return (datetime.fromisoformat(sort_value) if sort_value is not None else None), ObjectId(oid)
+    except (ValueError, TypeError, InvalidId) as exc:
+        raise InvalidCursor("Invalid pagination cursor.") from exc
+
+
+async def keyset_page(
+    collection,
+    query: Dict[str, Any],
+    sort_field: str,
+    projection: Dict[str, int],
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+) -> Dict[str, Any]:
+    """
+    Newest-first page of `collection` ordered by (sort_field, _id).
+
+    The cursor is the position of the last item returned, so every page is
+    one range scan on a (filter fields, sort_field, _id) index no matter
+    how deep it is. Documents without sort_field sort after all others.
+    Returns {"items", "next_cursor", "total"?}.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    page_query = dict(query)
+    if cursor:
+        after_value, after_id = decode_cursor(cursor)
+        if after_value is None:
+            page_query.update({sort_field: None, "_id": {"$lt": after_id}})
+        else:
+            page_query["$or"] = [
+                {sort_field: {"$lt": after_value}},
+                {sort_field: after_value, "_id": {"$lt": after_id}},
+                {sort_field: None},
+            ]
+
+    found = collection.find(page_query, {**projection, sort_field: 1, "_id": 1})
+    found = found.sort([(sort_field, DESCENDING), ("_id", DESCENDING)]).limit(limit + 1)
+    docs: List[Dict[str, Any]] = await found.to_list(length=limit + 1)
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        next_cursor = encode_cursor(last.get(sort_field), last["_id"])
+
+    for d in docs:
+        d["_id"] = str(d["_id"])
+
+    page = {"items": docs, "next_cursor": next_cursor}
+    if include_total:
+        page["total"] = await collection.count_documents(query)
+    return page
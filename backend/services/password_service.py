@@ -0,0 +1,106 @@
+import asyncio
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import bcrypt
+
+
+# bcrypt cost factor for new hashes; stored hashes with another cost are
+# upgraded (or downgraded) on the next successful login.
+PASSWORD_BCRYPT_ROUNDS = int(os.getenv("PASSWORD_BCRYPT_ROUNDS", "12"))
+
+# Threads that hash at once; bcrypt releases the GIL while it works.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+
+# Hash calls allowed to wait for a thread before new ones are rejected.
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+
+# Seconds a call waits for a pending slot before giving up.
+PASSWORD_HASH_ADMIT_TIMEOUT = float(os.getenv("PASSWORD_HASH_ADMIT_TIMEOUT", "5"))
+
+_COST = re.compile(rb"^\$2[abxy]?\$(\d\d)\$")
+
+
+class PasswordServiceBusy(RuntimeError):
+    """Raised when too many password hashes are already queued."""
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_slots: Optional[asyncio.Semaphore] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=PASSWORD_HASH_WORKERS,
+            thread_name_prefix="bcrypt",
+        )
+    return _executor
+
+
+def _get_slots() -> asyncio.Semaphore:
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_MAX_PENDING)
+    return _slots
+
+
+async def _run(fn, *args):
+    slots = _get_slots()
+    try:
+        await asyncio.wait_for(slots.acquire(), timeout=PASSWORD_HASH_ADMIT_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise PasswordServiceBusy("Too many sign-in requests, try again later.")
+
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), fn, *args)
+    finally:
+        slots.release()
+
+
+def _hash(password: str, rounds: int) -> bytes:
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds))
+
+
+def _check(password: str, hashed: bytes) -> bool:
+    return bcrypt.checkpw(password.encode("utf-8"), hashed)
+
+
+# Verified against when the user does not exist, so unknown and known
+# emails take the same time to reject.
+_dummy_hash: Optional[bytes] = None
+
+
+async def hash_password(password: str) -> bytes:
+    return await _run(_hash, password, PASSWORD_BCRYPT_ROUNDS)
+
+
+async def verify_password(password: str, hashed: Optional[bytes]) -> bool:
+    global _dummy_hash
+    if not hashed:
+        if _dummy_hash is None:
+            _dummy_hash = await hash_password("not-a-real-password")
+        await _run(_check, password, _dummy_hash)
+        return False
+    return await _run(_check, password, hashed)
+
+
+def hash_cost(hashed: bytes) -> Optional[int]:
+    match = _COST.match(hashed)
+    return int(match.group(1)) if match else None
+
+
+def needs_rehash(hashed: bytes) -> bool:
+    return hash_cost(hashed) != PASSWORD_BCRYPT_ROUNDS
+
+
+def shutdown_password_executor():
+    global _executor, _slots
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+    _executor = None
+    _slots = None
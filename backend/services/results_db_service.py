@@ -1,24 +1,231 @@
 from datetime import datetime
-from ..config_atlas import results_collection
+from typing import Any, Dict, List, Optional
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, DESCENDING, ReplaceOne
+from ..config import results_collection, result_rows_collection
+from .metrics_service import timed
+from .pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor
 
+ROW_FIELDS = {"_id": 0, "index": 1, "label": 1, "score": 1, "text": 1}
 
-async def save_result_metadata(user_email: str, analysis_type: str, file_name: str, result_url: str):
+
+@timed("db_save_result_metadata")
+async def save_result_metadata(
+    user_email: str,
+    analysis_type: str,
+    file_name: str,
+    result_url: str,
+    file_id: Optional[str] = None,
+    content_sha256: Optional[str] = None,
+    model_version: Optional[str] = None,
+    summary: Optional[Dict[str, Any]] = None,
+    result_format: Optional[str] = None,
+    result_id: Optional[str] = None,
+    rows_indexed: bool = False,
+) -> str:
     doc = {
         "user_email": user_email,
         "analysis_type": analysis_type,
         "file_name": file_name,
         "result_url": result_url,
+        "file_id": file_id,
+        "content_sha256": content_sha256,
+        "model_version": model_version,
+        "summary": summary,
+        "result_format": result_format,
+        "rows_indexed": rows_indexed,
         "created_at": datetime.utcnow()
     }
-    await results_collection.insert_one(doc)
+    if result_id:
+        # rows may already have been written under this id
+        doc["_id"] = ObjectId(result_id)
+    result = await results_collection.insert_one(doc)
+    return str(result.inserted_id)
+
+
+@timed("db_find_reusable_result")
+async def find_reusable_result(
+    user_email: str,
+    content_sha256: str,
+    analysis_type: str,
+    model_version: str,
+) -> Optional[Dict[str, Any]]:
+    """
+    Latest result of the same analysis over identical content with the
+    same model version, if any.
+    """
+    cursor = results_collection.find({
+        "user_email": user_email,
+        "content_sha256": content_sha256,
+        "analysis_type": analysis_type,
+        "model_version": model_version,
+    }).sort("created_at", -1).limit(1)
+    docs = await cursor.to_list(length=1)
+    if not docs:
+        return None
+
+    doc = docs[0]
+    doc["_id"] = str(doc["_id"])
+    return doc
+
+
+@timed("db_find_latest_result_for_file")
+async def find_latest_result_for_file(
+    user_email: str,
+    file_name: str,
+    analysis_type: str,
+    model_version: str,
+) -> Optional[Dict[str, Any]]:
+    """
+    Latest result of the same analysis and model over any upload with this
+    file name, i.e. an earlier version of the same logical file.
+    """
+    cursor = results_collection.find({
+        "user_email": user_email,
+        "file_name": file_name,
+        "analysis_type": analysis_type,
+        "model_version": model_version,
+    }).sort("created_at", -1).limit(1)
+    docs = await cursor.to_list(length=1)
+    if not docs:
+        return None
+
+    doc = docs[0]
+    doc["_id"] = str(doc["_id"])
+    return doc
+
+
+
+# RESULT ROWS
+# One document per analyzed row, keyed by result id, so rows can be
+# filtered, ranked and aggregated without reading the result blob.
+@timed("db_save_result_rows")
+async def save_result_rows(result_id: str, rows: List[Dict[str, Any]], upsert: bool = False):
+    """
+    Store {"index", "label", "score", "text"} rows of a result. Backfills
+    pass upsert=True so a repeated or concurrent run does not duplicate rows.
+    """
+    if not rows:
+        return
+    docs = [{"result_id": result_id, **row} for row in rows]
+    if not upsert:
+        await result_rows_collection.insert_many(docs, ordered=False)
+        return
+    await result_rows_collection.bulk_write([
+        ReplaceOne({"result_id": result_id, "index": doc["index"]}, doc, upsert=True) for doc in docs
+    ], ordered=False)
 
 
-async def get_results_by_user(user_email: str):
-    cursor = results_collection.find({"user_email": user_email}).sort("created_at", -1)
-    docs = await cursor.to_list(length=1000)
+@timed("db_delete_result_rows")
+async def delete_result_rows(result_id: str):
+    await result_rows_collection.delete_many({"result_id": result_id})
 
-    for d in docs:
-        d["_id"] = str(d["_id"])
-        d["created_at"] = str(d["created_at"])
 
-    return docs
+@timed("db_mark_result_rows_indexed")
+async def mark_result_rows_indexed(result_id: str):
+    await results_collection.update_one({"_id": ObjectId(result_id)}, {"$set": {"rows_indexed": True}})
+
+
+def _rows_query(result_id: str, label: Optional[str], min_score: Optional[float], max_score: Optional[float]):
+    query: Dict[str, Any] = {"result_id": result_id}
+    if label:
+        query["label"] = label
+    score: Dict[str, float] = {}
+    if min_score is not None:
+        score["$gte"] = min_score
+    if max_score is not None:
+        score["$lte"] = max_score
+    if score:
+        query["score"] = score
+    return query
+
+
+@timed("db_query_result_rows")
+async def query_result_rows(
+    result_id: str,
+    label: Optional[str] = None,
+    min_score: Optional[float] = None,
+    max_score: Optional[float] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Page of matching rows in source order. The cursor is the last row
+    index returned. Returns {"items", "next_cursor"}.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query = _rows_query(result_id, label, min_score, max_score)
+    if cursor:
+        try:
+            query["index"] = {"$gt": int(cursor)}
+        except ValueError as exc:
+            raise InvalidCursor("Invalid pagination cursor.") from exc
+
+    found = result_rows_collection.find(query, ROW_FIELDS).sort("index", ASCENDING).limit(limit + 1)
+    docs = await found.to_list(length=limit + 1)
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = str(docs[-1]["index"])
+    return {"items": docs, "next_cursor": next_cursor}
+
+
+@timed("db_get_result_rows_by_hash")
+async def get_result_rows_by_hash(result_id: str, text_hashes: List[str]) -> Dict[str, Dict[str, Any]]:
+    """{text_hash: {"label", "score"}} for rows of a result with these text hashes."""
+    if not text_hashes:
+        return {}
+    found = result_rows_collection.find(
+        {"result_id": result_id, "text_hash": {"$in": text_hashes}},
+        {"_id": 0, "text_hash": 1, "label": 1, "score": 1},
+    )
+    known = {}
+    async for doc in found:
+        known[doc["text_hash"]] = {"label": doc["label"], "score": doc["score"]}
+    return known
+
+
+@timed("db_top_result_rows")
+async def top_result_rows(result_id: str, k: int, label: Optional[str] = None) -> List[Dict[str, Any]]:
+    """The `k` most confident rows, optionally of one label."""
+    k = max(1, min(k, MAX_PAGE_SIZE))
+    found = result_rows_collection.find(_rows_query(result_id, label, None, None), ROW_FIELDS)
+    found = found.sort([("score", DESCENDING), ("index", ASCENDING)]).limit(k)
+    return await found.to_list(length=k)
+
+
+@timed("db_result_score_histogram")
+async def result_score_histogram(
+    result_id: str,
+    bins: int,
+    label: Optional[str] = None,
+    min_score: Optional[float] = None,
+    max_score: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Counts of rows per label over `bins` equal-width score buckets in [0, 1].
+    Returns {"edges", "counts": {label: [count per bucket]}, "total"}.
+    """
+    pipeline = [
+        {"$match": _rows_query(result_id, label, min_score, max_score)},
+        {"$group": {
+            "_id": {
+                "label": "$label",
+                "bin": {"$min": [{"$floor": {"$multiply": ["$score", bins]}}, bins - 1]},
+            },
+            "count": {"$sum": 1},
+        }},
+    ]
+    counts: Dict[str, List[int]] = {}
+    total = 0
+    async for doc in result_rows_collection.aggregate(pipeline):
+        bucket = max(0, int(doc["_id"]["bin"]))
+        counts.setdefault(doc["_id"]["label"], [0] * bins)[bucket] += doc["count"]
+        total += doc["count"]
+
+    return {
+        "edges": [round(i / bins, 6) for i in range(bins + 1)],
+        "counts": dict(sorted(counts.items())),
+        "total": total,
+    }
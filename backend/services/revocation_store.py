@@ -0,0 +1,105 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from . import db_service
+
+
+# How often a worker pulls revocations made by the other workers; a token
+# revoked elsewhere is accepted here for at most this long.
+REVOCATION_SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", "2"))
+
+# Re-read this much of the log on every sync to tolerate clock skew
+# between the workers that write it.
+_SYNC_OVERLAP = timedelta(seconds=5)
+
+
+class RevocationStore:
+    """
+    Local copy of the revoked token ids (jti → exp) of this worker.
+
+    The first check loads every unexpired revocation; afterwards only
+    revocations newer than the last sync are fetched, at most once per
+    REVOCATION_SYNC_SECONDS. Membership checks are then answered from
+    memory, and expired ids are pruned as the tokens themselves expire.
+    Concurrent checks wait for a sync in progress; until one has
+    succeeded, every check retries the load and raises if it fails.
+    """
+
+    def __init__(self):
+        self._revoked: Dict[str, datetime] = {}
+        self._synced_until: Optional[datetime] = None
+        self._next_sync = 0.0
+        self._next_prune = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop = None
+        self.syncs = 0
+        self.sync_failures = 0
+
+    async def is_revoked(self, jti: str) -> bool:
+        await self.sync()
+        exp = self._revoked.get(jti)
+        return exp is not None and exp > datetime.utcnow()
+
+    async def revoke(self, jti: str, exp: datetime):
+        self._revoked[jti] = exp
+        await db_service.add_to_blacklist(jti, exp)
+
+    def _sync_lock(self) -> asyncio.Lock:
+        # one lock per event loop: the store outlives loops in tests and scripts
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock, self._lock_loop = asyncio.Lock(), loop
+        return self._lock
+
+    def _fresh(self) -> bool:
+        return self._synced_until is not None and time.monotonic() < self._next_sync
+
+    async def sync(self, force: bool = False):
+        if not force and self._fresh():
+            return
+        async with self._sync_lock():
+            # another check may have synced while this one waited
+            if not force and self._fresh():
+                return
+            await self._sync()
+
+    async def _sync(self):
+        now = time.monotonic()
+        started = datetime.utcnow()
+        since = None if self._synced_until is None else self._synced_until - _SYNC_OVERLAP
+        try:
+            if since is None:
+                # logouts recorded by raw token before token ids existed
+                await db_service.migrate_legacy_blacklist()
+            docs = await db_service.get_revocations_since(since)
+        except Exception as exc:
+            self.sync_failures += 1
+            if self._synced_until is None:
+                # never loaded: we cannot tell revoked tokens apart
+                raise
+            print(f" Revocation sync failed, keeping the local set: {exc}")
+            return
+
+        for doc in docs:
+            self._revoked[doc["jti"]] = doc["exp"]
+        self._synced_until = started
+        self._next_sync = now + REVOCATION_SYNC_SECONDS
+        self.syncs += 1
+
+        if now >= self._next_prune:
+            self._next_prune = now + 60
+            self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > started}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "revoked": len(self._revoked),
+            "syncs": self.syncs,
+            "sync_failures": self.sync_failures,
+            "sync_seconds": REVOCATION_SYNC_SECONDS,
+        }
+
+
+revocation_store = RevocationStore()
@@ -0,0 +1,83 @@
+# backend/stub_model.py
+
+import re
+from typing import Any, Dict, List, Union
+
+_TOKEN = re.compile(r"\S+")
+
+_POSITIVE = {
+    "good", "great", "love", "excellent", "happy", "fast", "nice", "best",
+    "amazing", "fine", "thanks", "recommend", "perfect", "helpful",
+}
+_NEGATIVE = {
+    "bad", "terrible", "hate", "awful", "slow", "broken", "worst", "poor",
+    "angry", "refund", "bug", "crash", "disappointed", "useless",
+}
+
+
+class StubTokenizer:
+    """
+    Whitespace tokenizer with the slice of the Hugging Face tokenizer
+    interface the inference code uses (input_ids, offset_mapping,
+    truncation, special tokens).
+    """
+
+    def _encode(self, text: str, add_special_tokens: bool, truncation: bool,
+                max_length: int, return_offsets_mapping: bool) -> Dict[str, Any]:
+        spans = [m.span() for m in _TOKEN.finditer(text)]
+        ids = [hash(text[a:b]) & 0xFFFF for a, b in spans]
+        if add_special_tokens:
+            ids = [0] + ids + [2]
+        if truncation and max_length and len(ids) > max_length:
+            ids = ids[:max_length - 1] + [2] if add_special_tokens else ids[:max_length]
+        out = {"input_ids": ids}
+        if return_offsets_mapping:
+            out["offset_mapping"] = spans
+        return out
+
+    def __call__(self, texts: Union[str, List[str]], add_special_tokens: bool = True,
+                 truncation: bool = False, max_length: int = None,
+                 return_offsets_mapping: bool = False, **kwargs):
+        if isinstance(texts, str):
+            return self._encode(texts, add_special_tokens, truncation, max_length, return_offsets_mapping)
+        encoded = [
+            self._encode(t, add_special_tokens, truncation, max_length, return_offsets_mapping)
+            for t in texts
+        ]
+        return {key: [e[key] for e in encoded] for key in encoded[0]} if encoded else {"input_ids": []}
+
+    def save_pretrained(self, path: str):
+        pass
+
+
+class StubSentimentPipeline:
+    """
+    Deterministic lexicon classifier standing in for the HF pipeline.
+    Needs no model download, torch or network; meant for benchmarks,
+    load tests and local development only.
+    """
+
+    def __init__(self, tokenizer: StubTokenizer):
+        self.tokenizer = tokenizer
+
+    def _classify(self, text: str, max_length: int = None) -> Dict[str, Any]:
+        words = [w.strip(".,!?;:\"'()").lower() for w in _TOKEN.findall(text)]
+        if max_length:
+            words = words[:max_length]
+        pos = sum(1 for w in words if w in _POSITIVE)
+        neg = sum(1 for w in words if w in _NEGATIVE)
+        if pos > neg:
+            label = "positive"
+        elif neg > pos:
+            label = "negative"
+        else:
+            label = "neutral"
+        score = 0.5 + 0.5 * abs(pos - neg) / (pos + neg + 1)
+        return {"label": label, "score": score}
+
+    def __call__(self, texts: Union[str, List[str]], batch_size: int = None,
+                 truncation: bool = False, max_length: int = None, **kwargs):
+        limit = max_length if truncation else None
+        if isinstance(texts, str):
+            return [self._classify(texts, limit)]
+        return [self._classify(t, limit) for t in texts]
@@ -0,0 +1,5 @@
+"""In-process stand-ins for Mongo and Blob Storage.
+
+Used when APP_STORAGE_MODE=memory (local load tests and development);
+never enabled in production.
+"""
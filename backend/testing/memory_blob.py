@@ -0,0 +1,101 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+
+class _Downloader:
+    """Mimics azure.storage.blob.aio.StorageStreamDownloader."""
+
+    def __init__(self, data: bytes, chunk_size: int):
+        self._data = data
+        self._chunk_size = chunk_size
+        self.size = len(data)
+
+    async def readall(self) -> bytes:
+        return self._data
+
+    async def _iter(self):
+        for start in range(0, len(self._data), self._chunk_size):
+            await asyncio.sleep(0)
+            yield self._data[start:start + self._chunk_size]
+
+    def chunks(self):
+        return self._iter()
+
+
+class InMemoryBlobClient:
+    def __init__(self, container: "InMemoryContainerClient", name: str):
+        self._container = container
+        self.blob_name = name
+
+    def _data(self) -> bytes:
+        if self.blob_name not in self._container.blobs:
+            # same message shape as ResourceNotFoundError
+            raise FileNotFoundError(f"The specified blob does not exist: {self.blob_name}")
+        return self._container.blobs[self.blob_name]
+
+    async def upload_blob(self, data, overwrite: bool = False, **kwargs):
+        if not overwrite and self.blob_name in self._container.blobs:
+            raise FileExistsError(f"The specified blob already exists: {self.blob_name}")
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self._container.blobs[self.blob_name] = bytes(data)
+
+    async def stage_block(self, block_id: str, data, **kwargs):
+        staged = self._container.staged.setdefault(self.blob_name, {})
+        staged[block_id] = bytes(data)
+
+    async def commit_block_list(self, block_list: List, **kwargs):
+        staged = self._container.staged.pop(self.blob_name, {})
+        ids = [getattr(b, "id", None) or getattr(b, "block_id", None) or b for b in block_list]
+        self._container.blobs[self.blob_name] = b"".join(staged[i] for i in ids)
+
+    async def download_blob(self, offset: Optional[int] = None, length: Optional[int] = None, **kwargs):
+        data = self._data()
+        if offset is not None:
+            end = offset + length if length is not None else len(data)
+            data = data[offset:end]
+        return _Downloader(data, self._container.chunk_size)
+
+    async def get_blob_properties(self, **kwargs):
+        return SimpleNamespace(name=self.blob_name, size=len(self._data()))
+
+    async def delete_blob(self, **kwargs):
+        self._data()
+        del self._container.blobs[self.blob_name]
+
+
+class InMemoryContainerClient:
+    def __init__(self, name: str, chunk_size: int = 4 * 1024 * 1024):
+        self.container_name = name
+        self.chunk_size = chunk_size
+        self.blobs: Dict[str, bytes] = {}
+        self.staged: Dict[str, Dict[str, bytes]] = {}
+
+    def get_blob_client(self, blob: str) -> InMemoryBlobClient:
+        return InMemoryBlobClient(self, blob)
+
+    async def _list(self, prefix: Optional[str]):
+        for name in sorted(self.blobs):
+            if prefix is None or name.startswith(prefix):
+                yield SimpleNamespace(name=name, size=len(self.blobs[name]))
+
+    def list_blobs(self, name_starts_with: Optional[str] = None):
+        return self._list(name_starts_with)
+
+
+class InMemoryBlobServiceClient:
+    """Drop-in for azure.storage.blob.aio.BlobServiceClient in memory mode."""
+
+    account_name = "localmemory"
+
+    def __init__(self):
+        self._containers: Dict[str, InMemoryContainerClient] = {}
+
+    def get_container_client(self, container: str) -> InMemoryContainerClient:
+        if container not in self._containers:
+            self._containers[container] = InMemoryContainerClient(container)
+        return self._containers[container]
+
+    async def close(self):
+        pass
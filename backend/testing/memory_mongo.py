@@ -0,0 +1,12 @@
+def make_memory_mongo_client():
+    """
+    Motor-compatible in-memory client backed by mongomock.
+    Only needed for APP_STORAGE_MODE=memory: pip install mongomock-motor
+    """
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        raise RuntimeError(
+            "APP_STORAGE_MODE=memory needs mongomock-motor: pip install mongomock-motor"
+        )
+    return AsyncMongoMockClient()
@@ -0,0 +1,178 @@
+# backend/text_parsing.py
+
+import csv
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+
+def detect_file_type(file_name: str) -> str:
+    if "." in file_name:
+        ext = file_name.rsplit(".", 1)[1].lower()
+        if ext == "csv":
+            return "csv"
+    return "txt"
+
+
+def pick_text_column(row: Dict[str, Any]) -> Optional[str]:
+    """
+    Use the `text` column when present, otherwise the first non-empty one.
+    """
+    if "text" in row:
+        return "text"
+    for k, v in row.items():
+        if v and v.strip():
+            return k
+    return None
+
+
+class _LineFeed:
+    """Iterator over queued lines; raises StopIteration while empty."""
+
+    def __init__(self):
+        self.lines = deque()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+class TxtLineParser:
+    """
+    Incremental parser for plain-text uploads.
+
+    Feed decoded text in arbitrary chunks; each call returns the complete,
+    non-empty lines seen so far as {"index", "text"} items, numbered from 1.
+    """
+
+    def __init__(self):
+        self._tail = ""
+        self._index = 0
+
+    def _emit(self, lines: List[str]) -> List[Dict[str, Any]]:
+        items = []
+        for line in lines:
+            text = line.strip()
+            if not text:
+                continue
+            self._index += 1
+            items.append({"index": self._index, "text": text})
+        return items
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        lines = (self._tail + text).splitlines(keepends=True)
+        self._tail = ""
+        if lines and not lines[-1].endswith(("\n", "\r")):
+            self._tail = lines.pop()
+        return self._emit(lines)
+
+    def close(self) -> List[Dict[str, Any]]:
+        tail, self._tail = self._tail, ""
+        return self._emit([tail])
+
+
+class CsvRowParser:
+    """
+    Incremental parser for CSV uploads.
+
+    Lines are buffered until no quoted field is left open, so records with
+    quoted newlines are never split, then handed to a single csv.DictReader.
+    Returns {"index", "row", "text_column", "text"} items; `index` counts
+    records the same way enumerate(csv.DictReader(...), start=1) does, and
+    records without any text are skipped.
+    """
+
+    def __init__(self):
+        self._feed = _LineFeed()
+        self._reader = csv.DictReader(self._feed)
+        self._tail = ""
+        self._record = []
+        self._in_quotes = False
+        self._index = 0
+
+    def _ends_record(self, line: str) -> bool:
+        """
+        Follow quoted-field state through `line`. As in the csv module, a
+        quote only opens a quoted field at the start of a field, and ""
+        inside one is an escaped quote.
+        """
+        if not self._in_quotes and '"' not in line:
+            return True
+        in_quotes = self._in_quotes
+        field_start = True
+        closed = False
+        for ch in line:
+            if in_quotes:
+                if ch == '"':
+                    in_quotes, closed = False, True
+                continue
+            if closed and ch == '"':
+                in_quotes, closed = True, False
+                continue
+            closed = False
+            if ch == '"' and field_start:
+                in_quotes = True
+            field_start = ch == ","
+        self._in_quotes = in_quotes
+        return not in_quotes
+
+    def _queue_lines(self, lines: List[str]):
+        for line in lines:
+            self._record.append(line)
+            if self._ends_record(line):
+                self._feed.lines.append("".join(self._record))
+                self._record = []
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        items = []
+        while True:
+            try:
+                row = next(self._reader)
+            except StopIteration:
+                return items
+            self._index += 1
+
+            text_col = pick_text_column(row)
+            if not text_col:
+                continue
+            text_val = (row[text_col] or "").strip()
+            if not text_val:
+                continue
+
+            items.append({
+                "index": self._index,
+                "row": row,
+                "text_column": text_col,
+                "text": text_val,
+            })
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        data = self._tail + text
+        cut = data.rfind("\n") + 1
+        self._tail = data[cut:]
+        self._queue_lines([line + "\n" for line in data[:cut].split("\n")[:-1]])
+        return self._drain()
+
+    def close(self) -> List[Dict[str, Any]]:
+        tail, self._tail = self._tail, ""
+        if tail:
+            self._queue_lines([tail])
+        if self._record:
+            # quoted field still open at EOF: let the csv module decide
+            self._feed.lines.append("".join(self._record))
+            self._record = []
+            self._in_quotes = False
+        return self._drain()
+
+
+def make_parser(file_type: str):
+    return CsvRowParser() if file_type == "csv" else TxtLineParser()
+
+
+def parse_all(text: str, file_type: str) -> List[Dict[str, Any]]:
+    """Parse a fully decoded file in one go."""
+    parser = make_parser(file_type)
+    return parser.feed(text) + parser.close()
@@ -0,0 +1,7 @@
+"""Offline performance benchmarks.
+
+Run from the project root, e.g.:
+    python -m benchmarks.run --rows 20000 --format csv --engine stub
+    python -m benchmarks.compare benchmarks/results/a.json benchmarks/results/b.json
+    python -m benchmarks.password_hashing --logins 200 --concurrency 20
+"""
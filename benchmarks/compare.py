@@ -0,0 +1,39 @@
+"""
+Compare two benchmark result files stage by stage.
+
+    python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json
+"""
+import argparse
+import json
+
+
+def compare(old: dict, new: dict):
+    print(f"{'stage':>13} {'old ms':>10} {'new ms':>10} {'change':>9}")
+    for stage, new_t in new["stages"].items():
+        old_t = old["stages"].get(stage)
+        if not old_t:
+            continue
+        a = old_t["median_seconds"] * 1000
+        b = new_t["median_seconds"] * 1000
+        change = (b - a) / a * 100 if a else 0.0
+        print(f"{stage:>13} {a:10.2f} {b:10.2f} {change:+8.1f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    args = parser.parse_args(argv)
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    if old.get("corpus") != new.get("corpus"):
+        print("Warning: the two runs used different corpora.")
+    compare(old, new)
+
+
+if __name__ == "__main__":
+    main()
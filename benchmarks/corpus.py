@@ -0,0 +1,61 @@
+import csv
+import io
+import math
+import random
+from typing import List
+
+_POSITIVE = ["good", "great", "love", "excellent", "happy", "fast", "helpful", "perfect"]
+_NEGATIVE = ["bad", "terrible", "hate", "awful", "slow", "broken", "useless", "crash"]
+_NEUTRAL = [
+    "the", "order", "service", "app", "today", "delivery", "team", "update",
+    "was", "is", "and", "with", "for", "after", "support", "price", "this",
+    "product", "week", "again", "customer", "review", "time", "really",
+]
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    tone = rng.random()
+    out = []
+    for _ in range(max(1, words)):
+        r = rng.random()
+        if r < 0.12:
+            out.append(rng.choice(_POSITIVE if tone > 0.5 else _NEGATIVE))
+        else:
+            out.append(rng.choice(_NEUTRAL))
+    return " ".join(out).capitalize() + "."
+
+
+def generate_rows(
+    rows: int,
+    mean_words: float = 20.0,
+    sigma: float = 0.8,
+    dup_ratio: float = 0.0,
+    seed: int = 1234,
+) -> List[str]:
+    """
+    Reproducible synthetic rows. Row lengths (in words) follow a lognormal
+    distribution around `mean_words` with spread `sigma`; a `dup_ratio`
+    share of rows repeats an earlier row verbatim.
+    """
+    rng = random.Random(seed)
+    out: List[str] = []
+    mu = max(0.0, math.log(max(mean_words, 1.0)) - sigma * sigma / 2)
+    for _ in range(rows):
+        if out and rng.random() < dup_ratio:
+            out.append(rng.choice(out))
+        else:
+            out.append(_sentence(rng, int(rng.lognormvariate(mu, sigma))))
+    return out
+
+
+def render(rows: List[str], fmt: str) -> bytes:
+    """Encode rows as an upload would look: a .txt or a .csv file."""
+    if fmt == "txt":
+        return ("\n".join(rows) + "\n").encode("utf-8")
+
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(["id", "text", "source"])
+    for i, row in enumerate(rows, start=1):
+        writer.writerow([i, row, "synthetic"])
+    return buf.getvalue().encode("utf-8")
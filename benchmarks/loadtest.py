@@ -0,0 +1,182 @@
+"""
+Concurrent load generator for the API.
+
+In-process against in-memory Mongo/Blob stand-ins and the stub model
+(needs mongomock-motor), no cloud services involved:
+
+    python -m benchmarks.loadtest --in-process --users 20 --iterations 5
+
+Against a running server:
+
+    python -m benchmarks.loadtest --url http://localhost:8000 --users 20
+
+Every virtual user registers, logs in, then repeats: upload, list
+uploads, line-by-line analysis, summary analysis, list results and
+download (JSON and CSV). Latency percentiles and requests/sec are
+reported per endpoint.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import defaultdict
+from typing import Dict, List
+from uuid import uuid4
+
+from .corpus import generate_rows, render
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an unsorted list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100.0 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def call(self, client, name: str, method: str, url: str, ok=(200,), **kwargs):
+        started = time.perf_counter()
+        try:
+            resp = await client.request(method, url, **kwargs)
+        except Exception:
+            self.errors[name] += 1
+            self.latencies[name].append(time.perf_counter() - started)
+            return None
+        self.latencies[name].append(time.perf_counter() - started)
+        if resp.status_code not in ok:
+            self.errors[name] += 1
+            return None
+        return resp
+
+    def report(self, wall_seconds: float) -> Dict[str, Dict[str, float]]:
+        out = {}
+        for name, values in sorted(self.latencies.items()):
+            out[name] = {
+                "requests": len(values),
+                "errors": self.errors.get(name, 0),
+                "p50_ms": percentile(values, 50) * 1000,
+                "p95_ms": percentile(values, 95) * 1000,
+                "p99_ms": percentile(values, 99) * 1000,
+                "mean_ms": sum(values) / len(values) * 1000,
+                "requests_per_second": len(values) / wall_seconds if wall_seconds else 0.0,
+            }
+        total = sum(len(v) for v in self.latencies.values())
+        out["_total"] = {
+            "requests": total,
+            "errors": sum(self.errors.values()),
+            "requests_per_second": total / wall_seconds if wall_seconds else 0.0,
+            "wall_seconds": wall_seconds,
+        }
+        return out
+
+
+async def virtual_user(client, rec: Recorder, upload: bytes, file_name: str, iterations: int):
+    email = f"load_{uuid4().hex[:12]}@example.com"
+    password = "load-test-password"
+
+    await rec.call(client, "POST /auth/register", "POST", "/auth/register",
+                   json={"name": "Load Test", "email": email, "password": password})
+    resp = await rec.call(client, "POST /auth/login", "POST", "/auth/login",
+                          json={"email": email, "password": password})
+    if resp is None:
+        return
+    headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+    for _ in range(iterations):
+        resp = await rec.call(client, "POST /uploads", "POST", "/uploads", headers=headers,
+                              files={"file": (file_name, upload, "text/csv")})
+        if resp is None:
+            continue
+        file_id = resp.json()["file_info"]["id"]
+
+        await rec.call(client, "GET /uploads", "GET", "/uploads", headers=headers)
+        await rec.call(client, "GET /auth/profile", "GET", "/auth/profile", headers=headers)
+
+        resp = await rec.call(client, "POST /analysis/linebyline/{id}", "POST",
+                              f"/analysis/linebyline/{file_id}?force=true", headers=headers)
+        await rec.call(client, "POST /analysis/summary/{id}", "POST",
+                       f"/analysis/summary/{file_id}?force=true", headers=headers)
+        await rec.call(client, "GET /analysis/results", "GET", "/analysis/results", headers=headers)
+
+        if resp is not None and resp.json().get("result_id"):
+            result_id = resp.json()["result_id"]
+            for fmt in ("json", "csv"):
+                await rec.call(client, f"GET /analysis/download/{{id}}?format={fmt}", "GET",
+                               f"/analysis/download/{result_id}?format={fmt}", headers=headers)
+
+
+async def run(args) -> Dict[str, Dict[str, float]]:
+    import httpx
+
+    rows = generate_rows(args.rows, args.mean_words, dup_ratio=args.dup_ratio, seed=args.seed)
+    upload = render(rows, "csv")
+    rec = Recorder()
+    timeout = httpx.Timeout(args.timeout)
+
+    async def drive(client):
+        started = time.perf_counter()
+        await asyncio.gather(*[
+            virtual_user(client, rec, upload, "loadtest.csv", args.iterations)
+            for _ in range(args.users)
+        ])
+        return time.perf_counter() - started
+
+    if args.in_process:
+        # must be set before the app (and its config) is imported
+        os.environ["APP_STORAGE_MODE"] = "memory"
+        os.environ.setdefault("SENTIMENT_ENGINE", "stub")
+        from backend.app import app
+
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=timeout) as client:
+                wall = await drive(client)
+    else:
+        async with httpx.AsyncClient(base_url=args.url, timeout=timeout) as client:
+            wall = await drive(client)
+
+    return rec.report(wall)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent API load test.")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="base URL of a running server")
+    target.add_argument("--in-process", action="store_true",
+                        help="run the app in-process with in-memory storage and the stub model")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--rows", type=int, default=500, help="rows per uploaded CSV")
+    parser.add_argument("--mean-words", type=float, default=20.0)
+    parser.add_argument("--dup-ratio", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--out", help="write the report as JSON to this file")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+
+    print(f"{'endpoint':<42} {'n':>6} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8}")
+    for name, r in report.items():
+        if name == "_total":
+            continue
+        print(f"{name:<42} {r['requests']:>6} {r['errors']:>4} {r['p50_ms']:>9.1f} "
+              f"{r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f} {r['requests_per_second']:>8.1f}")
+    total = report["_total"]
+    print(f"total: {total['requests']} requests, {total['errors']} errors, "
+          f"{total['requests_per_second']:.1f} req/s over {total['wall_seconds']:.1f}s")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Login throughput and event-loop lag with bcrypt run inline in the
+coroutine (the old handlers) versus through the password service's
+executor.
+
+    python -m benchmarks.password_hashing --logins 200 --concurrency 20
+    python -m benchmarks.password_hashing --rounds 10 --workers 4
+
+A probe task sleeps --probe-ms in a loop and records how late it wakes
+up; that lateness is what every other request on the worker (analysis
+streams, downloads) experiences while logins are being verified.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Dict, List
+
+from .loadtest import percentile
+
+
+async def _probe(lags: List[float], interval: float, stop: asyncio.Event):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, time.perf_counter() - started - interval))
+
+
+async def run_mode(mode: str, logins: int, concurrency: int, probe_ms: float) -> Dict[str, float]:
+    import bcrypt
+    from backend.services import password_service
+
+    password = "correct horse battery staple"
+    stored = password_service._hash(password, password_service.PASSWORD_BCRYPT_ROUNDS)
+
+    async def login_inline():
+        # what the handlers did before: bcrypt on the event loop
+        return bcrypt.checkpw(password.encode("utf-8"), stored)
+
+    async def login_executor():
+        return await password_service.verify_password(password, stored)
+
+    login = login_inline if mode == "inline" else login_executor
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with gate:
+            assert await login()
+
+    lags: List[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.ensure_future(_probe(lags, probe_ms / 1000.0, stop))
+    await asyncio.sleep(0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(logins)])
+    wall = time.perf_counter() - started
+
+    stop.set()
+    await probe
+    password_service.shutdown_password_executor()
+
+    return {
+        "logins": logins,
+        "wall_seconds": wall,
+        "logins_per_second": logins / wall if wall else 0.0,
+        "loop_lag_p50_ms": percentile(lags, 50) * 1000,
+        "loop_lag_p99_ms": percentile(lags, 99) * 1000,
+        "loop_lag_max_ms": max(lags) * 1000 if lags else 0.0,
+        "probe_samples": len(lags),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="bcrypt login throughput and event-loop lag.")
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost factor")
+    parser.add_argument("--workers", type=int, default=2, help="PASSWORD_HASH_WORKERS")
+    parser.add_argument("--probe-ms", type=float, default=10.0)
+    parser.add_argument("--modes", nargs="+", choices=["inline", "executor"], default=["inline", "executor"])
+    parser.add_argument("--out", help="write the report as JSON to this file")
+    args = parser.parse_args(argv)
+
+    # must be set before backend.services.password_service is imported
+    os.environ["PASSWORD_BCRYPT_ROUNDS"] = str(args.rounds)
+    os.environ["PASSWORD_HASH_WORKERS"] = str(args.workers)
+    os.environ["PASSWORD_HASH_MAX_PENDING"] = str(max(args.concurrency, 1))
+
+    report = {
+        mode: asyncio.run(run_mode(mode, args.logins, args.concurrency, args.probe_ms))
+        for mode in args.modes
+    }
+
+    print(f"{'mode':<10} {'logins/s':>9} {'lag p50 ms':>11} {'lag p99 ms':>11} {'lag max ms':>11}")
+    for mode, r in report.items():
+        print(f"{mode:<10} {r['logins_per_second']:>9.1f} {r['loop_lag_p50_ms']:>11.1f} "
+              f"{r['loop_lag_p99_ms']:>11.1f} {r['loop_lag_max_ms']:>11.1f}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Stage-by-stage benchmark of the line-by-line analysis path.
+
+    python -m benchmarks.run --rows 20000 --format csv --dup-ratio 0.2
+    python -m benchmarks.run --engine torch --model ./models/tiny-sentiment
+
+Writes one JSON file per run to --out (default benchmarks/results/).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+from .corpus import generate_rows, render
+
+STAGES = ["decode", "parse", "lengths", "forward", "analyze_many", "summarize", "serialize"]
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return "unknown"
+
+
+async def _write_result(items, results, summary) -> float:
+    """Seconds to stream a compact result blob, as the routes write it."""
+    from backend import result_format
+    from backend.services import azure_blob_service
+
+    writer = result_format.ResultWriter("benchmarks/result.sres", {"analysis_type": "linebyline"})
+    started = time.perf_counter()
+    for start in range(0, len(items), result_format.RESULT_BLOCK_ROWS):
+        end = start + result_format.RESULT_BLOCK_ROWS
+        await writer.add(items[start:end], results[start:end])
+    await writer.close(summary)
+    elapsed = time.perf_counter() - started
+    await azure_blob_service.delete_blob(writer.blob_name)
+    return elapsed
+
+
+def run_once(raw: bytes, fmt: str, batch_size: int) -> Dict[str, float]:
+    from backend import sentiment_analysis as sa
+    from backend.text_parsing import parse_all
+
+    timings = {}
+
+    started = time.perf_counter()
+    text = raw.decode("utf-8", errors="ignore")
+    timings["decode"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    items = parse_all(text, fmt)
+    timings["parse"] = time.perf_counter() - started
+    texts = [item["text"] for item in items]
+
+    started = time.perf_counter()
+    sa._estimated_lengths(texts)
+    timings["lengths"] = time.perf_counter() - started
+
+    # raw model time: fixed-size batches, no batcher, bucketing or cache
+    started = time.perf_counter()
+    results = []
+    for start in range(0, len(texts), batch_size):
+        results.extend(sa._forward(texts[start:start + batch_size]))
+    timings["forward"] = time.perf_counter() - started
+
+    # what the routes call: cache, dedupe, bucketing, micro-batcher
+    sa.cache.clear()
+    started = time.perf_counter()
+    results = sa.analyze_many(texts)
+    timings["analyze_many"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    summary = sa.build_summary(results)
+    timings["summarize"] = time.perf_counter() - started
+
+    timings["serialize"] = asyncio.run(_write_result(items, results, summary))
+
+    timings["_rows"] = len(texts)
+    return timings
+
+
+def summarize_runs(runs: List[Dict[str, float]]) -> Dict[str, Any]:
+    rows = runs[0]["_rows"]
+    out = {}
+    for stage in STAGES:
+        values = [r[stage] for r in runs]
+        median = statistics.median(values)
+        out[stage] = {
+            "median_seconds": median,
+            "min_seconds": min(values),
+            "max_seconds": max(values),
+            "rows_per_second": rows / median if median else None,
+        }
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the analysis stages on a synthetic corpus.")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--format", choices=["txt", "csv"], default="csv")
+    parser.add_argument("--mean-words", type=float, default=20.0)
+    parser.add_argument("--sigma", type=float, default=0.8, help="lognormal spread of row lengths")
+    parser.add_argument("--dup-ratio", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--engine", default="stub", help="SENTIMENT_ENGINE to load")
+    parser.add_argument("--model", default=None, help="local model directory (SENTIMENT_MODEL_NAME)")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", default=os.path.join("benchmarks", "results"))
+    args = parser.parse_args(argv)
+
+    # must be set before backend.sentiment_analysis is imported
+    os.environ["SENTIMENT_ENGINE"] = args.engine
+    os.environ["SENTIMENT_CACHE_SQLITE_PATH"] = ""
+    # result blobs for the serialize stage go to the in-memory store
+    os.environ.setdefault("APP_STORAGE_MODE", "memory")
+    os.environ.setdefault("HF_HUB_OFFLINE", "1")
+    if args.model:
+        os.environ["SENTIMENT_MODEL_NAME"] = args.model
+
+    from backend import sentiment_analysis as sa
+
+    rows = generate_rows(args.rows, args.mean_words, args.sigma, args.dup_ratio, args.seed)
+    raw = render(rows, args.format)
+
+    load_started = time.perf_counter()
+    sa.get_model()
+    load_seconds = time.perf_counter() - load_started
+
+    runs = [run_once(raw, args.format, args.batch_size) for _ in range(args.repeat)]
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "git_commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "engine": args.engine,
+            "model": sa.MODEL_NAME,
+            "model_load_seconds": load_seconds,
+        },
+        "corpus": {
+            "rows": args.rows,
+            "format": args.format,
+            "bytes": len(raw),
+            "mean_words": args.mean_words,
+            "sigma": args.sigma,
+            "dup_ratio": args.dup_ratio,
+            "seed": args.seed,
+        },
+        "repeat": args.repeat,
+        "batch_size": args.batch_size,
+        "stages": summarize_runs(runs),
+        "engine_stats": sa.get_inference_stats(),
+    }
+
+    os.makedirs(args.out, exist_ok=True)
+    name = f"{report['meta']['timestamp'].replace(':', '')}_{args.engine}_{args.format}_{args.rows}.json"
+    path = os.path.join(args.out, name)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=4)
+
+    for stage, t in report["stages"].items():
+        print(f"{stage:>13}: {t['median_seconds'] * 1000:10.2f} ms")
+    print(f"Results written to {path}")
+    sa.batcher.stop()
+    return path
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+# gunicorn -c gunicorn.conf.py backend.app:app
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "300"))
+
+# Import the app (and the model weights) once in the master; forked
+# workers then share the weights copy-on-write instead of each loading
+# their own copy.
+preload_app = True
+os.environ.setdefault("SENTIMENT_PRELOAD", "import")
+
+# Several workers serve one API, so background jobs must live in Mongo:
+# with the per-process "memory" queue, job status and cancel requests
+# that land on another worker would 404.
+os.environ.setdefault("JOB_QUEUE_BACKEND", "mongo")
@@ -3,5 +3,6 @@
 # Install dependencies
 pip install -r requirements.txt
 
-# Run FastAPI using uvicorn
-uvicorn backend.app:app --host 0.0.0.0 --port 8000
+# Run FastAPI under gunicorn with uvicorn workers; the model is preloaded
+# once and shared by the workers (see gunicorn.conf.py)
+gunicorn -c gunicorn.conf.py backend.app:app
@@ -0,0 +1,32 @@
+# tests/conftest.py
+"""
+Run the app in-process with in-memory storage and the stub model.
+The environment must be set before anything under backend is imported.
+"""
+
+import os
+from contextlib import asynccontextmanager
+from uuid import uuid4
+
+os.environ["APP_STORAGE_MODE"] = "memory"
+os.environ["SENTIMENT_ENGINE"] = "stub"
+os.environ["SENTIMENT_PRELOAD"] = "off"
+os.environ["SENTIMENT_CACHE_ENABLED"] = "false"
+os.environ["JOB_QUEUE_BACKEND"] = "memory"
+os.environ.setdefault("PASSWORD_BCRYPT_ROUNDS", "4")
+os.environ.setdefault("JOB_PROGRESS_SECONDS", "0")
+
+
+@asynccontextmanager
+async def api_client():
+    """Client for the app plus auth headers of a freshly registered user."""
+    import httpx
+    from backend.app import app
+
+    email = f"test_{uuid4().hex[:12]}@example.com"
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=60) as client:
+            await client.post("/auth/register", json={"name": "Test", "email": email, "password": "pw"})
+            resp = await client.post("/auth/login", json={"email": email, "password": "pw"})
+            yield client, {"Authorization": f"Bearer {resp.json()['access_token']}"}
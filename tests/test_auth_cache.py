@@ -0,0 +1,47 @@
+import asyncio
+import time
+
+from backend.services import auth_cache as auth_cache_module
+from backend.services.auth_cache import AuthCache
+
+from .conftest import api_client
+
+USER = {"email": "a@example.com", "name": "A"}
+
+
+def test_profile_update_invalidates_other_workers(monkeypatch):
+    monkeypatch.setattr(auth_cache_module, "AUTH_CACHE_SYNC_SECONDS", 0)
+
+    async def scenario():
+        async with api_client():
+            updating, other = AuthCache(), AuthCache()
+            await other.sync()
+            other.put("token-b", USER, None, other.generation)
+            other.put("token-c", {"email": "c@example.com"}, None, other.generation)
+            assert other.get("token-b") == USER
+
+            await updating.invalidate_email(USER["email"])
+            await other.sync()
+            assert other.get("token-b") is None
+            assert other.get("token-c") is not None
+
+    asyncio.run(scenario())
+
+
+def test_lookup_racing_an_invalidation_is_not_cached():
+    cache = AuthCache()
+    generation = cache.generation
+    cache.drop_email(USER["email"])
+    cache.put("token", USER, None, generation)
+    assert cache.get("token") is None
+
+
+def test_entries_expire_with_the_token_and_stay_bounded():
+    cache = AuthCache(ttl=30, max_entries=2)
+    cache.put("expired", USER, time.time() - 1, cache.generation)
+    assert cache.get("expired") is None
+
+    for token in ("t1", "t2", "t3"):
+        cache.put(token, USER, None, cache.generation)
+    assert cache.get("t1") is None
+    assert cache.stats()["entries"] == 2
@@ -0,0 +1,88 @@
+import asyncio
+
+from backend.routes.analysis_routes import _accepts_gzip
+
+from .conftest import api_client
+
+
+def test_accepts_gzip_honours_q_values():
+    assert _accepts_gzip("gzip, deflate, br")
+    assert _accepts_gzip("br;q=1.0, GZIP;q=0.5")
+    assert _accepts_gzip("*")
+    assert not _accepts_gzip(None)
+    assert not _accepts_gzip("gzip;q=0")
+    assert not _accepts_gzip("deflate, gzip; q=0.0")
+    assert not _accepts_gzip("*, gzip;q=0")
+    assert not _accepts_gzip("identity")
+
+
+def test_export_encoding_and_empty_csv():
+    content = b"id,text\n1,good phone\n2,bad battery\n"
+
+    async def scenario():
+        async with api_client() as (client, headers):
+            resp = await client.post("/uploads", headers=headers,
+                                     files={"file": ("reviews.csv", content, "text/csv")})
+            file_id = resp.json()["file_info"]["id"]
+            result_id = (await client.post(f"/analysis/linebyline/{file_id}", headers=headers)).json()["result_id"]
+            url = f"/analysis/download/{result_id}"
+
+            resp = await client.get(url, params={"format": "csv"},
+                                    headers={**headers, "Accept-Encoding": "gzip;q=0"})
+            assert resp.status_code == 200
+            assert "content-encoding" not in resp.headers
+            assert resp.text.count("\n") == 3
+
+            resp = await client.get(url, params={"format": "csv"},
+                                    headers={**headers, "Accept-Encoding": "gzip"})
+            assert resp.headers["content-encoding"] == "gzip"
+            assert resp.text.count("\n") == 3
+
+            resp = await client.get(url, params={"format": "csv", "offset": 5}, headers=headers)
+            assert resp.status_code == 400
+            assert resp.json()["detail"] == "This result contains no rows to export."
+
+            resp = await client.get(url, params={"format": "json", "offset": 5}, headers=headers)
+            assert resp.status_code == 200
+            assert resp.json()["rows"] == []
+
+    asyncio.run(scenario())
+
+
+def test_csv_export_columns_do_not_depend_on_the_first_row():
+    from backend.routes.analysis_routes import _export_csv
+
+    async def events():
+        yield "row", {"index": 1, "label": "neutral", "score": 0.5}
+        yield "row", {"index": 2, "text": "good phone", "label": "positive", "score": 0.75}
+
+    async def render():
+        return b"".join([chunk async for chunk in _export_csv(events(), ["index", "text", "label", "score"])])
+
+    assert asyncio.run(render()).decode().splitlines() == [
+        "index,text,label,score",
+        "1,,neutral,0.5",
+        "2,good phone,positive,0.75",
+    ]
+
+
+def test_csv_export_after_the_upload_is_deleted():
+    content = b"id,text\n1,good phone\n2,bad battery\n"
+
+    async def scenario():
+        async with api_client() as (client, headers):
+            resp = await client.post("/uploads", headers=headers,
+                                     files={"file": ("reviews.csv", content, "text/csv")})
+            file_id = resp.json()["file_info"]["id"]
+            result_id = (await client.post(f"/analysis/linebyline/{file_id}", headers=headers)).json()["result_id"]
+            await client.delete(f"/uploads/{file_id}", headers=headers)
+
+            resp = await client.get(f"/analysis/download/{result_id}", params={"format": "csv"}, headers=headers)
+            assert resp.status_code == 200
+            assert resp.text.splitlines() == [
+                "index,row,text_column,label,score",
+                "1,,,positive,0.75",
+                "2,,,negative,0.75",
+            ]
+
+    asyncio.run(scenario())
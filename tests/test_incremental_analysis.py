@@ -0,0 +1,58 @@
+import asyncio
+import json
+
+from .conftest import api_client
+
+
+def _version_one():
+    return "".join(
+        f"line {i} {'good' if i % 3 == 0 else 'bad' if i % 3 == 1 else 'meh'}\n" for i in range(300)
+    ).encode()
+
+
+def _version_two(v1):
+    lines = v1.decode().splitlines(keepends=True)
+    lines[5] = "line 5 great and good\n"      # changed
+    lines[7] = "line 7 good\n"                # changed label
+    del lines[100:110]                        # removed
+    lines.append("brand new good line\n")     # added
+    return "".join(lines).encode()
+
+
+def test_incremental_run_matches_a_full_recompute():
+    v1 = _version_one()
+    v2 = _version_two(v1)
+
+    async def scenario():
+        async with api_client() as (client, headers):
+            async def upload(content):
+                resp = await client.post("/uploads", headers=headers,
+                                         files={"file": ("log.txt", content, "text/plain")})
+                return resp.json()["file_info"]["id"]
+
+            first = await upload(v1)
+            base = (await client.post(f"/analysis/linebyline/{first}", headers=headers)).json()
+
+            second = await upload(v2)
+            inc = (await client.post(f"/analysis/linebyline/{second}?incremental=true", headers=headers)).json()
+            full = (await client.post(f"/analysis/linebyline/{second}?force=true", headers=headers)).json()
+
+            assert inc["rows"] == full["rows"]
+            assert inc["summary"] == full["summary"]
+            assert inc["incremental"] == {
+                "base_result_id": base["result_id"],
+                "rows_reused": 288,
+                "rows_inferred": 3,
+            }
+
+            # the full run is now the latest version of the file
+            lines = (await client.post(
+                f"/analysis/linebyline/{second}/stream?incremental=true", headers=headers
+            )).text.strip().split("\n")
+            done = json.loads(lines[-1])
+            assert [json.loads(line) for line in lines[:-1]] == full["rows"]
+            assert done["summary"] == full["summary"]
+            assert done["incremental"]["base_result_id"] == full["result_id"]
+            assert done["incremental"]["rows_inferred"] == 0
+
+    asyncio.run(scenario())
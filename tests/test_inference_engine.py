@@ -0,0 +1,39 @@
+import pytest
+
+from backend.inference_engine import MicroBatcher
+
+
+def _echo(texts):
+    return [{"label": "neutral", "text": text} for text in texts]
+
+
+def test_failing_flush_callback_keeps_the_worker_running():
+    def on_flush(size, waits):
+        raise RuntimeError("metrics backend down")
+
+    batcher = MicroBatcher(_echo, max_wait_ms=0, on_flush=on_flush)
+    try:
+        assert [out["text"] for out in batcher.run(["a", "b"])] == ["a", "b"]
+        assert [out["text"] for out in batcher.run(["c"])] == ["c"]
+    finally:
+        batcher.stop()
+
+
+def test_bad_batch_fails_its_callers_only():
+    calls = []
+
+    def run_batch(texts):
+        calls.append(texts)
+        if len(calls) == 1:
+            return _echo(texts)[:-1]      # one result short
+        return _echo(texts)
+
+    batcher = MicroBatcher(run_batch, max_wait_ms=0)
+    try:
+        futures = batcher.submit(["a", "b"])
+        with pytest.raises(RuntimeError):
+            [f.result(timeout=5) for f in futures]
+        assert [out["text"] for out in batcher.run(["c"])] == ["c"]
+        assert batcher.stats()["failed_batches"] == 1
+    finally:
+        batcher.stop()
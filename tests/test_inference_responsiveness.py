@@ -0,0 +1,46 @@
+import asyncio
+import time
+
+from backend.stub_model import StubSentimentPipeline
+
+from .conftest import api_client
+
+ROW_SECONDS = 0.01
+ROWS = 200
+
+
+def test_other_endpoints_stay_responsive_during_long_analysis(monkeypatch):
+    classify = StubSentimentPipeline._classify
+
+    def slow_classify(self, text, max_length=None):
+        time.sleep(ROW_SECONDS)  # stands in for a blocking forward pass
+        return classify(self, text, max_length)
+
+    monkeypatch.setattr(StubSentimentPipeline, "_classify", slow_classify)
+
+    async def scenario():
+        async with api_client() as (client, headers):
+            content = "".join(f"line {i} good\n" for i in range(ROWS)).encode()
+            resp = await client.post("/uploads", headers=headers,
+                                     files={"file": ("long.txt", content, "text/plain")})
+            file_id = resp.json()["file_info"]["id"]
+
+            analysis = asyncio.ensure_future(
+                client.post(f"/analysis/linebyline/{file_id}?force=true", headers=headers)
+            )
+            await asyncio.sleep(0.3)
+            assert not analysis.done()
+
+            started = time.perf_counter()
+            profile = await client.get("/auth/profile", headers=headers)
+            latency = time.perf_counter() - started
+
+            assert profile.status_code == 200
+            assert not analysis.done()
+            assert latency < 0.5
+
+            resp = await analysis
+            assert resp.status_code == 200
+            assert resp.json()["summary"]["total"] == ROWS
+
+    asyncio.run(scenario())
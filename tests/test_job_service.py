@@ -0,0 +1,148 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from mongomock_motor import AsyncMongoMockClient
+
+from backend.services import job_service
+from backend.services.job_service import (
+    FAILED,
+    JOB_LEASE_SECONDS,
+    QUEUED,
+    RUNNING,
+    SUCCEEDED,
+    InMemoryJobQueue,
+    JobManager,
+    MongoJobQueue,
+)
+
+from .conftest import api_client
+
+
+def _job(job_id, state=QUEUED, **fields):
+    job = {
+        "id": job_id,
+        "kind": "echo",
+        "user_email": "a@example.com",
+        "payload": {},
+        "state": state,
+        "cancel_requested": False,
+        "attempts": 0,
+        "heartbeat_at": None,
+        "created_at": datetime.utcnow(),
+        "finished_at": None,
+    }
+    job.update(fields)
+    return job
+
+
+def test_stale_running_job_is_reclaimed():
+    async def scenario():
+        queue = MongoJobQueue(AsyncMongoMockClient()["test"]["jobs"])
+        long_ago = datetime.utcnow() - timedelta(seconds=JOB_LEASE_SECONDS * 2)
+        await queue.put(_job("lost", RUNNING, attempts=1, started_at=long_ago, heartbeat_at=long_ago))
+        await queue.put(_job("alive", RUNNING, attempts=1, started_at=long_ago, heartbeat_at=datetime.utcnow()))
+
+        job = await queue.claim()
+        assert job["id"] == "lost"
+        assert job["attempts"] == 2
+        assert (await queue.get("alive"))["attempts"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_job_lost_too_often_fails():
+    async def scenario():
+        queue = InMemoryJobQueue()
+        manager = JobManager(queue)
+        manager.register("echo", lambda job, ctx: asyncio.sleep(0, result={}))
+        await queue.put(_job("x", attempts=job_service.JOB_MAX_ATTEMPTS))
+        await manager._run(await queue.claim())
+        assert (await queue.get("x"))["state"] == FAILED
+
+    asyncio.run(scenario())
+
+
+def test_finished_jobs_are_pruned(monkeypatch):
+    monkeypatch.setattr(job_service, "JOB_RETENTION_SECONDS", 60)
+
+    async def scenario():
+        queue = InMemoryJobQueue()
+        old = datetime.utcnow() - timedelta(seconds=120)
+        await queue.put(_job("old", SUCCEEDED, finished_at=old))
+        await queue.put(_job("running", RUNNING))
+        await queue.put(_job("new"))
+        assert await queue.get("old") is None
+        assert await queue.get("running") is not None
+
+    asyncio.run(scenario())
+
+
+def test_workers_start_with_the_app():
+    from backend.services.job_service import job_manager
+
+    async def scenario():
+        async with api_client():
+            job_manager.register("echo", lambda job, ctx: asyncio.sleep(0, result={"ok": True}))
+            # queued without submit(), e.g. left over from a previous run
+            await job_manager.queue.put(_job("leftover"))
+            for _ in range(100):
+                job = await job_manager.get("leftover")
+                if job["state"] == SUCCEEDED:
+                    break
+                await asyncio.sleep(0.02)
+            assert job["state"] == SUCCEEDED
+            assert job["result"] == {"ok": True}
+
+    asyncio.run(scenario())
+
+
+def test_job_of_stopped_worker_is_requeued():
+    async def scenario():
+        queue = InMemoryJobQueue()
+        started = asyncio.Event()
+
+        async def slow(job, ctx):
+            await ctx.report(rows_done=7, force=True)
+            started.set()
+            await asyncio.sleep(60)
+
+        manager = JobManager(queue, workers=1)
+        manager.register("echo", slow)
+        manager.start()
+        await queue.put(_job("x"))
+        await asyncio.wait_for(started.wait(), timeout=5)
+        await manager.stop()
+
+        job = await queue.get("x")
+        assert job["state"] == QUEUED
+        assert job["attempts"] == 0
+        assert job["heartbeat_at"] is None
+        assert job["rows_done"] == 7
+
+        manager = JobManager(queue, workers=1)
+        manager.register("echo", lambda job, ctx: asyncio.sleep(0, result={"ok": True}))
+        manager.start()
+        for _ in range(100):
+            job = await queue.get("x")
+            if job["state"] == SUCCEEDED:
+                break
+            await asyncio.sleep(0.02)
+        await manager.stop()
+        assert job["state"] == SUCCEEDED
+        assert job["attempts"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_mongo_requeue_keeps_progress():
+    async def scenario():
+        queue = MongoJobQueue(AsyncMongoMockClient()["test"]["jobs"])
+        await queue.put(_job("x", rows_done=5))
+        job = await queue.claim()
+        await queue.requeue(job["id"])
+
+        job = await queue.get("x")
+        assert (job["state"], job["attempts"], job["rows_done"]) == (QUEUED, 0, 5)
+        assert (await queue.claim())["id"] == "x"
+
+    asyncio.run(scenario())
@@ -0,0 +1,47 @@
+import asyncio
+import random
+
+from backend import sentiment_analysis as sa
+
+from .conftest import api_client
+
+
+def _lines(count, seed=7):
+    rng = random.Random(seed)
+    words = "good bad great terrible fine phone battery awful love hate".split()
+    return [" ".join(rng.choice(words) for _ in range(rng.randint(1, 30))) for _ in range(count)]
+
+
+def test_pieces_match_the_whole_document(monkeypatch):
+    monkeypatch.setattr(sa, "INFERENCE_MAX_TOKENS", 40)
+    monkeypatch.setattr(sa, "LONG_TEXT_OVERLAP_TOKENS", 7)
+    lines = _lines(200)
+    whole = sa.analyze_long_text("\n".join(lines))
+    assert whole["chunks"]["tokens"] == sum(len(line.split()) for line in lines)
+
+    for size in (1, 3, 17, 200):
+        acc = sa.LongTextAccumulator()
+        for start in range(0, len(lines), size):
+            acc.feed("\n".join(lines[start:start + size]))
+        acc.close()
+        assert acc.build() == whole
+
+
+def test_summary_reads_the_line_by_line_text_column():
+    # no "text" column and a blank first one: both analyses use the review
+    content = b"title,review\n,good phone\n,bad battery\n"
+
+    async def scenario():
+        async with api_client() as (client, headers):
+            resp = await client.post("/uploads", headers=headers,
+                                     files={"file": ("reviews.csv", content, "text/csv")})
+            file_id = resp.json()["file_info"]["id"]
+            rows = (await client.post(f"/analysis/linebyline/{file_id}", headers=headers)).json()["rows"]
+            overall = (await client.post(f"/analysis/summary/{file_id}", headers=headers)).json()["overall_result"]
+
+            texts = [row["row"][row["text_column"]] for row in rows]
+            assert texts == ["good phone", "bad battery"]
+            assert overall["chunks"]["tokens"] == 4
+            assert overall == sa.analyze_long_text("\n".join(texts))
+
+    asyncio.run(scenario())
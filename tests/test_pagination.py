@@ -0,0 +1,51 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from bson.objectid import ObjectId
+
+from backend.config import files_collection
+from backend.services.pagination import InvalidCursor, decode_cursor, encode_cursor
+
+from .conftest import api_client
+
+
+def test_cursor_round_trip():
+    when, oid = datetime(2024, 5, 1, 12, 30, 15, 123000), ObjectId()
+    assert decode_cursor(encode_cursor(when, oid)) == (when, oid)
+    for bad in ("", "not-a-cursor", encode_cursor(when, oid)[:-3]):
+        with pytest.raises(InvalidCursor):
+            decode_cursor(bad)
+
+
+def test_upload_pages_cover_every_file_once():
+    async def scenario():
+        async with api_client() as (client, headers):
+            email = (await client.get("/auth/profile", headers=headers)).json()["email"]
+            same_time = datetime.utcnow().replace(microsecond=0)
+            await files_collection.insert_many([
+                # ties on uploaded_at are ordered by _id
+                {"id": f"f{i}", "user_email": email, "file_name": f"{i}.txt", "uploaded_at": same_time}
+                for i in range(7)
+            ] + [{"id": "other", "user_email": "someone@example.com", "file_name": "x.txt",
+                  "uploaded_at": same_time}])
+
+            seen, cursor, pages = [], None, 0
+            while True:
+                params = {"limit": 3, "include_total": "true", **({"cursor": cursor} if cursor else {})}
+                body = (await client.get("/uploads", params=params, headers=headers)).json()
+                assert body["total"] == 7
+                seen += [f["id"] for f in body["uploads"]]
+                pages += 1
+                cursor = body["next_cursor"]
+                if not cursor:
+                    break
+
+            assert pages == 3
+            # newest first: the last inserted (largest _id) leads
+            assert seen == [f"f{i}" for i in reversed(range(7))]
+
+            resp = await client.get("/uploads", params={"cursor": "garbage"}, headers=headers)
+            assert resp.status_code == 400
+
+    asyncio.run(scenario())
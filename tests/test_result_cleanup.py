@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+
+from backend.config import result_rows_collection, results_collection
+from backend.routes import analysis_routes
+from backend.services import azure_blob_service
+
+from .conftest import api_client
+
+
+async def _failing_metadata(**kwargs):
+    raise RuntimeError("metadata store unavailable")
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_failed_metadata_save_leaves_no_result(monkeypatch, stream):
+    monkeypatch.setattr(analysis_routes, "save_result_metadata", _failing_metadata)
+    content = b"id,text\n1,good phone\n2,bad battery\n"
+
+    async def scenario():
+        async with api_client() as (client, headers):
+            resp = await client.post("/uploads", headers=headers,
+                                     files={"file": ("reviews.csv", content, "text/csv")})
+            file_id = resp.json()["file_info"]["id"]
+            before = set(await azure_blob_service.list_blobs("results/"))
+            rows_before = await result_rows_collection.count_documents({})
+
+            if stream:
+                resp = await client.post(f"/analysis/linebyline/{file_id}/stream", headers=headers)
+                assert "metadata store unavailable" in resp.text.strip().split("\n")[-1]
+            else:
+                with pytest.raises(RuntimeError):
+                    await client.post(f"/analysis/linebyline/{file_id}", headers=headers)
+
+            assert set(await azure_blob_service.list_blobs("results/")) == before
+            assert await result_rows_collection.count_documents({}) == rows_before
+            assert await results_collection.count_documents({"file_id": file_id}) == 0
+
+    asyncio.run(scenario())
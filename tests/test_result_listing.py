@@ -0,0 +1,37 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from backend.config import results_collection
+
+from .conftest import api_client
+
+
+def test_results_saved_without_created_at_are_listed():
+    async def scenario():
+        async with api_client() as (client, headers):
+            email = (await client.get("/auth/profile", headers=headers)).json()["email"]
+            now = datetime.utcnow()
+            await results_collection.insert_many([
+                {"user_email": email, "analysis_type": "linebyline", "file_name": "new.csv", "created_at": now},
+                {"user_email": email, "analysis_type": "linebyline", "file_name": "old.csv",
+                 "created_at": now - timedelta(days=1)},
+                # saved before results carried a timestamp
+                {"user_email": email, "analysis_type": "summary", "file_name": "legacy1.txt"},
+                {"user_email": email, "analysis_type": "summary", "file_name": "legacy2.txt"},
+            ])
+
+            names, cursor = [], None
+            while True:
+                params = {"limit": 1, **({"cursor": cursor} if cursor else {})}
+                resp = await client.get("/analysis/results", params=params, headers=headers)
+                assert resp.status_code == 200, resp.text
+                body = resp.json()
+                names += [r["file_name"] for r in body["results"]]
+                cursor = body["next_cursor"]
+                if not cursor:
+                    break
+
+            assert names[:2] == ["new.csv", "old.csv"]
+            assert sorted(names[2:]) == ["legacy1.txt", "legacy2.txt"]
+
+    asyncio.run(scenario())
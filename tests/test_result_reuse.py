@@ -0,0 +1,26 @@
+import asyncio
+
+from .conftest import api_client
+
+
+def test_reuse_reads_rows_from_the_current_upload():
+    content = b"id,text\n1,good phone\n2,bad battery\n"
+
+    async def upload(client, headers):
+        resp = await client.post("/uploads", headers=headers,
+                                 files={"file": ("reviews.csv", content, "text/csv")})
+        return resp.json()["file_info"]["id"]
+
+    async def scenario():
+        async with api_client() as (client, headers):
+            first = await upload(client, headers)
+            fresh = (await client.post(f"/analysis/linebyline/{first}", headers=headers)).json()
+            await client.delete(f"/uploads/{first}", headers=headers)
+
+            second = await upload(client, headers)
+            reused = (await client.post(f"/analysis/linebyline/{second}", headers=headers)).json()
+            assert reused["reused"] is True
+            assert reused["rows"] == fresh["rows"]
+            assert [row["row"]["text"] for row in reused["rows"]] == ["good phone", "bad battery"]
+
+    asyncio.run(scenario())
@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from backend.config import result_rows_collection
+from backend.routes import analysis_routes
+
+from .conftest import api_client
+
+CONTENT = (
+    b"id,text\n"
+    b"1,good phone\n"
+    b"2,great good love\n"
+    b"3,bad battery\n"
+    b"4,meh\n"
+    b"5,awful terrible bad\n"
+)
+
+
+@pytest.mark.parametrize("indexed", [True, False])
+def test_query_top_and_histogram(monkeypatch, indexed):
+    # not indexed at save time: the first query backfills from the blob
+    monkeypatch.setattr(analysis_routes, "RESULT_ROWS_INDEXED", indexed)
+
+    async def scenario():
+        async with api_client() as (client, headers):
+            resp = await client.post("/uploads", headers=headers,
+                                     files={"file": ("reviews.csv", CONTENT, "text/csv")})
+            file_id = resp.json()["file_info"]["id"]
+            result_id = (await client.post(f"/analysis/linebyline/{file_id}", headers=headers)).json()["result_id"]
+            url = f"/analysis/results/{result_id}"
+            assert await result_rows_collection.count_documents({"result_id": result_id}) == (5 if indexed else 0)
+
+            body = (await client.get(f"{url}/rows", params={"label": "negative"}, headers=headers)).json()
+            assert [(r["index"], r["text"]) for r in body["rows"]] == [(3, "bad battery"), (5, "awful terrible bad")]
+            assert await result_rows_collection.count_documents({"result_id": result_id}) == 5
+
+            first = (await client.get(f"{url}/rows", params={"min_score": 0.7, "limit": 2}, headers=headers)).json()
+            rest = (await client.get(f"{url}/rows", params={"min_score": 0.7, "cursor": first["next_cursor"]},
+                                     headers=headers)).json()
+            assert [r["index"] for r in first["rows"] + rest["rows"]] == [1, 2, 3, 5]
+            assert rest["next_cursor"] is None
+
+            top = (await client.get(f"{url}/rows/top", params={"k": 2}, headers=headers)).json()["rows"]
+            assert [(r["index"], r["score"]) for r in top] == [(2, 0.875), (5, 0.875)]
+
+            hist = (await client.get(f"{url}/histogram", params={"bins": 4}, headers=headers)).json()
+            assert hist == {
+                "edges": [0.0, 0.25, 0.5, 0.75, 1.0],
+                "counts": {"negative": [0, 0, 0, 2], "neutral": [0, 0, 1, 0], "positive": [0, 0, 0, 2]},
+                "total": 5,
+            }
+
+    asyncio.run(scenario())
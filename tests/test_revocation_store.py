@@ -0,0 +1,84 @@
+import asyncio
+import hashlib
+from datetime import datetime, timedelta
+
+import jwt
+
+from backend.config import JWT_ALGORITHM, JWT_SECRET, blacklist_collection
+from backend.services import db_service
+from backend.services.revocation_store import RevocationStore
+
+from .conftest import api_client
+
+
+def test_legacy_blacklist_entries_stay_revoked():
+    # logged out before tokens carried a jti: stored as the raw token
+    token = jwt.encode(
+        {"email": "old@example.com", "exp": datetime.utcnow() + timedelta(minutes=30)},
+        JWT_SECRET, algorithm=JWT_ALGORITHM,
+    )
+    expired = jwt.encode(
+        {"email": "old@example.com", "exp": datetime.utcnow() - timedelta(minutes=1)},
+        JWT_SECRET, algorithm=JWT_ALGORITHM,
+    )
+
+    async def scenario():
+        async with api_client():
+            await blacklist_collection.insert_many([{"token": token}, {"token": expired}])
+
+            store = RevocationStore()
+            assert await store.is_revoked(hashlib.sha256(token.encode("utf-8")).hexdigest())
+            assert await blacklist_collection.count_documents({"token": {"$exists": True}}) == 0
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_first_checks_wait_for_the_load(monkeypatch):
+    real = db_service.get_revocations_since
+
+    async def slow(since):
+        await asyncio.sleep(0.05)
+        return await real(since)
+
+    monkeypatch.setattr(db_service, "get_revocations_since", slow)
+
+    async def scenario():
+        async with api_client():
+            jti = "revoked-before-start"
+            await db_service.add_to_blacklist(jti, datetime.utcnow() + timedelta(minutes=30))
+
+            store = RevocationStore()
+            checks = await asyncio.gather(*[store.is_revoked(jti) for _ in range(5)])
+            assert checks == [True] * 5
+            assert store.syncs == 1
+
+    asyncio.run(scenario())
+
+
+def test_failed_first_sync_is_retried(monkeypatch):
+    real = db_service.get_revocations_since
+    calls = []
+
+    async def flaky(since):
+        calls.append(since)
+        if len(calls) == 1:
+            raise RuntimeError("mongo unavailable")
+        return await real(since)
+
+    monkeypatch.setattr(db_service, "get_revocations_since", flaky)
+
+    async def scenario():
+        async with api_client():
+            jti = "revoked-during-outage"
+            await db_service.add_to_blacklist(jti, datetime.utcnow() + timedelta(minutes=30))
+
+            store = RevocationStore()
+            checks = await asyncio.gather(
+                *[store.is_revoked(jti) for _ in range(3)], return_exceptions=True
+            )
+            assert isinstance(checks[0], RuntimeError)
+            assert checks[1:] == [True, True]
+            assert store.sync_failures == 1
+            assert await store.is_revoked(jti)
+
+    asyncio.run(scenario())
@@ -0,0 +1,33 @@
+from backend.sentiment_cache import SentimentCache, text_key
+
+
+def test_keys_ignore_whitespace_but_not_model_or_case():
+    key = text_key("great  phone\n", "model-a")
+    assert text_key(" great phone", "model-a") == key
+    assert text_key("great\tphone", "model-a") == key
+    assert text_key("great phone", "model-b") != key
+    assert text_key("Great phone", "model-a") != key
+    assert len(key) == 32
+
+
+def test_sqlite_tier_is_shared_and_promoted(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    key = text_key("good battery", "model-a")
+    SentimentCache(max_entries=10, sqlite_path=path).put_many({key: {"label": "positive", "score": 0.9}})
+
+    # another worker on the host: empty memory tier, same file
+    other = SentimentCache(max_entries=10, sqlite_path=path)
+    assert other.get_many([key, text_key("unseen", "model-a")]) == {key: {"label": "positive", "score": 0.9}}
+    assert other.get_many([key]) == {key: {"label": "positive", "score": 0.9}}
+    stats = other.stats()
+    assert (stats["persistent_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 1)
+    assert stats["persistent_bytes"] > 0
+
+
+def test_memory_tier_is_bounded_lru():
+    cache = SentimentCache(max_entries=2)
+    keys = [text_key(t, "m") for t in ("a", "b", "c")]
+    cache.put_many({keys[0]: {"label": "x", "score": 1.0}, keys[1]: {"label": "y", "score": 1.0}})
+    cache.get_many([keys[0]])
+    cache.put_many({keys[2]: {"label": "z", "score": 1.0}})
+    assert set(cache.get_many(keys)) == {keys[0], keys[2]}
@@ -0,0 +1,41 @@
+import csv
+import io
+
+from backend.text_parsing import CsvRowParser, parse_all
+
+
+def _baseline(text):
+    return [
+        row for row in csv.DictReader(io.StringIO(text))
+        if any((v or "").strip() for v in row.values())
+    ]
+
+
+def _feed_in_chunks(text, size):
+    parser = CsvRowParser()
+    items = []
+    for start in range(0, len(text), size):
+        items.extend(parser.feed(text[start:start + size]))
+    return items + parser.close()
+
+
+def test_stray_quote_in_unquoted_field():
+    text = 'id,text\n1,5" screen is great\n2,bad phone\n'
+    items = parse_all(text, "csv")
+    assert [item["text"] for item in items] == ['5" screen is great', "bad phone"]
+    assert [item["row"] for item in items] == _baseline(text)
+
+
+def test_quoted_newline_and_escaped_quotes():
+    text = (
+        'id,text\n'
+        '1,"good\nstill the same row"\n'
+        '2,"he said ""hi""\nthen ""left"""\n'
+        '3,5" screen, "not quoted" either\n'
+        '4,plain\n'
+    )
+    expected = _baseline(text)
+    assert [item["row"] for item in parse_all(text, "csv")] == expected
+    assert [item["index"] for item in parse_all(text, "csv")] == [1, 2, 3, 4]
+    for size in (1, 2, 3, 7, 64):
+        assert [item["row"] for item in _feed_in_chunks(text, size)] == expected
@@ -0,0 +1,66 @@
+import asyncio
+import csv
+import threading
+
+from backend import text_parsing
+from backend.routes import upload_routes
+
+from .conftest import api_client
+
+
+def _upload(client, headers, content):
+    return client.post("/uploads", headers=headers,
+                       files={"file": ("reviews.csv", content, "text/csv")})
+
+
+def test_upload_counts_rows_with_stray_quote():
+    content = b'id,text\n1,5" screen is great\n2,"good\nstill one row"\n3,bad\n'
+
+    async def scenario():
+        async with api_client() as (client, headers):
+            resp = await _upload(client, headers, content)
+            assert resp.status_code == 200, resp.text
+            assert resp.json()["file_info"]["row_count"] == 3
+
+    asyncio.run(scenario())
+
+
+def test_upload_survives_unparseable_rows(monkeypatch):
+    def reject(self, text):
+        raise csv.Error("field larger than field limit")
+
+    monkeypatch.setattr(text_parsing.CsvRowParser, "feed", reject)
+
+    async def scenario():
+        async with api_client() as (client, headers):
+            resp = await _upload(client, headers, b"id,text\n1,fine\n")
+            assert resp.status_code == 200, resp.text
+            info = resp.json()["file_info"]
+            assert info["row_count"] is None
+            assert info["size_bytes"] == 15
+
+    asyncio.run(scenario())
+
+
+def test_upload_blocks_are_scanned_off_the_event_loop(monkeypatch):
+    monkeypatch.setattr(upload_routes.azure_blob_service, "BLOB_BLOCK_SIZE", 16)
+    threads = []
+    scan = upload_routes._UploadScanner.scan
+
+    def recording_scan(self, chunk):
+        threads.append(threading.get_ident())
+        scan(self, chunk)
+
+    monkeypatch.setattr(upload_routes._UploadScanner, "scan", recording_scan)
+    content = b"id,text\n" + b"".join(b"%d,review number %d\n" % (i, i) for i in range(50))
+
+    async def scenario():
+        async with api_client() as (client, headers):
+            resp = await _upload(client, headers, content)
+            assert resp.status_code == 200, resp.text
+            info = resp.json()["file_info"]
+            assert (info["row_count"], info["size_bytes"]) == (50, len(content))
+
+    asyncio.run(scenario())
+    assert len(threads) > 1
+    assert threading.get_ident() not in threads